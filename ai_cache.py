@@ -0,0 +1,161 @@
+# ai_cache.py — Two-tier cache for Gemini answers (in-process LRU + SQLite)
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from db import DB_QUERY_SECONDS, get_db, transaction
+from metrics import traced
+
+
+# =======================================================
+# CONFIG
+# =======================================================
+CACHE_TTL_SECONDS = int(os.getenv("AI_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+MEMORY_CACHE_SIZE = int(os.getenv("AI_CACHE_MEMORY_SIZE", 1024))
+CACHE_DB_PATH = os.getenv("AI_CACHE_DB_PATH")      # None → same file as db.DB_PATH
+
+CACHE_TABLE = """
+CREATE TABLE IF NOT EXISTS ai_cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    eco_id TEXT,
+    version TEXT,
+    expires_at REAL NOT NULL
+);
+"""
+CACHE_INDEX = "CREATE INDEX IF NOT EXISTS idx_ai_cache_eco_id ON ai_cache(eco_id);"
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace so indentation changes in prompt templates don't miss."""
+    return " ".join(prompt.split())
+
+
+def prompt_key(model_name: str, prompt: str) -> str:
+    return hashlib.sha256(f"{model_name}\n{normalize_prompt(prompt)}".encode()).hexdigest()
+
+
+class AICache:
+    """
+    Tier 1: OrderedDict LRU with TTL, per process.
+    Tier 2: `ai_cache` SQLite table, survives restarts.
+
+    Entries may be tagged with an ECO id and version (its updated_at);
+    a lookup with a newer version drops every entry of that ECO.
+    """
+
+    def __init__(self, max_entries=MEMORY_CACHE_SIZE, ttl=CACHE_TTL_SECONDS, db_path=CACHE_DB_PATH):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._lru = OrderedDict()   # key → (value, expires_at, eco_id, version)
+        self._table_ready = False
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}   # under _lock; read via counters()
+
+    # ---------------------------------------------------------
+    # SQLite tier
+    # ---------------------------------------------------------
+    def _db(self):
+        conn = get_db(self.db_path)
+        if not self._table_ready:
+            conn.execute(CACHE_TABLE)
+            conn.execute(CACHE_INDEX)
+            self._table_ready = True
+        return conn
+
+    @traced("ai_cache.disk_get", DB_QUERY_SECONDS, op="ai_cache_get")
+    def _disk_get(self, key):
+        # same tuple layout as the memory tier
+        row = self._db().execute(
+            "SELECT value, expires_at, eco_id, version FROM ai_cache WHERE key=?", (key,)
+        ).fetchone()
+        return tuple(row) if row else None
+
+    @traced("ai_cache.disk_put", DB_QUERY_SECONDS, op="ai_cache_put")
+    def _disk_put(self, key, value, eco_id, version, expires_at):
+        self._db()
+        with transaction(self.db_path) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO ai_cache (key, value, eco_id, version, expires_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, value, eco_id, version, expires_at),
+            )
+
+    # ---------------------------------------------------------
+    # Memory tier
+    # ---------------------------------------------------------
+    def _memory_put(self, key, entry):
+        with self._lock:
+            self._lru[key] = entry
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+
+    # ---------------------------------------------------------
+    # Public API
+    # ---------------------------------------------------------
+    def get(self, key, eco_id=None, version=None):
+        """Return the cached answer or None (expired / stale ECO version)."""
+        now = time.time()
+
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None:
+                self._lru.move_to_end(key)
+
+        tier = "memory_hits"
+        if entry is None:
+            tier = "disk_hits"
+            entry = self._disk_get(key)
+            if entry is not None:
+                self._memory_put(key, entry)
+
+        if entry is not None:
+            value, expires_at, entry_eco, entry_version = entry
+            if eco_id is not None and entry_eco == eco_id and entry_version != version:
+                self.invalidate_eco(eco_id)
+                entry = None
+            elif expires_at < now:
+                self.delete(key)
+                entry = None
+
+        with self._lock:    # get() runs on the event loop and in the threadpool
+            self.stats["misses" if entry is None else tier] += 1
+        return None if entry is None else entry[0]
+
+    def counters(self):
+        """Consistent copy of the hit/miss counters."""
+        with self._lock:
+            return dict(self.stats)
+
+    def put(self, key, value, eco_id=None, version=None):
+        expires_at = time.time() + self.ttl
+        self._memory_put(key, (value, expires_at, eco_id, version))
+        self._disk_put(key, value, eco_id, version, expires_at)
+
+    def delete(self, key):
+        with self._lock:
+            self._lru.pop(key, None)
+        self._db()
+        with transaction(self.db_path) as conn:
+            conn.execute("DELETE FROM ai_cache WHERE key=?", (key,))
+
+    def invalidate_eco(self, eco_id):
+        """Drop every cached answer derived from this ECO."""
+        with self._lock:
+            for key in [k for k, e in self._lru.items() if e[2] == eco_id]:
+                del self._lru[key]
+        self._db()
+        with transaction(self.db_path) as conn:
+            conn.execute("DELETE FROM ai_cache WHERE eco_id=?", (eco_id,))
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+        self._db()
+        with transaction(self.db_path) as conn:
+            conn.execute("DELETE FROM ai_cache")
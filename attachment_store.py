@@ -0,0 +1,97 @@
+# attachment_store.py — Content-addressed blob storage for ECO attachments
+#
+# Blobs live at  <ATTACHMENT_DIR>/blobs/ab/cdef...  (SHA-256 of the content),
+# so the same file attached to many ECOs is stored once. Uploads are copied in
+# fixed-size chunks and hashed on the way; nothing is held whole in memory.
+
+import hashlib
+import os
+import re
+import tempfile
+
+ATTACHMENT_DIR = os.getenv("ATTACHMENT_DIR", "attachments")
+CHUNK_SIZE = int(os.getenv("ATTACHMENT_CHUNK_SIZE", 1024 * 1024))     # 1 MiB
+
+_SHA256 = re.compile(r"^[0-9a-f]{64}$")
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def blob_path(sha256: str, root: str | None = None) -> str:
+    return os.path.join(root or ATTACHMENT_DIR, "blobs", sha256[:2], sha256[2:])
+
+
+def put_stream(src, root: str | None = None, chunk_size: int = CHUNK_SIZE):
+    """
+    Copy a binary file object into the store chunk by chunk.
+    Returns {"sha256", "size_bytes", "deduplicated"}. Blocking — run it in a thread.
+    """
+    root = root or ATTACHMENT_DIR
+    tmp_dir = os.path.join(root, "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := src.read(chunk_size):
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+
+        sha256 = digest.hexdigest()
+        final = blob_path(sha256, root)
+        deduplicated = os.path.exists(final)
+        if not deduplicated:
+            os.makedirs(os.path.dirname(final), exist_ok=True)
+            os.replace(tmp_path, final)     # atomic: readers never see a partial blob
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return {"sha256": sha256, "size_bytes": size, "deduplicated": deduplicated}
+
+
+def open_blob(sha256: str, root: str | None = None):
+    """(path, size) of a stored blob, or None."""
+    if not _SHA256.match(sha256):
+        return None
+    path = blob_path(sha256, root)
+    if not os.path.isfile(path):
+        return None
+    return path, os.path.getsize(path)
+
+
+def parse_range(header: str | None, size: int):
+    """
+    Single-range `Range: bytes=start-end` → (start, end) inclusive.
+    None means "send the whole file"; ValueError means 416.
+    """
+    if not header:
+        return None
+    m = _RANGE.match(header.strip())
+    if not m or m.groups() == ("", ""):
+        return None                     # multi-range / malformed: ignore, send 200
+
+    first, last = m.groups()
+    if first == "":                     # suffix: last N bytes
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+def iter_blob(path: str, start: int = 0, end: int | None = None, chunk_size: int = CHUNK_SIZE):
+    """Yield bytes [start, end] of a blob in chunks."""
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        remaining = (os.path.getsize(path) if end is None else end + 1) - start
+        while remaining > 0:
+            chunk = fh.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
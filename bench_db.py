@@ -0,0 +1,110 @@
+# bench_db.py — Insert / lookup throughput of the SQLite ECO persistence
+#
+#   python bench_db.py --ecos 2000 --bom 10 --threads 8
+#
+# "before" replays the old access pattern (new connection per call, one
+# INSERT per BOM row, rollback journal); "after" uses db.save_eco/load_eco.
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import db
+
+
+# ---------------------------------------------------------
+# Old access pattern (kept here only for comparison)
+# ---------------------------------------------------------
+def naive_save_eco(path, change_id, title, description, datasets, bom_list):
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("""
+        INSERT OR REPLACE INTO eco_master (change_id, title, description, datasets)
+        VALUES (?, ?, ?, ?)
+    """, (change_id, title, description, ",".join(datasets)))
+    conn.execute("DELETE FROM eco_bom WHERE change_id=?", (change_id,))
+    for item_data in bom_list:
+        conn.execute("""
+            INSERT INTO eco_bom (change_id, item, impact)
+            VALUES (?, ?, ?)
+        """, (change_id, item_data["item"], item_data["impact"]))
+    conn.commit()
+    conn.close()
+
+
+def naive_load_eco(path, change_id):
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    eco = conn.execute("SELECT * FROM eco_master WHERE change_id=?", (change_id,)).fetchone()
+    bom = conn.execute("SELECT item, impact FROM eco_bom WHERE change_id=?", (change_id,)).fetchall()
+    conn.close()
+    return eco, bom
+
+
+def naive_schema(path):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=DELETE")
+    for statement in db.SCHEMA[:2]:     # the old schema had no BOM index
+        conn.execute(statement)
+    conn.commit()
+    conn.close()
+
+
+# ---------------------------------------------------------
+# Runner
+# ---------------------------------------------------------
+def make_ecos(n, bom_size):
+    return [
+        (
+            f"BENCH-{i:06d}",
+            f"Bench ECO {i}",
+            "Generated by bench_db.py",
+            ["CAD", "Drawing"],
+            [{"item": f"A{i:06d}-{j}", "impact": ("High", "Medium", "Low")[j % 3]}
+             for j in range(bom_size)],
+        )
+        for i in range(n)
+    ]
+
+
+def timed(fn, args_list, threads):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(lambda args: fn(*args), args_list))
+    return time.perf_counter() - start
+
+
+def run(ecos, bom_size, threads):
+    data = make_ecos(ecos, bom_size)
+    ids = [(row[0],) for row in data]
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        before = os.path.join(tmp, "before.db")
+        naive_schema(before)
+        insert_s = timed(lambda *a: naive_save_eco(before, *a), data, threads)
+        lookup_s = timed(lambda cid: naive_load_eco(before, cid), ids, threads)
+        results["before"] = (ecos / insert_s, ecos / lookup_s)
+
+        db.DB_PATH = os.path.join(tmp, "after.db")
+        db.init_schema()
+        insert_s = timed(db.save_eco, data, threads)
+        lookup_s = timed(db.load_eco, ids, threads)
+        results["after"] = (ecos / insert_s, ecos / lookup_s)
+
+    print(f"{ecos} ECOs × {bom_size} BOM rows, {threads} threads")
+    print(f"{'':8}{'inserts/sec':>14}{'lookups/sec':>14}")
+    for label, (ins, look) in results.items():
+        print(f"{label:8}{ins:>14.0f}{look:>14.0f}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SQLite ECO persistence benchmark")
+    parser.add_argument("--ecos", type=int, default=2000)
+    parser.add_argument("--bom", type=int, default=10)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+    run(args.ecos, args.bom, args.threads)
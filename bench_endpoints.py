@@ -0,0 +1,385 @@
+# bench_endpoints.py — Throughput / latency / memory of every main.py route
+#
+#   python bench_endpoints.py --mode both --concurrency 1,16,64 --requests 500
+#   python bench_endpoints.py --routes tc_ --json after.json --baseline before.json
+#
+# Drives the FastAPI app in-process (httpx ASGITransport, no network) and/or
+# over HTTP (uvicorn on a background thread). Gemini is replaced by a stub
+# with --model-latency-ms so AI routes measure our code, not Google's.
+# Each scenario runs at each concurrency level and reports req/s,
+# p50/p95/p99 latency, failures and RSS growth (plus Python heap growth
+# with --tracemalloc). --baseline compares against a previous --json file
+# and exits 1 if p95 or throughput regressed by more than --tolerance.
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import re
+import resource
+import socket
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+_TMP = tempfile.mkdtemp(prefix="eco-bench-")
+os.environ["ECO_DB_PATH"] = os.path.join(_TMP, "eco.db")
+os.environ["AI_CACHE_DB_PATH"] = os.path.join(_TMP, "ai_cache.db")
+os.environ["ATTACHMENT_DIR"] = os.path.join(_TMP, "attachments")
+
+import httpx
+
+import gemini_client
+import main
+from db import init_schema, save_ecos
+from eco_jobs import JobManager
+from mock_teamcenter import create_ecos_bulk
+
+
+# ---------------------------------------------------------
+# Stub Gemini model
+# ---------------------------------------------------------
+class _Reply:
+    def __init__(self, text):
+        self.text = text
+
+
+class _Stream:
+    def __init__(self, text, latency, chunks=4):
+        self.parts = [text[i::chunks] for i in range(chunks)]
+        self.latency = latency / len(self.parts)
+
+    def __aiter__(self):
+        return self._gen()
+
+    async def _gen(self):
+        for part in self.parts:
+            await asyncio.sleep(self.latency)
+            yield _Reply(part)
+
+
+class StubModel:
+    """Answers after `latency` seconds; batch prompts get a valid JSON reply."""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def _answer(self, prompt, generation_config=None):
+        if generation_config and generation_config.get("response_mime_type") == "application/json":
+            ids = re.findall(r'"eco_id": "([^"]+)"', prompt)
+            return json.dumps({"summaries": [{"eco_id": i, "summary": f"Stub summary of {i}"} for i in ids]})
+        return f"Stub answer ({len(prompt)} prompt chars)."
+
+    def generate_content(self, prompt, **kwargs):
+        time.sleep(self.latency)
+        return _Reply(self._answer(prompt))
+
+    async def generate_content_async(self, prompt, generation_config=None, stream=False, **kwargs):
+        if stream:
+            return _Stream(self._answer(prompt), self.latency)
+        await asyncio.sleep(self.latency)
+        return _Reply(self._answer(prompt, generation_config))
+
+
+def install_stub_model(latency_ms):
+    gemini_client.model = StubModel(latency_ms / 1000)
+    gemini_client.circuit = gemini_client.CircuitBreaker(
+        gemini_client.TokenBucket(10 ** 9, period=1), cooldown=0
+    )
+
+
+# ---------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------
+def seed(n_ecos, n_sqlite):
+    items = [{"item": f"P{i:05d}", "impact": random.choice(("High", "Medium", "Low"))} for i in range(500)]
+    uids = create_ecos_bulk([
+        {"properties": {"object_name": f"Bench ECO {i}", "object_desc": "Seeded for bench_endpoints"},
+         "impacted_items": random.sample(items, 3), "datasets": ["CAD"]}
+        for i in range(n_ecos)
+    ])
+    init_schema()
+    change_ids = [f"BENCH-{i:06d}" for i in range(n_sqlite)]
+    save_ecos([
+        {"change_id": cid, "title": f"Bench {cid}", "description": "seed", "datasets": ["CAD"],
+         "bom": [{"item": f"P{i:05d}", "impact": "Low"}]}
+        for i, cid in enumerate(change_ids)
+    ])
+    return {"uids": uids, "change_ids": change_ids, "jobs": [], "sha256": None}
+
+
+def _ndjson(i, n=20):
+    return "\n".join(json.dumps({"properties": {"object_name": f"Bulk {i}-{k}"}}) for k in range(n)).encode()
+
+
+# name → fn(i, ctx) returning httpx request kwargs
+SCENARIOS = {
+    "root":                lambda i, c: {"method": "GET", "url": "/"},
+    "tc_create":           lambda i, c: {"method": "POST", "url": "/tc/eco/create",
+                                         "json": {"properties": {"object_name": f"Bench create {i}"}}},
+    "tc_list":             lambda i, c: {"method": "GET", "url": "/tc/eco/all", "params": {"limit": 50}},
+    "tc_list_filtered":    lambda i, c: {"method": "GET", "url": "/tc/eco/all",
+                                         "params": {"limit": 50, "status": "Created", "fields": "eco_uid,title"}},
+    "tc_get":              lambda i, c: {"method": "GET", "url": f"/tc/eco/{_uid(i, c)}"},
+    "tc_status":           lambda i, c: {"method": "POST", "url": f"/tc/eco/{_uid(i, c)}/status",
+                                         "params": {"action": "Demote"}},
+    "tc_add_item":         lambda i, c: {"method": "POST", "url": f"/tc/eco/{_uid(i, c)}/add_item/X{i}"},
+    "tc_remove_item":      lambda i, c: {"method": "POST", "url": f"/tc/eco/{_uid(i, c)}/remove_item/X{i}"},
+    "tc_bulk":             lambda i, c: {"method": "POST", "url": "/tc/eco/bulk", "content": _ndjson(i)},
+    "tc_seed_1001":        lambda i, c: {"method": "POST", "url": "/tc/eco/seed_1001"},
+    "tc_attach":           lambda i, c: {"method": "POST", "url": f"/tc/eco/{_uid(i, c)}/attach",
+                                         "files": {"file": (f"f{i}.bin", i.to_bytes(4, "big") * 1024)}},
+    "tc_download":         lambda i, c: {"method": "GET", "url": f"/tc/eco/{c['uids'][0]}/attachments/{c['sha256']}"},
+    "tc_download_range":   lambda i, c: {"method": "GET", "url": f"/tc/eco/{c['uids'][0]}/attachments/{c['sha256']}",
+                                         "headers": {"Range": "bytes=0-1023"}},
+    "sqlite_create":       lambda i, c: {"method": "POST", "url": "/eco/create",
+                                         "json": {"change_id": f"BC-{i}-{random.random()}", "title": "t",
+                                                  "description": "d", "datasets": ["CAD"],
+                                                  "bom": [{"item": "A1", "impact": "Low"}]}},
+    "sqlite_get":          lambda i, c: {"method": "GET", "url": f"/eco/{c['change_ids'][i % len(c['change_ids'])]}"},
+    "ai_summarize":        lambda i, c: {"method": "GET", "url": f"/eco/{_uid(i, c)}/summarize"},
+    "ai_impact":           lambda i, c: {"method": "GET", "url": f"/eco/{_uid(i, c)}/impact"},
+    "ai_summarize_stream": lambda i, c: {"method": "GET", "url": f"/eco/{_uid(i, c)}/summarize/stream"},
+    "ai_impact_stream":    lambda i, c: {"method": "GET", "url": f"/eco/{_uid(i, c)}/impact/stream"},
+    "ai_summarize_batch":  lambda i, c: {"method": "POST", "url": "/eco/summarize/batch",
+                                         "json": {"eco_ids": [_uid(i * 20 + k, c) for k in range(20)]}},
+    "ai_stats":            lambda i, c: {"method": "GET", "url": "/eco/ai/stats"},
+    "job_submit":          lambda i, c: {"method": "POST", "url": f"/eco/{_uid(i, c)}/impact/jobs"},
+    "job_stats":           lambda i, c: {"method": "GET", "url": "/eco/jobs"},
+    "job_get":             lambda i, c: {"method": "GET", "url": f"/eco/jobs/{c['jobs'][i % len(c['jobs'])]}"},
+    "job_events":          lambda i, c: {"method": "GET", "url": f"/eco/jobs/{c['jobs'][i % len(c['jobs'])]}/events"},
+    "job_cancel":          lambda i, c: {"method": "DELETE", "url": f"/eco/jobs/{c['jobs'][i % len(c['jobs'])]}"},
+}
+
+AI_SCENARIOS = {name for name in SCENARIOS if name.startswith(("ai_", "job_submit"))}
+
+
+def _uid(i, ctx):
+    return ctx["uids"][i % len(ctx["uids"])]
+
+
+async def prepare(client, ctx):
+    """Fixtures that need the running app: one attachment and some finished jobs."""
+    res = (await client.post(f"/tc/eco/{ctx['uids'][0]}/attach",
+                             files={"file": ("bench.bin", os.urandom(256 * 1024))})).json()
+    ctx["sha256"] = res["attachment"]["sha256"]
+    ctx["jobs"] = []
+    for k in range(20):
+        res = (await client.post(f"/eco/{_uid(k, ctx)}/impact/jobs")).json()
+        ctx["jobs"].append(res["job_id"])
+    for job_id in ctx["jobs"]:
+        await client.get(f"/eco/jobs/{job_id}/events")      # returns once the job is done
+
+
+# ---------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:     # not Linux: peak RSS (KiB on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+async def drive(client, build, ctx, n_requests, concurrency):
+    """Run n_requests with `concurrency` workers; returns (latencies, failures, app_errors, seconds)."""
+    latencies, failures, app_errors = [], 0, 0
+    counter = iter(range(n_requests))
+
+    async def worker():
+        nonlocal failures, app_errors
+        for i in counter:
+            spec = build(i, ctx)
+            start = time.perf_counter()
+            try:
+                response = await client.request(**spec)
+            except httpx.HTTPError:
+                failures += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                failures += 1
+            elif response.content[:9] == b'{"error":':
+                app_errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, failures, app_errors, time.perf_counter() - start
+
+
+async def run_scenarios(client, ctx, names, levels, n_requests, warm_ai, trace):
+    results = {}
+    for name in names:
+        for concurrency in levels:
+            if name in AI_SCENARIOS and not warm_ai:
+                gemini_client.AI_CACHE.clear()
+
+            rss_before = rss_bytes()
+            if trace:
+                tracemalloc.start()
+            latencies, failures, app_errors, seconds = await drive(
+                client, SCENARIOS[name], ctx, n_requests, concurrency
+            )
+            heap = tracemalloc.get_traced_memory() if trace else None
+            if trace:
+                tracemalloc.stop()
+
+            lat = sorted(latencies)
+            row = {
+                "requests": n_requests,
+                "concurrency": concurrency,
+                "seconds": round(seconds, 4),
+                "req_per_sec": round(n_requests / seconds, 1),
+                "p50_ms": round(percentile(lat, 0.50) * 1000, 3),
+                "p95_ms": round(percentile(lat, 0.95) * 1000, 3),
+                "p99_ms": round(percentile(lat, 0.99) * 1000, 3),
+                "max_ms": round(lat[-1] * 1000, 3) if lat else 0.0,
+                "failures": failures,
+                "app_errors": app_errors,
+                "rss_growth_kb": (rss_bytes() - rss_before) // 1024,
+            }
+            if heap:
+                row["heap_growth_kb"], row["heap_peak_kb"] = heap[0] // 1024, heap[1] // 1024
+            results[f"{name}@{concurrency}"] = row
+            print(f"  {name:22}{concurrency:>5}{row['req_per_sec']:>10.0f}{row['p50_ms']:>9.2f}"
+                  f"{row['p95_ms']:>9.2f}{row['p99_ms']:>9.2f}{failures:>7}{app_errors:>7}{row['rss_growth_kb']:>10}")
+    return results
+
+
+def _header(mode):
+    print(f"\n[{mode}]")
+    print(f"  {'scenario':22}{'conc':>5}{'req/s':>10}{'p50ms':>9}{'p95ms':>9}{'p99ms':>9}"
+          f"{'fail':>7}{'apperr':>7}{'rss+KB':>10}")
+
+
+# ---------------------------------------------------------
+# Modes
+# ---------------------------------------------------------
+async def bench_in_process(ctx, names, levels, n_requests, warm_ai, trace):
+    main.JOBS = JobManager()        # bound to this event loop
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        await prepare(client, ctx)
+        _header("in-process")
+        return await run_scenarios(client, ctx, names, levels, n_requests, warm_ai, trace)
+
+
+def start_server():
+    import uvicorn
+
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    main.JOBS = JobManager()        # bound to the server's event loop
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+async def bench_http(ctx, names, levels, n_requests, warm_ai, trace):
+    server, base_url = start_server()
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    try:
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            await prepare(client, ctx)
+            _header(f"http {base_url}")
+            return await run_scenarios(client, ctx, names, levels, n_requests, warm_ai, trace)
+    finally:
+        server.should_exit = True
+
+
+# ---------------------------------------------------------
+# Baseline comparison
+# ---------------------------------------------------------
+def compare(results, baseline, tolerance):
+    """Print deltas against a baseline run; returns the number of regressions."""
+    regressions = 0
+    print(f"\nvs baseline (tolerance {tolerance:.0%})")
+    for mode, rows in results.items():
+        for key, row in rows.items():
+            base = baseline.get("results", {}).get(mode, {}).get(key)
+            if base is None:
+                continue
+            d_rps = row["req_per_sec"] / base["req_per_sec"] - 1 if base["req_per_sec"] else 0.0
+            d_p95 = row["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0.0
+            bad = d_rps < -tolerance or d_p95 > tolerance
+            regressions += bad
+            print(f"  {mode:11}{key:28}req/s {d_rps:+7.1%}   p95 {d_p95:+7.1%}{'   REGRESSION' if bad else ''}")
+    return regressions
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="FastAPI endpoint benchmark")
+    parser.add_argument("--mode", choices=("inproc", "http", "both"), default="inproc")
+    parser.add_argument("--concurrency", default="1,16,64", help="comma-separated levels")
+    parser.add_argument("--requests", type=int, default=300, help="requests per scenario and level")
+    parser.add_argument("--routes", default="", help="comma-separated scenario name prefixes")
+    parser.add_argument("--ecos", type=int, default=2000, help="mock ECOs seeded")
+    parser.add_argument("--sqlite-ecos", type=int, default=2000, help="SQLite ECOs seeded")
+    parser.add_argument("--model-latency-ms", type=float, default=50)
+    parser.add_argument("--warm-ai", action="store_true", help="keep the AI cache between scenarios")
+    parser.add_argument("--tracemalloc", action="store_true", help="also report Python heap growth (slower)")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="compare with a previous --json file")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args()
+
+    prefixes = [p for p in args.routes.split(",") if p]
+    names = [n for n in SCENARIOS if not prefixes or n.startswith(tuple(prefixes))]
+    levels = [int(c) for c in args.concurrency.split(",")]
+
+    install_stub_model(args.model_latency_ms)
+    ctx = seed(args.ecos, args.sqlite_ecos)
+    print(f"{len(names)} scenarios × {levels} concurrency × {args.requests} requests, "
+          f"{args.ecos} ECOs seeded, model stub {args.model_latency_ms} ms")
+
+    results = {}
+    if args.mode in ("inproc", "both"):
+        results["inproc"] = asyncio.run(bench_in_process(ctx, names, levels, args.requests,
+                                                         args.warm_ai, args.tracemalloc))
+    if args.mode in ("http", "both"):
+        results["http"] = asyncio.run(bench_http(ctx, names, levels, args.requests,
+                                                 args.warm_ai, args.tracemalloc))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"\nresults written to {args.json}")
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,100 @@
+# bench_startup.py — Cold-start time of the journaled mock Teamcenter
+#
+#   python bench_startup.py --ecos 100000 --items 3 --tail 2000
+#
+# Writes --ecos ECOs (plus one status change each for a tenth of them)
+# through mock_teamcenter with the journal on, then restores a fresh store:
+#   naive     replay every journal line through put()/update(), no snapshot
+#   journal   Journal.restore() with no snapshot (batched creates → store.load)
+#   snapshot  Journal.restore() from a snapshot + a --tail entry journal tail
+
+import argparse
+import glob
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import mock_teamcenter
+from eco_journal import SNAPSHOT_FILE, Journal
+from eco_store import EcoStore
+
+
+def populate(ecos, items, chunk=10000):
+    for start in range(0, ecos, chunk):
+        mock_teamcenter.create_ecos_bulk([
+            {
+                "properties": {"object_name": f"Bench ECO {i}", "object_desc": "Generated by bench_startup.py"},
+                "impacted_items": [{"item": f"A{i % 5000:05d}-{j}", "impact": ("High", "Medium", "Low")[j % 3]}
+                                   for j in range(items)],
+            }
+            for i in range(start, min(start + chunk, ecos))
+        ])
+    for uid in mock_teamcenter.MOCK_DB.uids()[::10]:
+        mock_teamcenter.update_eco_status(uid, "promote")
+
+
+def naive_replay(directory):
+    store = EcoStore()
+    for path in sorted(glob.glob(os.path.join(directory, "journal-*.log"))):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                seq, op, *args = json.loads(line)
+                if op in ("create", "put"):
+                    store.put(args[0])
+                elif op == "update":
+                    store.update(args[0], args[1], **args[2])
+    return store
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def dir_size(directory, pattern):
+    return sum(os.path.getsize(p) for p in glob.glob(os.path.join(directory, pattern)))
+
+
+def run(ecos, items, tail):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        live, journal_only = os.path.join(tmp, "live"), os.path.join(tmp, "journal_only")
+        mock_teamcenter.open_journal(live)
+        mock_teamcenter.JOURNAL.snapshot_every = 1 << 62     # snapshot by hand below
+        populate(ecos, items)
+        shutil.copytree(live, journal_only)
+        journal_mb = dir_size(live, "journal-*.log") / 1e6
+
+        mock_teamcenter.JOURNAL.snapshot()
+        uids = mock_teamcenter.MOCK_DB.uids()
+        for i in range(tail):
+            mock_teamcenter.add_impacted_item(uids[i % len(uids)], f"TAIL-{i}")
+        snapshot_mb = dir_size(live, SNAPSHOT_FILE) / 1e6
+        expected = len(mock_teamcenter.MOCK_DB)
+
+        seconds, store = timed(lambda: naive_replay(journal_only))
+        results["naive"] = (seconds, len(store))
+        for label, directory in (("journal", journal_only), ("snapshot", live)):
+            store = EcoStore()
+            seconds, info = timed(Journal(store, directory).restore)
+            results[label] = (seconds, len(store))
+            assert len(store) == expected, (label, len(store), expected)
+
+    print(f"{ecos} ECOs × {items} items, journal {journal_mb:.1f} MB, "
+          f"snapshot {snapshot_mb:.1f} MB + {tail} entry tail")
+    print(f"{'':10}{'startup s':>12}{'ECOs':>10}")
+    for label, (seconds, count) in results.items():
+        print(f"{label:10}{seconds:>12.2f}{count:>10}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Journal / snapshot cold-start benchmark")
+    parser.add_argument("--ecos", type=int, default=100000)
+    parser.add_argument("--items", type=int, default=3)
+    parser.add_argument("--tail", type=int, default=2000)
+    args = parser.parse_args()
+    run(args.ecos, args.items, args.tail)
@@ -0,0 +1,227 @@
+# bench_tc_client.py — Teamcenter REST client: per-call requests.post vs pooled/batched
+#
+#   python bench_tc_client.py --ecos 500 --latency-ms 20
+#
+# Runs a local stub getProperties server (HTTP/1.1 keep-alive, fixed
+# latency per request, in its own process so its handler threads don't
+# contend with the client for the GIL) and fetches the same ECOs four ways:
+#   before   – requests.post per ECO (new TCP connection each time)
+#   pooled   – TeamcenterClient.get_properties per ECO (keep-alive session)
+#   batched  – TeamcenterClient.get_many (chunked getProperties)
+#   async    – AsyncTeamcenterClient.get_properties per ECO, gathered
+#
+# Servers are started and answer a probe request before any timing starts;
+# the async row times only the gather (event loop and client are set up first).
+#
+# With --standin the requests go to tc_standin.py (mock-backed SOA endpoints,
+# seeded with --ecos ECOs) instead; --latency-spec / --error-rate / --rate-limit
+# feed its fault injection, e.g.  --standin --latency-spec lognormal:20:0.5 --error-rate 0.02
+
+import argparse
+import asyncio
+import json
+import multiprocessing as mp
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+os.environ.setdefault("TC_URL", "http://127.0.0.1")
+os.environ.setdefault("TC_USERNAME", "bench")
+os.environ.setdefault("TC_PASSWORD", "bench")
+
+import requests
+
+from teamcenter_async_client import AsyncTeamcenterClient
+from teamcenter_client import AUTH, GET_PROPERTIES_PATH, TeamcenterClient, objects_payload
+
+
+# ---------------------------------------------------------
+# Stub server
+# ---------------------------------------------------------
+class StubStats:
+    # multiprocessing.Value counters, shared with the stub process
+    connections = None
+    requests = None
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"       # keep-alive
+    disable_nagle_algorithm = True      # headers and body are separate writes
+    latency = 0.0
+
+    def setup(self):
+        super().setup()
+        with StubStats.connections.get_lock():
+            StubStats.connections.value += 1
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with StubStats.requests.get_lock():
+            StubStats.requests.value += 1
+        time.sleep(self.latency)
+
+        uids = [o["uid"] for o in body.get("objects", [])]
+        out = json.dumps({
+            "plain": uids,
+            "modelObjects": {uid: {"uid": uid, "props": {"object_name": {"uiValues": [uid]}}} for uid in uids},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    # default listen backlog is 5: the async fan-out would see dropped
+    # connections / SYN-retry stalls and measure the stub, not the client
+    request_queue_size = 128
+    daemon_threads = True
+
+
+def _serve_stub(latency, requests_counter, connections_counter, ready):
+    StubHandler.latency = latency
+    StubStats.requests, StubStats.connections = requests_counter, connections_counter
+    server = StubServer(("127.0.0.1", 0), StubHandler)
+    ready.put(server.server_address[1])
+    server.serve_forever()
+
+
+def start_stub(latency_ms):
+    """Stub server in a child process; returns (stop, url)."""
+    StubStats.requests, StubStats.connections = mp.Value("i", 0), mp.Value("i", 0)
+    ready = mp.Queue()
+    proc = mp.Process(target=_serve_stub, daemon=True,
+                      args=(latency_ms / 1000, StubStats.requests, StubStats.connections, ready))
+    proc.start()
+    port = ready.get(timeout=30)
+    return proc.terminate, f"http://127.0.0.1:{port}"
+
+
+def start_standin(ecos, latency_spec, error_rate, rate_limit):
+    """tc_standin on a uvicorn thread, seeded with `ecos` ECOs; returns (stop, url, uids)."""
+    import socket
+    import uvicorn
+    import tc_standin
+    from mock_teamcenter import create_ecos_bulk
+
+    tc_standin.FAULTS.configure(latency_spec, error_rate, rate_limit)
+    uids = create_ecos_bulk([{"properties": {"object_name": f"Bench ECO {i}"}} for i in range(ecos)])
+
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    server = uvicorn.Server(uvicorn.Config(tc_standin.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return lambda: setattr(server, "should_exit", True), f"http://127.0.0.1:{port}", uids
+
+
+def wait_ready(url, uid, timeout=30):
+    """Block until the server answers a getProperties call (first-request setup included)."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if requests.post(url, auth=AUTH, json=objects_payload([uid]), timeout=5).ok:
+                return
+        except requests.exceptions.RequestException:
+            pass
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"{url} not ready after {timeout}s")
+        time.sleep(0.05)
+
+
+def standin_counters():
+    import tc_standin
+    return tc_standin.FAULTS.stats["requests"], None
+
+
+# ---------------------------------------------------------
+# Runner
+# ---------------------------------------------------------
+def stub_counters():
+    return StubStats.requests.value, StubStats.connections.value
+
+
+def measure(label, fn, n, counters=stub_counters):
+    requests_before, connections_before = counters()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    sent, connections = counters()
+    sent -= requests_before
+    if connections is not None:
+        connections -= connections_before
+    print(f"{label:9}{elapsed:>10.2f}s{n / elapsed:>12.0f}{sent:>10}{connections if connections is not None else '-':>13}")
+    return {"seconds": elapsed, "ecos_per_sec": n / elapsed,
+            "requests": sent, "connections": connections}
+
+
+def run(ecos, latency_ms, chunk, standin=False, latency_spec=None, error_rate=0.0, rate_limit=0.0):
+    if standin:
+        stop, base_url, uids = start_standin(ecos, latency_spec or f"fixed:{latency_ms}", error_rate, rate_limit)
+        counters = standin_counters
+    else:
+        stop, base_url = start_stub(latency_ms)
+        uids = [f"ECO-{i:05d}" for i in range(ecos)]
+        counters = stub_counters
+    url = f"{base_url}{GET_PROPERTIES_PATH}"
+    wait_ready(url, uids[0])
+
+    def before():
+        for uid in uids:
+            requests.post(url, auth=AUTH, json=objects_payload([uid])).json()
+
+    def pooled():
+        with TeamcenterClient(base_url=base_url) as client:
+            for uid in uids:
+                client.get_properties(uid)
+
+    def batched():
+        with TeamcenterClient(base_url=base_url, chunk_size=chunk) as client:
+            res = client.get_many(uids)
+        assert len(res["plain"]) == ecos
+
+    # loop and client exist before the timer starts, so only the fan-out is timed
+    loop = asyncio.new_event_loop()
+    async_client = AsyncTeamcenterClient(base_url=base_url)
+
+    async def gather_all():
+        await asyncio.gather(*(async_client.get_properties(uid) for uid in uids))
+
+    def fan_out():
+        loop.run_until_complete(gather_all())
+
+    target = f"stand-in ({latency_spec or f'fixed:{latency_ms}'} ms, error_rate={error_rate}, rate_limit={rate_limit})" \
+        if standin else f"stub ({latency_ms} ms)"
+    print(f"{ecos} ECOs, {target}, chunk={chunk}")
+    print(f"{'':9}{'time':>11}{'ECOs/sec':>12}{'requests':>10}{'connections':>13}")
+    results = {
+        "before": measure("before", before, ecos, counters),
+        "pooled": measure("pooled", pooled, ecos, counters),
+        "batched": measure("batched", batched, ecos, counters),
+        "async": measure("async", fan_out, ecos, counters),
+    }
+    loop.run_until_complete(async_client.aclose())
+    loop.close()
+    stop()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teamcenter client pooling/batching benchmark")
+    parser.add_argument("--ecos", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--chunk", type=int, default=100)
+    parser.add_argument("--standin", action="store_true", help="target tc_standin instead of the stub")
+    parser.add_argument("--latency-spec", help="stand-in latency distribution, e.g. uniform:5:50")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0)
+    args = parser.parse_args()
+    run(args.ecos, args.latency_ms, args.chunk, args.standin, args.latency_spec, args.error_rate, args.rate_limit)
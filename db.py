@@ -1,6 +1,181 @@
+# db.py — SQLite persistence layer (per-thread connections, WAL mode)
+
+import os
 import sqlite3
+import threading
+from contextlib import contextmanager
+
+from metrics import FAST_BUCKETS, Histogram, traced
+
+DB_PATH = os.getenv("ECO_DB_PATH", "eco.db")
+
+# Applied once per connection. WAL lets readers run alongside the single
+# writer; synchronous=NORMAL is durable across app crashes in WAL mode.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-20000",         # ~20 MB page cache
+    "PRAGMA mmap_size=268435456",       # 256 MB
+    "PRAGMA busy_timeout=5000",
+)
+
+DB_QUERY_SECONDS = Histogram("eco_db_query_duration_seconds", "SQLite operation latency", ("op",),
+                             buckets=FAST_BUCKETS)
+
+STATEMENT_CACHE_SIZE = 256
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS eco_master (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        change_id TEXT UNIQUE,
+        title TEXT,
+        description TEXT,
+        datasets TEXT,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS eco_bom (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        change_id TEXT,
+        item TEXT,
+        impact TEXT,
+        FOREIGN KEY(change_id) REFERENCES eco_master(change_id)
+    );
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_eco_bom_change_id ON eco_bom(change_id);",
+    "CREATE INDEX IF NOT EXISTS idx_eco_bom_item ON eco_bom(item);",             # where-used
+)
+
+_local = threading.local()
+_save_listeners = []
 
-def get_db():
-    conn = sqlite3.connect("eco.db")
+
+# ---------------------------------------------------------
+# Connections
+# ---------------------------------------------------------
+def _connect(path: str):
+    # isolation_level=None → autocommit; writes use transaction() below
+    conn = sqlite3.connect(
+        path,
+        timeout=5.0,
+        isolation_level=None,
+        cached_statements=STATEMENT_CACHE_SIZE,
+    )
     conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def get_db(path: str | None = None):
+    """
+    Return this thread's connection to the database (opened on first use).
+    The connection is shared by every call on the thread — do not close it,
+    use close_db() when a script is done.
+    """
+    path = path or DB_PATH
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(path)
+    if conn is None:
+        conn = conns[path] = _connect(path)
     return conn
+
+
+def close_db(path: str | None = None):
+    """Close this thread's connection (e.g. at the end of a script)."""
+    conns = getattr(_local, "conns", {})
+    conn = conns.pop(path or DB_PATH, None)
+    if conn is not None:
+        conn.close()
+
+
+@contextmanager
+def transaction(path: str | None = None):
+    """
+    BEGIN IMMEDIATE … COMMIT on this thread's connection, ROLLBACK on error.
+    IMMEDIATE takes the write lock up front, so concurrent writers wait on
+    busy_timeout instead of failing mid-transaction.
+    """
+    conn = get_db(path)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def add_save_listener(fn):
+    """fn(change_ids) after each committed save_ecos() batch."""
+    _save_listeners.append(fn)
+
+
+def init_schema(path: str | None = None):
+    with transaction(path) as conn:
+        for statement in SCHEMA:
+            conn.execute(statement)
+
+
+# ---------------------------------------------------------
+# ECO persistence (eco_master / eco_bom)
+# ---------------------------------------------------------
+def save_eco(change_id, title, description, datasets, bom_list):
+    """Upsert one ECO and replace its BOM rows in a single transaction."""
+    save_ecos([{
+        "change_id": change_id,
+        "title": title,
+        "description": description,
+        "datasets": datasets,
+        "bom": bom_list,
+    }])
+
+
+@traced("db.save_ecos", DB_QUERY_SECONDS, op="save_ecos")
+def save_ecos(records):
+    """
+    Upsert many ECOs (dicts with change_id, title, description, datasets,
+    bom) and replace their BOM rows, all in one transaction.
+    A change_id repeated in the batch keeps its last occurrence.
+    """
+    latest = {r["change_id"]: r for r in records}
+    with transaction() as conn:
+        conn.executemany("""
+            INSERT OR REPLACE INTO eco_master (change_id, title, description, datasets)
+            VALUES (?, ?, ?, ?)
+        """, [(cid, r["title"], r["description"], ",".join(r["datasets"]))
+              for cid, r in latest.items()])
+
+        conn.executemany("DELETE FROM eco_bom WHERE change_id=?", [(cid,) for cid in latest])
+        conn.executemany("""
+            INSERT INTO eco_bom (change_id, item, impact)
+            VALUES (?, ?, ?)
+        """, [(cid, it["item"], it["impact"]) for cid, r in latest.items() for it in r["bom"]])
+
+    for fn in _save_listeners:
+        fn(list(latest))
+
+
+@traced("db.load_eco", DB_QUERY_SECONDS, op="load_eco")
+def load_eco(change_id: str):
+    """Return the ECO with its BOM, or None if it does not exist."""
+    conn = get_db()
+
+    eco = conn.execute("SELECT * FROM eco_master WHERE change_id=?", (change_id,)).fetchone()
+    if not eco:
+        return None
+
+    bom = conn.execute("SELECT item, impact FROM eco_bom WHERE change_id=?", (change_id,)).fetchall()
+
+    return {
+        "change_id": eco["change_id"],
+        "title": eco["title"],
+        "description": eco["description"],
+        "datasets": eco["datasets"].split(","),
+        "bom": [dict(row) for row in bom]
+    }
@@ -0,0 +1,226 @@
+# eco_analytics.py — Portfolio-wide impact counts and weighted risk
+#
+# Same numbers as eco_insights_utils (High/Medium/Low counts and the 3/2/1
+# weighted risk score), computed for every ECO at once instead of one ECO
+# per HTTP call:
+#   - store_impact(): vectorized pandas/NumPy over the in-memory store
+#   - sql_impact():   one GROUP BY over eco_master / eco_bom in SQLite
+
+import numpy as np
+import pandas as pd
+
+from db import DB_QUERY_SECONDS, get_db
+from metrics import traced
+
+IMPACT_LEVELS = ("High", "Medium", "Low")
+RISK_WEIGHTS = (3, 2, 1)
+
+STORE_GROUPS = ("none", "status", "creator", "period")
+SQL_GROUPS = ("none", "eco", "period")
+
+# strftime formats, shared by pandas and SQLite so both sources agree
+PERIODS = {"day": "%Y-%m-%d", "week": "%Y-W%W", "month": "%Y-%m", "year": "%Y"}
+
+
+# ---------------------------------------------------------
+# Shared helpers
+# ---------------------------------------------------------
+def _level(impact) -> int:
+    """Index into IMPACT_LEVELS; same matching rules as get_impact_counts_from_api."""
+    label = str(impact or "Low").title()
+    if "High" in label:
+        return 0
+    if "Medium" in label:
+        return 1
+    return 2
+
+
+def classify(impacts) -> np.ndarray:
+    """Impact level index per value. Only the distinct values are parsed."""
+    codes, uniques = pd.factorize(pd.Series(impacts, dtype=object))
+    levels = np.array([_level(u) for u in uniques] + [2], dtype=np.int64)
+    return levels[codes]     # missing values (code -1) pick the trailing "Low"
+
+
+def weighted_risk(counts: np.ndarray, weights=RISK_WEIGHTS) -> np.ndarray:
+    """Row-wise compute_weighted_risk() for an (n, 3) High/Medium/Low count matrix."""
+    w = np.asarray(weights, dtype=float)
+    total = np.maximum(1, counts.sum(axis=1))
+    return counts @ w / (total * w[0]) * 100
+
+
+def _check(group_by, period, weights, allowed):
+    if group_by not in allowed:
+        return {"error": f"Invalid group_by '{group_by}'", "allowed": list(allowed)}
+    if period not in PERIODS:
+        return {"error": f"Invalid period '{period}'", "allowed": list(PERIODS)}
+    if len(weights) != 3 or not weights[0] > 0:
+        return {"error": "weights must be three numbers (High, Medium, Low), High > 0"}
+    return None
+
+
+def _row(key, ecos, counts, eco_risk_sum, weights):
+    items = int(counts.sum())
+    return {
+        "key": key,
+        "ecos": int(ecos),
+        "items": items,
+        **{level: int(n) for level, n in zip(IMPACT_LEVELS, counts)},
+        "risk": round(float(weighted_risk(counts[None, :], weights)[0]), 2),
+        "mean_eco_risk": round(float(eco_risk_sum / ecos), 2) if ecos else 0.0,
+    }
+
+
+def _summary(source, group_by, period, weights, keys, ecos, counts, eco_risk_sum):
+    """
+    keys[g], ecos[g], counts[g] (High/Medium/Low) and eco_risk_sum[g] per
+    group → response dict. `risk` weighs every item equally; `mean_eco_risk`
+    averages the per-ECO scores, so one huge ECO does not dominate it.
+    """
+    ecos = np.asarray(ecos, dtype=np.int64)
+    counts = np.asarray(counts, dtype=np.int64).reshape(-1, 3)
+    eco_risk_sum = np.asarray(eco_risk_sum, dtype=float)
+    return {
+        "source": source,
+        "group_by": group_by,
+        "period": period if group_by == "period" else None,
+        "weights": list(weights),
+        "totals": _row("all", ecos.sum(), counts.sum(axis=0), eco_risk_sum.sum(), weights),
+        "groups": [
+            _row(k, ecos[g], counts[g], eco_risk_sum[g], weights)
+            for g, k in enumerate(keys)
+        ],
+    }
+
+
+# ---------------------------------------------------------
+# In-memory store (mock Teamcenter) — pandas / NumPy
+# ---------------------------------------------------------
+def _group_labels(ecos: dict, group_by: str, period: str) -> pd.Series:
+    n = len(ecos["eco_uid"])
+    if group_by == "none":
+        return pd.Series(["all"] * n, dtype=object)
+    if group_by == "status":
+        # lifecycle state: "Promoted to Rev C" and "Promoted to Rev B" group together
+        return pd.Series(ecos["status"], dtype=object).fillna("Unknown").str.split(" ", n=1).str[0]
+    if group_by == "creator":
+        return pd.Series(ecos["creator"], dtype=object).fillna("Unknown")
+    created = pd.to_datetime(pd.Series(ecos["created_at"], dtype=object), errors="coerce")
+    return created.dt.strftime(PERIODS[period]).fillna("Unknown")
+
+
+def _eco_counts(n: int, items: dict) -> np.ndarray:
+    """(n, 3) High/Medium/Low counts per ECO position."""
+    flat = np.asarray(items["eco"], dtype=np.int64) * 3 + classify(items["impact"])
+    return np.bincount(flat, minlength=n * 3).reshape(n, 3)
+
+
+def store_impact(store, group_by: str = "none", period: str = "month", weights=RISK_WEIGHTS):
+    """
+    Impact counts and weighted risk over every ECO in the store, grouped by
+    lifecycle status, creator or creation period. One pass over a columnar
+    snapshot; no per-ECO dict copies.
+    """
+    error = _check(group_by, period, weights, STORE_GROUPS)
+    if error:
+        return error
+
+    ecos, items = store.columns()
+    n = len(ecos["eco_uid"])
+    per_eco = _eco_counts(n, items)
+
+    codes, keys = pd.factorize(_group_labels(ecos, group_by, period), sort=True)
+    g = len(keys)
+    counts = np.column_stack([np.bincount(codes, weights=per_eco[:, j], minlength=g) for j in range(3)])
+
+    return _summary(
+        "store", group_by, period, weights, list(keys),
+        np.bincount(codes, minlength=g),
+        counts,
+        np.bincount(codes, weights=weighted_risk(per_eco, weights), minlength=g),
+    )
+
+
+def store_riskiest(store, limit: int = 10, weights=RISK_WEIGHTS):
+    """The `limit` ECOs with the highest weighted risk (ties: more items first)."""
+    ecos, items = store.columns(("eco_uid", "title", "status", "creator"))
+    n = len(ecos["eco_uid"])
+    if n == 0:
+        return {"weights": list(weights), "ecos": []}
+
+    per_eco = _eco_counts(n, items)
+    risk = weighted_risk(per_eco, weights)
+    order = np.lexsort((-per_eco.sum(axis=1), -risk))[:limit]
+
+    return {
+        "weights": list(weights),
+        "ecos": [
+            {
+                **{f: ecos[f][i] for f in ("eco_uid", "title", "status", "creator")},
+                "items": int(per_eco[i].sum()),
+                **{level: int(c) for level, c in zip(IMPACT_LEVELS, per_eco[i])},
+                "risk": round(float(risk[i]), 2),
+            }
+            for i in order
+        ],
+    }
+
+
+# ---------------------------------------------------------
+# SQLite (eco_master / eco_bom) — one aggregate query
+# ---------------------------------------------------------
+_SQL_KEYS = {
+    "none": "'all'",
+    "eco": "m.change_id",
+    "period": "COALESCE(strftime(:fmt, m.created_at), 'Unknown')",
+}
+
+# LIKE is case-insensitive for ASCII, matching the title-casing in _level()
+_SQL_IMPACT = """
+    WITH per_eco AS (
+        SELECT {key} AS key,
+               COUNT(b.id) AS items,
+               SUM(CASE WHEN b.impact LIKE '%high%' THEN 1 ELSE 0 END) AS high,
+               SUM(CASE WHEN b.impact LIKE '%high%' THEN 0
+                        WHEN b.impact LIKE '%medium%' THEN 1 ELSE 0 END) AS medium
+        FROM eco_master m
+        LEFT JOIN eco_bom b ON b.change_id = m.change_id
+        GROUP BY m.change_id
+    )
+    SELECT key,
+           COUNT(*) AS ecos,
+           SUM(high) AS high,
+           SUM(medium) AS medium,
+           SUM(items - high - medium) AS low,
+           SUM((high * :w_high + medium * :w_med + (items - high - medium) * :w_low) * 100.0
+               / (MAX(1, items) * :w_high)) AS eco_risk_sum
+    FROM per_eco
+    GROUP BY key
+    ORDER BY key
+"""
+
+
+@traced("db.impact_summary", DB_QUERY_SECONDS, op="impact_summary")
+def sql_impact(group_by: str = "none", period: str = "month", weights=RISK_WEIGHTS):
+    """
+    Impact counts and weighted risk for the SQLite ECOs (POST /eco/create),
+    aggregated by SQLite in one GROUP BY; group per ECO or per period.
+    """
+    error = _check(group_by, period, weights, SQL_GROUPS)
+    if error:
+        return error
+
+    rows = get_db().execute(_SQL_IMPACT.format(key=_SQL_KEYS[group_by]), {
+        "fmt": PERIODS[period],
+        "w_high": weights[0],
+        "w_med": weights[1],
+        "w_low": weights[2],
+    }).fetchall()
+
+    return _summary(
+        "sql", group_by, period, weights,
+        [r["key"] for r in rows],
+        [r["ecos"] for r in rows],
+        [(r["high"], r["medium"], r["low"]) for r in rows],
+        [r["eco_risk_sum"] for r in rows],
+    )
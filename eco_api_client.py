@@ -0,0 +1,179 @@
+# eco_api_client.py — Backend client for the Streamlit dashboard
+#
+# Streamlit reruns the whole script on every widget change, so every read
+# here goes through st.cache_data (short TTL) and one pooled session.
+# Mutations clear the read caches so the next rerun shows fresh data.
+
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+API_BASE = os.getenv("ECO_API_BASE", "http://127.0.0.1:8000")
+
+API_TIMEOUT = (3.05, float(os.getenv("UI_API_TIMEOUT", 30)))   # (connect, read) seconds
+STREAM_TIMEOUT = (5, 300)
+UPLOAD_TIMEOUT = (3.05, 300)
+
+READ_TTL = int(os.getenv("UI_CACHE_TTL", 30))       # ECO details, lists, analytics
+KPI_TTL = int(os.getenv("UI_KPI_TTL", 5))           # header counters
+PREFETCH_WORKERS = 4
+
+
+# ---------------------------------------------------------
+# Transport
+# ---------------------------------------------------------
+@st.cache_resource
+def session() -> requests.Session:
+    """One keep-alive connection pool per Streamlit server process."""
+    s = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    return s
+
+
+def _fetch(path: str, params: tuple) -> dict:
+    r = session().get(f"{API_BASE}{path}", params=list(params), timeout=API_TIMEOUT)
+    return r.json()
+
+
+# Failures raise, so they are not cached; get_json() turns them into {"error"}.
+@st.cache_data(ttl=READ_TTL, show_spinner=False)
+def _cached_get(path: str, params: tuple) -> dict:
+    return _fetch(path, params)
+
+
+@st.cache_data(ttl=KPI_TTL, show_spinner=False)
+def _cached_get_kpi(path: str, params: tuple) -> dict:
+    return _fetch(path, params)
+
+
+def get_json(path: str, params: dict | None = None, ttl: str = "read") -> dict:
+    key = tuple(sorted((k, v) for k, v in (params or {}).items() if v is not None))
+    getter = _cached_get_kpi if ttl == "kpi" else _cached_get
+    try:
+        return getter(path, key)
+    except (requests.RequestException, ValueError) as e:
+        return {"error": f"Backend unavailable: {e}"}
+
+
+def invalidate():
+    """Drop every cached read (called after any mutation)."""
+    _cached_get.clear()
+    _cached_get_kpi.clear()
+
+
+def _post(path: str, timeout=API_TIMEOUT, **kwargs) -> dict:
+    try:
+        r = session().post(f"{API_BASE}{path}", timeout=timeout, **kwargs)
+        return r.json()
+    except (requests.RequestException, ValueError) as e:
+        return {"error": f"Backend unavailable: {e}"}
+    finally:
+        invalidate()
+
+
+# ---------------------------------------------------------
+# Reads (cached)
+# ---------------------------------------------------------
+def get_kpis() -> dict:
+    return get_json("/kpi", ttl="kpi")
+
+
+def get_eco(eco_uid: str) -> dict:
+    return get_json(f"/tc/eco/{eco_uid}")
+
+
+def list_ecos(limit: int = 100, cursor: str | None = None, fields: str | None = None,
+              uid_prefix: str | None = None) -> dict:
+    return get_json("/tc/eco/all", {
+        "limit": limit,
+        "cursor": cursor,
+        "fields": fields,
+        "uid_prefix": uid_prefix or None,
+    })
+
+
+def search_ecos(q: str, limit: int = 20, cursor: int | None = None, source: str = "store") -> dict:
+    return get_json("/tc/eco/search", {"q": q, "limit": limit, "cursor": cursor or None, "source": source})
+
+
+def get_portfolio_impact(group_by: str = "none", period: str = "month") -> dict:
+    return get_json("/analytics/impact", {"group_by": group_by, "period": period})
+
+
+def get_riskiest(limit: int = 10) -> dict:
+    return get_json("/analytics/riskiest", {"limit": limit})
+
+
+def prefetch(*calls):
+    """
+    Run independent reads concurrently, e.g.
+        kpi, page = prefetch((get_kpis,), (list_ecos, 100))
+    Results land in the cache too, so the tabs' own calls are hits.
+    """
+    ctx = get_script_run_ctx()
+
+    def run(call):
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+        fn, *args = call
+        return fn(*args)
+
+    with ThreadPoolExecutor(max_workers=min(PREFETCH_WORKERS, len(calls) or 1)) as pool:
+        return list(pool.map(run, calls))
+
+
+# ---------------------------------------------------------
+# Mutations (invalidate the read caches)
+# ---------------------------------------------------------
+def create_eco(payload: dict) -> dict:
+    return _post("/tc/eco/create", json=payload)
+
+
+def update_status(eco_uid: str, action: str) -> dict:
+    return _post(f"/tc/eco/{eco_uid}/status", params={"action": action})
+
+
+def add_item(eco_uid: str, item_uid: str) -> dict:
+    return _post(f"/tc/eco/{eco_uid}/add_item/{item_uid}")
+
+
+def remove_item(eco_uid: str, item_uid: str) -> dict:
+    return _post(f"/tc/eco/{eco_uid}/remove_item/{item_uid}")
+
+
+def attach(eco_uid: str, filename: str, fileobj, content_type: str | None) -> dict:
+    return _post(
+        f"/tc/eco/{eco_uid}/attach",
+        timeout=UPLOAD_TIMEOUT,
+        files={"file": (filename, fileobj, content_type or "application/octet-stream")},
+    )
+
+
+def attachment_url(eco_uid: str, sha256: str) -> str:
+    return f"{API_BASE}/tc/eco/{eco_uid}/attachments/{sha256}"
+
+
+# ---------------------------------------------------------
+# Streaming (never cached)
+# ---------------------------------------------------------
+def stream_text(path: str):
+    """Yield the text of each SSE `chunk` event as it arrives (for st.write_stream)."""
+    with session().get(f"{API_BASE}{path}", stream=True, timeout=STREAM_TIMEOUT) as r:
+        event = None
+        for line in r.iter_lines(decode_unicode=True):
+            if line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:"):
+                data = json.loads(line[5:])
+                if event == "chunk":
+                    yield data.get("text", "")
+                elif event == "error":
+                    yield f"❌ {data.get('error', 'Request failed')}"
@@ -0,0 +1,163 @@
+# eco_batch.py — Pack many ECOs into one Gemini call and split the answers back out
+
+import json
+import os
+
+from eco_prompts import summary_prompt
+from gemini_client import (
+    MAX_REQUESTS_PER_MIN,
+    ask_gemini_async,
+    cache_lookup,
+    cache_store,
+    has_capacity,
+    is_error_reply,
+)
+from mock_teamcenter import get_eco_details
+
+# Prompt budget per model call. ~4 characters per token is the usual
+# rule of thumb for English text; good enough for packing.
+BATCH_TOKEN_BUDGET = int(os.getenv("SUMMARY_BATCH_TOKEN_BUDGET", 8000))
+MIN_TOKEN_BUDGET = 256
+MAX_TOKEN_BUDGET = 200_000
+CHARS_PER_TOKEN = 4
+MAX_BATCH_IDS = 500
+# Rate-limiter tokens batches leave for interactive summarize/impact calls
+BATCH_RESERVE_TOKENS = min(int(os.getenv("SUMMARY_BATCH_RESERVE_TOKENS", 2)), MAX_REQUESTS_PER_MIN - 1)
+
+DEFERRED_REPLY = "⛔ AI rate limit reached before this ECO's batch; try again in a minute."
+
+BATCH_INSTRUCTIONS = """
+Summarize each of the following Engineering Change Orders clearly.
+Return ONLY a JSON object of the form
+{"summaries": [{"eco_id": "<eco_id>", "summary": "<summary>"}]}
+with exactly one entry per ECO, using the eco_id values given.
+
+ECOs:
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _eco_block(eco: dict) -> str:
+    return json.dumps({
+        "eco_id": eco["eco_uid"],
+        "title": eco.get("title"),
+        "description": eco.get("description"),
+        "revision": eco.get("revision"),
+        "status": eco.get("status"),
+    }, ensure_ascii=False)
+
+
+def pack(ecos: list, token_budget: int) -> list:
+    """
+    Greedily group ECOs so each prompt stays within token_budget.
+    An ECO that alone exceeds the budget still gets its own prompt.
+    """
+    base = estimate_tokens(BATCH_INSTRUCTIONS)
+    batches, current, used = [], [], base
+    for eco in ecos:
+        cost = estimate_tokens(_eco_block(eco)) + 1
+        if current and used + cost > token_budget:
+            batches.append(current)
+            current, used = [], base
+        current.append(eco)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def batch_prompt(ecos: list) -> str:
+    return BATCH_INSTRUCTIONS + "\n".join(_eco_block(eco) for eco in ecos)
+
+
+def parse_batch_reply(text: str) -> dict:
+    """eco_id → summary from the model's JSON reply (tolerates ``` fences)."""
+    body = text.strip()
+    if body.startswith("```"):
+        body = body.split("\n", 1)[1] if "\n" in body else ""
+        body = body.rsplit("```", 1)[0]
+    data = json.loads(body)
+    entries = data.get("summaries", []) if isinstance(data, dict) else data
+    return {
+        str(e["eco_id"]): str(e["summary"])
+        for e in entries
+        if isinstance(e, dict) and "eco_id" in e and "summary" in e
+    }
+
+
+async def _run_batch(ecos: list) -> list:
+    reply = await ask_gemini_async(
+        batch_prompt(ecos),
+        generation_config={"response_mime_type": "application/json"},
+    )
+    if is_error_reply(reply):
+        return [{"eco_id": eco["eco_uid"], "error": reply} for eco in ecos]
+
+    try:
+        summaries = parse_batch_reply(reply)
+    except (ValueError, AttributeError):
+        return [{"eco_id": eco["eco_uid"], "error": "Unparseable batch reply"} for eco in ecos]
+
+    results = []
+    for eco in ecos:
+        summary = summaries.get(eco["eco_uid"])
+        if summary is None:
+            results.append({"eco_id": eco["eco_uid"], "error": "Missing from batch reply"})
+            continue
+        # Cached under the single-ECO prompt, so /eco/{id}/summarize hits too
+        await cache_store(summary_prompt(eco), summary, eco["eco_uid"], eco.get("updated_at"))
+        results.append({"eco_id": eco["eco_uid"], "summary": summary, "cached": False})
+    return results
+
+
+async def summarize_batch(eco_ids: list, token_budget: int | None = None):
+    """
+    Summaries for many ECOs: cache hits are served directly, the rest are
+    packed into as few model calls as the token budget allows.
+    """
+    if len(eco_ids) > MAX_BATCH_IDS:
+        return {"error": f"At most {MAX_BATCH_IDS} ECO ids per batch"}
+    if token_budget is None:
+        token_budget = BATCH_TOKEN_BUDGET
+    elif (isinstance(token_budget, bool) or not isinstance(token_budget, int)
+          or not MIN_TOKEN_BUDGET <= token_budget <= MAX_TOKEN_BUDGET):
+        return {"error": f"'token_budget' must be an integer in {MIN_TOKEN_BUDGET}..{MAX_TOKEN_BUDGET}"}
+
+    results = {}
+    todo = []
+
+    for eco_id in dict.fromkeys(eco_ids):   # dedupe, keep order
+        eco = get_eco_details(eco_id)
+        if "error" in eco:
+            results[eco_id] = {"eco_id": eco_id, "error": "ECO not found"}
+            continue
+        cached = await cache_lookup(summary_prompt(eco), eco_id, eco.get("updated_at"))
+        if cached is not None:
+            results[eco_id] = {"eco_id": eco_id, "summary": cached, "cached": True}
+        else:
+            todo.append(eco)
+
+    # One call at a time, and only while the shared rate limiter keeps
+    # BATCH_RESERVE_TOKENS back: an interactive call finding the bucket dry
+    # would open the circuit breaker for every caller.
+    batches = pack(todo, token_budget)
+    model_calls = 0
+    for n, batch in enumerate(batches):
+        if not has_capacity(reserve=BATCH_RESERVE_TOKENS):
+            for eco in (eco for b in batches[n:] for eco in b):
+                results[eco["eco_uid"]] = {"eco_id": eco["eco_uid"], "error": DEFERRED_REPLY}
+            break
+        model_calls += 1
+        for r in await _run_batch(batch):
+            results[r["eco_id"]] = r
+
+    ordered = [results[eco_id] for eco_id in dict.fromkeys(eco_ids)]
+    return {
+        "results": ordered,
+        "model_calls": model_calls,
+        "cached": sum(1 for r in ordered if r.get("cached")),
+        "failed": sum(1 for r in ordered if "error" in r),
+    }
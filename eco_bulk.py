@@ -0,0 +1,255 @@
+# eco_bulk.py — Streaming bulk ECO ingest (NDJSON or JSON array)
+
+import codecs
+import json
+import re
+
+from starlette.concurrency import run_in_threadpool
+
+from db import save_ecos
+from eco_validation import validate_mock_record, validate_sqlite_record
+from mock_teamcenter import create_ecos_bulk
+
+BATCH_SIZE = 500
+MAX_RECORD_CHARS = 1 << 20      # longest single record buffered while parsing
+
+
+# ---------------------------------------------------------
+# Incremental parsing
+# ---------------------------------------------------------
+async def iter_records(chunks):
+    """
+    Yield (index, record, error) from an async stream of byte chunks.
+
+    The body may be NDJSON (one ECO per line) or a single JSON array; the
+    first non-blank byte decides. Records are decoded as soon as they are
+    complete, so the body is never held in memory as a whole. A malformed
+    record is reported under its own index and parsing carries on after it;
+    a record longer than MAX_RECORD_CHARS is skipped without being buffered.
+    Anything but whitespace after the array's closing "]" is an error.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")(errors="replace")   # chunks may split characters
+    buf = ""
+    mode = None     # "ndjson" | "array"
+    index = 0
+    done = False
+    trailing = False    # non-whitespace after the array's closing "]"
+    scan = _ArrayScan()
+
+    async for chunk in chunks:
+        buf += utf8.decode(chunk)
+
+        if mode is None:
+            stripped = buf.lstrip()
+            if not stripped:
+                continue
+            mode = "array" if stripped[0] == "[" else "ndjson"
+            buf = stripped[1:] if mode == "array" else stripped
+
+        if mode == "ndjson":
+            *lines, buf = buf.split("\n")
+            for line in lines:
+                if scan.oversized:
+                    scan.oversized = False
+                    yield index, None, f"Record exceeds {MAX_RECORD_CHARS} characters"
+                    index += 1
+                elif line.strip():
+                    yield (index, *_decode_line(line))
+                    index += 1
+            if len(buf) > MAX_RECORD_CHARS:
+                scan.oversized, buf = True, ""
+            continue
+
+        if done:
+            trailing = trailing or bool(buf.strip())
+            buf = ""
+            continue
+
+        # JSON array: decode whole elements; one that does not decode is
+        # scanned to its end, then decoded alone (error) or once complete
+        while not done:
+            if scan.pos is None:
+                pos = _skip_separators(buf)
+                if pos == len(buf):
+                    buf = ""
+                    break
+                if buf[pos] == "]":
+                    done = True
+                    trailing = bool(buf[pos + 1:].strip())
+                    buf = ""
+                    break
+                buf = buf[pos:]
+                try:
+                    record, end = decoder.raw_decode(buf)
+                except json.JSONDecodeError:
+                    end = None
+                if end is None or end == len(buf):
+                    scan.start()            # malformed, or not complete yet (12|34 split)
+                else:
+                    yield index, record, None
+                    index += 1
+                    buf = buf[end:]
+                    continue
+            end = scan.feed(buf)
+            if end is None:                 # element not complete yet
+                if scan.pos > MAX_RECORD_CHARS:
+                    buf = buf[scan.pos:]    # keep scanning, stop buffering
+                    scan.pos, scan.oversized = 0, True
+                break
+            text, buf = buf[:end], buf[end:]
+            if scan.oversized:
+                yield index, None, f"Record exceeds {MAX_RECORD_CHARS} characters"
+            else:
+                yield (index, *_decode_line(text))
+            index += 1
+            scan.pos = None
+
+    # end of stream
+    if mode == "ndjson" and (buf.strip() or scan.oversized):
+        if scan.oversized:
+            yield index, None, f"Record exceeds {MAX_RECORD_CHARS} characters"
+        else:
+            yield (index, *_decode_line(buf))
+    elif mode == "array" and not done:
+        yield index, None, "Truncated JSON array"
+    elif trailing:
+        yield index, None, "Unexpected data after JSON array"
+
+
+_STRUCTURE = re.compile(r'["{}\[\],]')
+_STRING_END = re.compile(r'["\\]')
+
+
+class _ArrayScan:
+    """
+    Finds the end of one JSON array element across chunks without decoding
+    it: tracks bracket depth and string state, so each character is looked
+    at once (re-decoding a growing buffer on every chunk would be quadratic).
+    """
+
+    def __init__(self):
+        self.pos = None         # scan position in the buffer, None between elements
+        self.oversized = False
+
+    def start(self):
+        self.pos, self.depth, self.in_string, self.oversized = 0, 0, False, False
+
+    def feed(self, buf):
+        """End offset of the element in buf, or None if it continues."""
+        pos = self.pos
+        while True:
+            if self.in_string:
+                m = _STRING_END.search(buf, pos)
+                if m is None:
+                    self.pos = len(buf)
+                    return None
+                if m.group() == "\\":
+                    if m.end() == len(buf):     # escaped char is in the next chunk
+                        self.pos = m.start()
+                        return None
+                    pos = m.end() + 1
+                    continue
+                self.in_string, pos = False, m.end()
+                continue
+            m = _STRUCTURE.search(buf, pos)
+            if m is None:
+                self.pos = len(buf)
+                return None
+            ch, pos = m.group(), m.end()
+            if ch == '"':
+                self.in_string = True
+            elif ch in "{[":
+                self.depth += 1
+            elif ch == "," and self.depth == 0:
+                return m.start()
+            elif ch in "}]":
+                if self.depth == 0:
+                    if ch == "]":               # the array's own "]" ends a scalar element
+                        return m.start()
+                    continue                    # stray "}": decoding reports it
+                self.depth -= 1
+                if self.depth == 0:
+                    return pos
+
+
+def _skip_separators(buf):
+    pos = 0
+    while pos < len(buf) and (buf[pos].isspace() or buf[pos] == ","):
+        pos += 1
+    return pos
+
+
+def _decode_line(line):
+    try:
+        return json.loads(line), None
+    except json.JSONDecodeError as e:
+        return None, f"Invalid JSON: {e.msg}"
+
+
+# ---------------------------------------------------------
+# Batch writers (run in the threadpool)
+# ---------------------------------------------------------
+def _write_mock(records):
+    return [{"eco_uid": uid} for uid in create_ecos_bulk(records)]
+
+
+def _write_sqlite(records):
+    save_ecos(records)
+    return [{"change_id": r["change_id"]} for r in records]
+
+
+BACKENDS = {
+    "mock": (validate_mock_record, _write_mock),
+    "sqlite": (validate_sqlite_record, _write_sqlite),
+}
+
+
+async def ingest(chunks, backend: str = "mock", batch_size: int = BATCH_SIZE):
+    """
+    Validate and write a streamed batch of ECOs.
+    Valid records are written in transactions of batch_size; a failing batch
+    marks only its own records as failed.
+    """
+    if backend not in BACKENDS:
+        return {"error": f"Unknown backend '{backend}'", "allowed": list(BACKENDS)}
+
+    validate, write = BACKENDS[backend]
+    results = []
+    pending = []    # [(index, record)]
+
+    async def flush():
+        if not pending:
+            return
+        batch = list(pending)
+        pending.clear()
+        try:
+            written = await run_in_threadpool(write, [r for _, r in batch])
+        except Exception as e:
+            results.extend({"index": i, "status": "error", "error": f"write failed: {e}"}
+                           for i, _ in batch)
+            return
+        results.extend({"index": i, "status": "created", **out}
+                       for (i, _), out in zip(batch, written))
+
+    async for index, record, error in iter_records(chunks):
+        error = error or validate(record)
+        if error:
+            results.append({"index": index, "status": "error", "error": error})
+            continue
+        pending.append((index, record))
+        if len(pending) >= batch_size:
+            await flush()
+    await flush()
+
+    results.sort(key=lambda r: r["index"])
+    created = sum(1 for r in results if r["status"] == "created")
+
+    return {
+        "status": "success" if created == len(results) else "partial",
+        "backend": backend,
+        "received": len(results),
+        "created": created,
+        "failed": len(results) - created,
+        "results": results,
+    }
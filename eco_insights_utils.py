@@ -1,15 +1,12 @@
 # eco_insights_utils.py — Helper functions for Royal Premium Insights Dashboard
 
 import math
-import requests
 import altair as alt
 import pandas as pd
 import streamlit.components.v1 as components
 from typing import Dict
 
-
-API_BASE = "http://127.0.0.1:8000"
-
+import eco_api_client as api
 
 
 # ------- THEME COLORS -------
@@ -32,8 +29,7 @@ def get_impact_counts_from_api(eco_uid: str = None) -> Dict[str, int]:
     if not eco_uid:
         return sample
     try:
-        r = requests.get(f"{API_BASE}/tc/eco/{eco_uid}")
-        data = r.json()
+        data = api.get_eco(eco_uid)
         items = data.get("impacted_items") or data.get("items") or []
         counts = {"High": 0, "Medium": 0, "Low": 0}
         for it in items:
@@ -52,6 +48,17 @@ def get_impact_counts_from_api(eco_uid: str = None) -> Dict[str, int]:
         return sample
 
 
+# ------- FETCH PORTFOLIO ANALYTICS -------
+def get_portfolio_impact(group_by: str = "none", period: str = "month") -> Dict:
+    """Org-wide counts and risk from /analytics/impact; None if unavailable."""
+    data = api.get_portfolio_impact(group_by, period)
+    return data if "totals" in data else None
+
+
+def get_riskiest_ecos(limit: int = 10) -> list:
+    return api.get_riskiest(limit).get("ecos", [])
+
+
 # ------- COMPUTE RISK SCORE -------
 def compute_weighted_risk(counts: Dict[str, int], weights=(3, 2, 1)) -> float:
     high, med, low = counts["High"], counts["Medium"], counts["Low"]
@@ -181,3 +188,21 @@ def donut_chart(df_counts: pd.DataFrame):
         ),
         tooltip=["impact", "count"]
     ).properties(width=360, height=360)
+
+
+# ------- GROUPED (STACKED) BAR CHART -------
+def group_chart(df_groups: pd.DataFrame):
+    """df_groups: one row per (key, impact) with a count column."""
+    return alt.Chart(df_groups).mark_bar().encode(
+        x=alt.X("key:N", title=None, sort=None),
+        y=alt.Y("count:Q", stack="zero"),
+        color=alt.Color(
+            "impact:N",
+            sort=["High", "Medium", "Low"],
+            scale=alt.Scale(
+                domain=["High", "Medium", "Low"],
+                range=[THEME["gold"], THEME["gold_deep"], THEME["muted"]]
+            )
+        ),
+        tooltip=["key", "impact", "count"]
+    ).properties(height=300)
@@ -0,0 +1,172 @@
+# eco_jobs.py — Background job queue for long-running AI work (impact analysis)
+
+import asyncio
+import os
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+JOB_WORKERS = int(os.getenv("IMPACT_JOB_WORKERS", 2))
+JOB_QUEUE_SIZE = int(os.getenv("IMPACT_JOB_QUEUE_SIZE", 100))
+JOB_RETENTION = int(os.getenv("IMPACT_JOB_RETENTION", 1000))     # finished jobs kept for polling
+
+FINISHED = ("succeeded", "failed", "cancelled")
+
+
+def _now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+class JobManager:
+    """
+    Bounded asyncio worker pool fed by a bounded queue.
+
+    Jobs are coroutine factories; their return value becomes the job result.
+    Finished jobs are kept (up to `retention`) for polling, and waiters can
+    await completion for push notification.
+    Workers start lazily on the first submit, inside the running event loop;
+    shutdown() stops them, so a later loop (app restart, tests) starts afresh.
+    """
+
+    def __init__(self, workers=JOB_WORKERS, queue_size=JOB_QUEUE_SIZE, retention=JOB_RETENTION):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.retention = retention
+        self.jobs = OrderedDict()   # job_id → job dict
+        self._queue = None
+        self._workers = []
+        self._running = {}          # job_id → asyncio.Task
+        self._cancel_requested = set()
+        self._done = {}             # job_id → asyncio.Event
+        self._closing = False
+
+    # ---------------------------------------------------------
+    # Workers
+    # ---------------------------------------------------------
+    def _ensure_started(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def _worker(self):
+        while True:
+            job_id, factory = await self._queue.get()
+            job = self.jobs.get(job_id)
+            if job is None or job["status"] != "queued":    # cancelled while queued
+                self._queue.task_done()
+                continue
+
+            job["status"] = "running"
+            job["started_at"] = _now()
+            task = asyncio.create_task(factory())
+            self._running[job_id] = task
+            try:
+                job["result"] = await task
+                job["status"] = "succeeded"
+            except asyncio.CancelledError:
+                job["status"] = "cancelled"
+                if job_id not in self._cancel_requested:
+                    if self._closing:
+                        job["error"] = "Server shutting down"
+                    raise           # the worker itself is being shut down
+            except Exception as e:
+                job["status"] = "failed"
+                job["error"] = str(e)
+            finally:
+                self._running.pop(job_id, None)
+                self._cancel_requested.discard(job_id)
+                self._finish(job_id)
+                self._queue.task_done()
+
+    def _finish(self, job_id):
+        self.jobs[job_id]["finished_at"] = _now()
+        event = self._done.pop(job_id, None)
+        if event is not None:
+            event.set()
+        self._evict()
+
+    def _evict(self):
+        finished = [jid for jid, j in self.jobs.items() if j["status"] in FINISHED]
+        for jid in finished[:max(0, len(finished) - self.retention)]:
+            del self.jobs[jid]
+
+    # ---------------------------------------------------------
+    # Public API
+    # ---------------------------------------------------------
+    def submit(self, kind: str, subject: str, factory):
+        """Queue a job; returns the job dict, or an error dict if the queue is full."""
+        self._ensure_started()
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "kind": kind,
+            "subject": subject,
+            "status": "queued",
+            "created_at": _now(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+        }
+        try:
+            self._queue.put_nowait((job_id, factory))
+        except asyncio.QueueFull:
+            return {"error": "Job queue is full, try again later", "queue_depth": self._queue.qsize()}
+
+        self.jobs[job_id] = job
+        self._done[job_id] = asyncio.Event()
+        return job
+
+    def get(self, job_id: str):
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str):
+        job = self.jobs.get(job_id)
+        if job is None:
+            return {"error": "Job not found", "job_id": job_id}
+        if job["status"] == "queued":
+            job["status"] = "cancelled"
+            self._finish(job_id)
+        elif job["status"] == "running":
+            self._cancel_requested.add(job_id)
+            self._running[job_id].cancel()
+            return {"job_id": job_id, "status": "cancelling"}
+        return {"job_id": job_id, "status": job["status"]}
+
+    async def wait(self, job_id: str, timeout: float):
+        """Wait until the job finishes (or timeout); returns the job dict."""
+        event = self._done.get(job_id)
+        if event is not None:
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.jobs.get(job_id)
+
+    async def shutdown(self):
+        """Cancel queued and running jobs and stop the workers (app shutdown)."""
+        self._closing = True
+        try:
+            queued = [jid for jid, j in self.jobs.items() if j["status"] == "queued"]
+            for job_id in queued:
+                self.jobs[job_id].update(status="cancelled", error="Server shutting down")
+                self._finish(job_id)
+            for worker in self._workers:
+                worker.cancel()     # also cancels the job task it is awaiting
+            await asyncio.gather(*self._workers, return_exceptions=True)
+        finally:
+            self._queue = None
+            self._workers = []
+            self._closing = False
+
+    def stats(self):
+        counts = {}
+        for job in self.jobs.values():
+            counts[job["status"]] = counts.get(job["status"], 0) + 1
+        return {
+            "workers": self.workers,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "queue_capacity": self.queue_size,
+            "running": len(self._running),
+            "jobs": counts,
+        }
@@ -0,0 +1,38 @@
+# eco_prompts.py — Gemini prompt templates shared by the single, batch and streaming routes
+
+
+def summary_prompt(eco: dict) -> str:
+    return f"""
+    Summarize this ECO clearly:
+
+    Title: {eco.get('title')}
+    Description: {eco.get('description')}
+    Revision: {eco.get('revision')}
+    Status: {eco.get('status')}
+    """
+
+
+def impact_prompt(eco: dict, similar=()) -> str:
+    """
+    `similar`: past ECOs from eco_similarity, quoted as precedent when given.
+    Scores are left out and precedents listed by eco_uid: the prompt is the
+    AI cache key, and scores shift with IDF whenever any ECO is created.
+    """
+    bom = eco.get("impacted_items", [])
+
+    prompt = f"""
+    Perform engineering impact analysis based on this impacted item list:
+    {bom}
+    """
+    if not similar:
+        return prompt
+
+    precedent = "\n".join(
+        f"    - {s['eco_uid']} {s.get('title')} ({s.get('status')}); "
+        f"items: {', '.join(it['item'] + '=' + str(it.get('impact')) for it in s.get('impacted_items', [])) or 'none'}"
+        for s in sorted(similar, key=lambda s: s["eco_uid"])
+    )
+    return prompt + f"""
+    Similar past ECOs — use them as precedent where relevant:
+{precedent}
+    """
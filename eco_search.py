@@ -0,0 +1,231 @@
+# eco_search.py — Full-text search over ECOs (SQLite FTS5, bm25 ranking)
+#
+# One FTS5 table indexes both ECO sources:
+#   source=store → mock Teamcenter ECOs (eco_store.EcoStore)
+#   source=sql   → SQLite ECOs (eco_master / eco_bom)
+# Writes only mark an ECO dirty (store listener / db save listener); dirty
+# ECOs are re-indexed in one transaction before the next query runs.
+
+import re
+import sqlite3
+import threading
+
+from db import DB_QUERY_SECONDS, add_save_listener, get_db, load_eco
+from metrics import traced
+
+# bm25 column weights: eco_uid, title, description, items (unindexed columns score 0)
+BM25_WEIGHTS = (5.0, 10.0, 2.0, 5.0)
+MAX_RESULTS = 200
+
+SCHEMA = """
+    CREATE VIRTUAL TABLE eco_search USING fts5(
+        eco_uid, title, description, items,
+        source UNINDEXED, status UNINDEXED, revision UNINDEXED,
+        creator UNINDEXED, updated_at UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+"""
+
+_SEARCH = f"""
+    SELECT eco_uid, source, title, status, revision, creator, updated_at,
+           snippet(eco_search, -1, '[', ']', ' … ', 12) AS snippet,
+           bm25(eco_search, {", ".join(map(str, BM25_WEIGHTS))}) AS score
+    FROM eco_search
+    WHERE eco_search MATCH ? {{source_filter}}
+    ORDER BY score
+    LIMIT ? OFFSET ?
+"""
+
+_TERMS = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def to_match(query: str) -> str | None:
+    """
+    User query → FTS5 MATCH expression.
+    "quoted text" is a phrase; every other word is a prefix term, so part
+    numbers can be typed partially (PRT-10 → "PRT-10"*). Terms are ANDed;
+    a bare OR between terms is kept as the operator.
+    """
+    parts = []
+    for phrase, word in _TERMS.findall(query or ""):
+        if phrase.strip():
+            parts.append('"' + phrase.replace('"', '""') + '"')
+        elif word == "OR" and parts and parts[-1] != "OR":
+            parts.append("OR")
+        elif word:
+            parts.append('"' + word.replace('"', '""') + '"*')
+    while parts and parts[-1] == "OR":
+        parts.pop()
+    return " ".join(parts) or None
+
+
+class SearchIndex:
+    """
+    In-memory FTS5 index, rebuilt from its sources at startup and kept
+    current incrementally. One connection, serialized by a lock.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._conn = sqlite3.connect(":memory:", check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute(SCHEMA)
+        self._rowids = {}                   # (source, eco_uid) → FTS rowid
+        self._dirty_lock = threading.Lock()
+        self._dirty = {"store": set(), "sql": set()}
+        self._store = None
+        self._db_pending = False            # SQLite ECOs not listed yet (see attach_db)
+
+    # ---------------------------------------------------------
+    # Sources
+    # ---------------------------------------------------------
+    def _mark(self, source, eco_uids):
+        with self._dirty_lock:
+            self._dirty[source].update(eco_uids)
+
+    def attach_store(self, store):
+        """Index every ECO already in the store and follow its writes."""
+        self._store = store
+        store.add_listener(lambda eco_uid: self._mark("store", (eco_uid,)))
+        self._mark("store", store.uids())
+
+    def attach_db(self):
+        """
+        Follow save_ecos(); the SQLite ECOs already saved are listed on the
+        first flush, so attaching never touches the database (import time).
+        """
+        add_save_listener(lambda change_ids: self._mark("sql", change_ids))
+        self._db_pending = True
+
+    def _list_db(self):
+        self._db_pending = False
+        try:
+            rows = get_db().execute("SELECT change_id FROM eco_master").fetchall()
+        except sqlite3.OperationalError:     # schema not created yet (init_db.py)
+            return
+        except sqlite3.DatabaseError as e:   # unreadable file: search the store only
+            print(f"⚠️ Full-text search: SQLite ECOs not indexed ({e})")
+            return
+        self._mark("sql", [r["change_id"] for r in rows])
+
+    def _store_doc(self, eco_uid):
+        eco = self._store.get(eco_uid) if self._store is not None else None
+        if eco is None:
+            return None
+        return {
+            "eco_uid": eco_uid,
+            "title": eco.get("title") or "",
+            "description": eco.get("description") or "",
+            "items": " ".join(it["item"] for it in eco.get("impacted_items", [])),
+            "status": eco.get("status"),
+            "revision": eco.get("revision"),
+            "creator": eco.get("creator"),
+            "updated_at": eco.get("updated_at"),
+        }
+
+    def _sql_doc(self, change_id):
+        eco = load_eco(change_id)
+        if eco is None:
+            return None
+        return {
+            "eco_uid": change_id,
+            "title": eco.get("title") or "",
+            "description": eco.get("description") or "",
+            "items": " ".join(b["item"] for b in eco.get("bom", [])),
+            "status": None,
+            "revision": None,
+            "creator": None,
+            "updated_at": None,
+        }
+
+    # ---------------------------------------------------------
+    # Index maintenance
+    # ---------------------------------------------------------
+    def flush(self):
+        """Re-index every ECO changed since the last flush (one transaction)."""
+        with self.lock:
+            return self._flush_locked()
+
+    @traced("search.flush", DB_QUERY_SECONDS, op="search_flush")
+    def _flush_locked(self):
+        if self._db_pending:
+            self._list_db()
+        with self._dirty_lock:
+            dirty, self._dirty = self._dirty, {"store": set(), "sql": set()}
+        if not (dirty["store"] or dirty["sql"]):
+            return 0
+
+        conn = self._conn
+        rowids = {}
+        conn.execute("BEGIN")
+        try:
+            docs = [("store", uid, self._store_doc(uid)) for uid in dirty["store"]]
+            docs += [("sql", cid, self._sql_doc(cid)) for cid in dirty["sql"]]
+            for source, uid, doc in docs:
+                rowid = self._rowids.get((source, uid))
+                if rowid is not None:
+                    conn.execute("DELETE FROM eco_search WHERE rowid = ?", (rowid,))
+                rowids[(source, uid)] = None
+                if doc is not None:
+                    cur = conn.execute("""
+                        INSERT INTO eco_search (eco_uid, title, description, items, source,
+                                                status, revision, creator, updated_at)
+                        VALUES (:eco_uid, :title, :description, :items, :source,
+                                :status, :revision, :creator, :updated_at)
+                    """, {**doc, "source": source})
+                    rowids[(source, uid)] = cur.lastrowid
+        except BaseException:
+            conn.execute("ROLLBACK")
+            for source, uids in dirty.items():     # retried on the next flush
+                self._mark(source, uids)
+            raise
+        conn.execute("COMMIT")
+
+        for key, rowid in rowids.items():
+            if rowid is None:
+                self._rowids.pop(key, None)
+            else:
+                self._rowids[key] = rowid
+        return len(rowids)
+
+    # ---------------------------------------------------------
+    # Queries
+    # ---------------------------------------------------------
+    @traced("search.query", DB_QUERY_SECONDS, op="search")
+    def search(self, query: str, limit: int = 20, offset: int = 0, source: str | None = None):
+        """
+        Ranked matches (best first). Returns {"items", "next_cursor"}, where
+        next_cursor is the offset of the next page or None.
+        """
+        match = to_match(query)
+        if match is None:
+            return {"query": query, "items": [], "next_cursor": None}
+        if source not in (None, "store", "sql"):
+            return {"error": f"Invalid source '{source}'", "allowed": ["store", "sql"]}
+
+        limit = max(1, min(limit, MAX_RESULTS))
+        sql = _SEARCH.format(source_filter="AND source = ?" if source else "")
+        params = [match, *([source] if source else []), limit + 1, max(0, offset)]
+
+        with self.lock:
+            self._flush_locked()
+            try:
+                rows = self._conn.execute(sql, params).fetchall()
+            except sqlite3.OperationalError as e:
+                return {"error": f"Invalid search query: {e}", "query": query}
+
+        items = [{**dict(r), "score": round(-r["score"], 4)} for r in rows[:limit]]
+        return {
+            "query": query,
+            "match": match,
+            "items": items,
+            "next_cursor": offset + limit if len(rows) > limit else None,
+        }
+
+    def __len__(self):
+        with self.lock:
+            self._flush_locked()
+            return len(self._rowids)
+
+
+INDEX = SearchIndex()
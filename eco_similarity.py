@@ -0,0 +1,233 @@
+# eco_similarity.py — Local similar-ECO retrieval (hashing TF-IDF, cosine)
+#
+# Each ECO becomes a sparse vector of hashed terms from its title,
+# description and impacted item UIDs. Vectors live in flat NumPy arrays
+# (row, column, tf) — a CSR-like matrix that only grows: an edited ECO's
+# old row is zeroed and a new row appended; dead rows are compacted away
+# once they make up half the matrix. IDF is applied at query time, so
+# document frequencies can change without re-weighting stored rows.
+# No model call: a query is a sparse mat-vec product (np.bincount).
+
+import os
+import re
+import threading
+import zlib
+from collections import Counter
+
+import numpy as np
+
+from metrics import FAST_BUCKETS, Histogram, traced
+
+HASH_DIM = 1 << 18
+TITLE_WEIGHT = 2
+ITEM_WEIGHT = 2
+MIN_SIMILARITY = float(os.getenv("MIN_SIMILARITY", 0.05))
+MAX_K = 50
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has in into is it of on or that the this to was were will with".split()
+)
+_WORD = re.compile(r"[a-z0-9]+(?:[-_.][a-z0-9]+)*")
+
+SIMILARITY_SECONDS = Histogram("eco_similarity_duration_seconds", "Similar-ECO index operation latency",
+                               ("op",), buckets=FAST_BUCKETS)
+
+
+# ---------------------------------------------------------
+# Features
+# ---------------------------------------------------------
+def _hash(term: str) -> int:
+    return zlib.crc32(term.encode()) & (HASH_DIM - 1)   # stable across processes, unlike hash()
+
+
+def _words(text) -> list:
+    return [w for w in _WORD.findall(str(text or "").lower()) if len(w) > 1 and w not in STOPWORDS]
+
+
+def features(eco: dict):
+    """(unique hashed columns, sublinear tf) for one ECO record."""
+    counts = Counter()
+    for w in _words(eco.get("title")):
+        counts[_hash(w)] += TITLE_WEIGHT
+    for w in _words(eco.get("description")):
+        counts[_hash(w)] += 1
+    for it in eco.get("impacted_items", []):
+        counts[_hash("item:" + str(it.get("item", "")).lower())] += ITEM_WEIGHT
+    cols = np.fromiter(counts.keys(), dtype=np.int32, count=len(counts))
+    tf = 1 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+    return cols, tf.astype(np.float32)
+
+
+# ---------------------------------------------------------
+# Index
+# ---------------------------------------------------------
+class SimilarityIndex:
+    """Append-only sparse TF matrix over the ECO store, kept current by a store listener."""
+
+    def __init__(self, capacity: int = 1 << 14):
+        self.lock = threading.Lock()
+        self._rows = np.zeros(capacity, dtype=np.int32)
+        self._cols = np.zeros(capacity, dtype=np.int32)
+        self._tf = np.zeros(capacity, dtype=np.float32)
+        self._nnz = 0
+        self._dead = 0
+        self._uids = []            # row → eco_uid, None once superseded
+        self._spans = []           # row → (start, end) in the nnz arrays
+        self._row_of = {}          # eco_uid → live row
+        self._df = np.zeros(HASH_DIM, dtype=np.int32)
+        self._idf = None           # IDF, tf·idf weights and per-row L2 norms,
+        self._weights = None       # recomputed on the first query after writes
+        self._norms = None
+        self._store = None
+        self._dirty_lock = threading.Lock()
+        self._dirty = set()
+
+    def attach_store(self, store):
+        self._store = store
+        store.add_listener(self._mark)
+        for uid in store.uids():
+            self._mark(uid)
+
+    def _mark(self, eco_uid):
+        with self._dirty_lock:
+            self._dirty.add(eco_uid)
+
+    def __len__(self):
+        with self.lock:
+            self._flush_locked()
+            return len(self._row_of)
+
+    # ---------------------------------------------------------
+    # Maintenance
+    # ---------------------------------------------------------
+    def _append(self, eco_uid, cols, tf):
+        start, end = self._nnz, self._nnz + len(cols)
+        if end > len(self._cols):
+            size = max(end, 2 * len(self._cols))
+            for name in ("_rows", "_cols", "_tf"):
+                arr = getattr(self, name)
+                grown = np.zeros(size, dtype=arr.dtype)
+                grown[:self._nnz] = arr[:self._nnz]
+                setattr(self, name, grown)
+        row = len(self._uids)
+        self._rows[start:end] = row
+        self._cols[start:end] = cols
+        self._tf[start:end] = tf
+        self._nnz = end
+        self._uids.append(eco_uid)
+        self._spans.append((start, end))
+        self._row_of[eco_uid] = row
+        self._df[cols] += 1
+
+    def _remove(self, eco_uid):
+        row = self._row_of.pop(eco_uid, None)
+        if row is None:
+            return
+        start, end = self._spans[row]
+        self._df[self._cols[start:end]] -= 1
+        self._tf[start:end] = 0             # a zero row scores 0 and has norm 0
+        self._uids[row] = None
+        self._dead += end - start
+
+    def _compact(self):
+        live = np.array([u is not None for u in self._uids], dtype=bool)
+        keep = live[self._rows[:self._nnz]]
+        remap = np.cumsum(live, dtype=np.int32) - 1
+        rows = remap[self._rows[:self._nnz][keep]]
+        cols, tf = self._cols[:self._nnz][keep], self._tf[:self._nnz][keep]
+        n = len(rows)
+        self._rows[:n], self._cols[:n], self._tf[:n] = rows, cols, tf
+        self._nnz, self._dead = n, 0
+
+        self._uids = [u for u in self._uids if u is not None]
+        starts = np.searchsorted(rows, np.arange(len(self._uids)), side="left")
+        ends = np.searchsorted(rows, np.arange(len(self._uids)), side="right")
+        self._spans = list(zip(starts.tolist(), ends.tolist()))
+        self._row_of = {u: i for i, u in enumerate(self._uids)}
+
+    @traced("similarity.flush", SIMILARITY_SECONDS, op="flush")
+    def _flush_locked(self):
+        with self._dirty_lock:
+            dirty, self._dirty = self._dirty, set()
+        if not dirty:
+            return 0
+        for uid in dirty:
+            self._remove(uid)
+            eco = self._store.get(uid) if self._store is not None else None
+            if eco is not None:
+                self._append(uid, *features(eco))
+        if self._dead * 2 > self._nnz:
+            self._compact()
+        self._idf = self._weights = self._norms = None
+        return len(dirty)
+
+    # ---------------------------------------------------------
+    # Queries
+    # ---------------------------------------------------------
+    def _scores(self, cols, tf):
+        """Cosine similarity of the query (cols, tf) against every row."""
+        n = len(self._uids)
+        rows, dcols = self._rows[:self._nnz], self._cols[:self._nnz]
+        if self._norms is None:
+            live = len(self._row_of)
+            self._idf = (np.log((1 + live) / (1 + self._df)) + 1).astype(np.float32)
+            self._weights = self._tf[:self._nnz] * self._idf[dcols]
+            self._norms = np.sqrt(np.bincount(rows, weights=self._weights * self._weights, minlength=n))
+        idf = self._idf
+
+        q = np.zeros(HASH_DIM, dtype=np.float32)
+        q[cols] = tf * idf[cols]
+        q_norm = float(np.linalg.norm(q[cols]))
+        if q_norm == 0:
+            return np.zeros(n)
+
+        hits = np.flatnonzero(q[dcols])     # only entries sharing a term with the query
+        dot = np.bincount(rows[hits], weights=self._weights[hits] * q[dcols[hits]], minlength=n)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.nan_to_num(dot / (self._norms * q_norm))
+
+    @traced("similarity.query", SIMILARITY_SECONDS, op="query")
+    def similar(self, eco_uid: str, k: int = 5, min_score: float = MIN_SIMILARITY):
+        """Top-k other ECOs by cosine similarity, best first (ties by eco_uid)."""
+        k = max(1, min(k, MAX_K))
+        with self.lock:
+            self._flush_locked()
+            row = self._row_of.get(eco_uid)
+            if row is None:
+                return {"error": "ECO not found", "eco_uid": eco_uid}
+
+            start, end = self._spans[row]
+            scores = self._scores(self._cols[start:end].copy(), self._tf[start:end].copy())
+            scores[row] = -1
+            # ties (same rounded score) go by eco_uid, so the precedents picked
+            # — and the prompt built from them — don't depend on row order
+            rounded = np.round(scores, 6)
+            if len(rounded) > k:
+                cutoff = np.partition(rounded, len(rounded) - k)[len(rounded) - k]
+                candidates = np.flatnonzero(rounded >= cutoff)
+            else:
+                candidates = np.arange(len(rounded))
+            uids = np.array([self._uids[i] or "" for i in candidates], dtype=object)
+            top = candidates[np.lexsort((uids, -rounded[candidates]))][:k]
+            ranked = [(self._uids[i], float(scores[i])) for i in top if scores[i] >= min_score]
+
+        source = self._store.get(eco_uid)
+        items = {it["item"] for it in source.get("impacted_items", [])} if source else set()
+        similar = []
+        for uid, score in ranked:
+            eco = self._store.get(uid)
+            if eco is None:
+                continue
+            other = [it["item"] for it in eco.get("impacted_items", [])]
+            similar.append({
+                "eco_uid": uid,
+                "score": round(score, 4),
+                "title": eco.get("title"),
+                "status": eco.get("status"),
+                "impacted_items": eco.get("impacted_items", []),
+                "shared_items": [i for i in other if i in items],
+            })
+        return {"eco_id": eco_uid, "k": k, "similar": similar}
+
+
+INDEX = SimilarityIndex()
@@ -0,0 +1,423 @@
+# eco_store.py — Indexed in-memory ECO store used by mock_teamcenter
+
+import pickle
+import threading
+from bisect import bisect_left, bisect_right, insort
+from itertools import count
+
+from metrics import FAST_BUCKETS, Histogram, traced
+
+_HIGH = "\U0010ffff"   # sorts after any eco_uid in (updated_at, eco_uid) keys
+
+
+def is_high_impact(impact) -> bool:
+    return "High" in str(impact or "").title()
+
+
+def is_pending(status) -> bool:
+    """Not yet promoted (Created, Demoted, ...)."""
+    return "Promoted" not in str(status or "")
+
+
+STORE_SECONDS = Histogram("eco_store_operation_duration_seconds", "In-memory ECO store operation latency",
+                          ("op",), buckets=FAST_BUCKETS)
+
+
+class EcoStore:
+    """
+    In-memory ECO table with secondary indexes.
+
+    Records keep the same shape the API returns, except that impacted items
+    live in a per-ECO map keyed by item UID, so add/remove are O(1).
+    Indexes:
+    - status / creator / revision → set of eco_uids
+    - impacted item UID → set of eco_uids
+    - eco_uid / created_at / updated_at → sorted list of (value, eco_uid),
+      used for range filters and keyset pagination
+    KPI counters (kpis()) are adjusted by every write, so reading them is O(1).
+    Listeners (add_listener) are called with the eco_uid after every write,
+    under the store lock — they must be cheap and must not call back in.
+    """
+
+    INDEXED_FIELDS = ("status", "creator", "revision")
+    SORTED_FIELDS = ("eco_uid", "created_at", "updated_at")
+    STATE = ("_records", "_items", "_index", "_by_item", "_sorted", "_order", "_kpi")
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._records = {}      # eco_uid → record (without impacted_items)
+        self._items = {}        # eco_uid → {item_uid: {"item", "impact"}}
+        self._index = {field: {} for field in self.INDEXED_FIELDS}
+        self._by_item = {}      # item_uid → {eco_uid}
+        self._sorted = {field: [] for field in self.SORTED_FIELDS}  # sorted [(value, eco_uid)]
+        self._order = {}        # eco_uid → insertion sequence
+        self._seq = count()
+        self._kpi = {"total_ecos": 0, "high_impact_items": 0, "pending_ecos": 0, "attachments": 0}
+        self._listeners = []
+
+    # ---------------------------------------------------------
+    # Index maintenance
+    # ---------------------------------------------------------
+    def _index_add(self, field, value, eco_uid):
+        self._index[field].setdefault(value, set()).add(eco_uid)
+
+    def _index_remove(self, field, value, eco_uid):
+        bucket = self._index[field].get(value)
+        if bucket is not None:
+            bucket.discard(eco_uid)
+            if not bucket:
+                del self._index[field][value]
+
+    def _item_link(self, item_uid, eco_uid):
+        self._by_item.setdefault(item_uid, set()).add(eco_uid)
+
+    def _item_unlink(self, item_uid, eco_uid):
+        bucket = self._by_item.get(item_uid)
+        if bucket is not None:
+            bucket.discard(eco_uid)
+            if not bucket:
+                del self._by_item[item_uid]
+
+    def _sorted_unlink(self, field, value, eco_uid):
+        keys = self._sorted[field]
+        key = (value, eco_uid)
+        pos = bisect_left(keys, key)
+        if pos < len(keys) and keys[pos] == key:
+            del keys[pos]
+
+    def _count(self, record, items, sign):
+        kpi = self._kpi
+        kpi["total_ecos"] += sign
+        kpi["high_impact_items"] += sign * sum(is_high_impact(it.get("impact")) for it in items)
+        kpi["pending_ecos"] += sign * is_pending(record.get("status"))
+        kpi["attachments"] += sign * len(record.get("attachments") or ())
+
+    def add_listener(self, fn):
+        """fn(eco_uid) after each put/delete/update/item/attachment change."""
+        self._listeners.append(fn)
+
+    def _changed(self, eco_uid):
+        for fn in self._listeners:
+            fn(eco_uid)
+
+    def _set_updated_at(self, record, updated_at):
+        self._sorted_unlink("updated_at", record["updated_at"], record["eco_uid"])
+        record["updated_at"] = updated_at
+        insort(self._sorted["updated_at"], (updated_at, record["eco_uid"]))
+
+    def _materialize(self, eco_uid, fields=None):
+        record = self._records[eco_uid]
+        if fields is None:
+            out = dict(record)
+            out["impacted_items"] = [dict(it) for it in self._items[eco_uid].values()]
+            return out
+        out = {f: record[f] for f in fields if f in record}
+        if "impacted_items" in fields:
+            out["impacted_items"] = [dict(it) for it in self._items[eco_uid].values()]
+        return out
+
+    # ---------------------------------------------------------
+    # Reads
+    # ---------------------------------------------------------
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, eco_uid):
+        return eco_uid in self._records
+
+    @traced("store.get", STORE_SECONDS, op="get")
+    def get(self, eco_uid):
+        """Return a copy of the ECO record, or None."""
+        with self.lock:
+            if eco_uid not in self._records:
+                return None
+            return self._materialize(eco_uid)
+
+    @traced("store.values", STORE_SECONDS, op="values")
+    def values(self):
+        """Return copies of all ECO records in insertion order."""
+        with self.lock:
+            return [self._materialize(uid) for uid in self._records]
+
+    @traced("store.columns", STORE_SECONDS, op="columns")
+    def columns(self, fields=("eco_uid", "status", "creator", "created_at")):
+        """
+        Column-oriented snapshot for analytics, without copying records:
+        ({field: [value per ECO]}, {"eco": [ECO position], "impact": [...]}).
+        Item rows point at their ECO by position in the ECO columns.
+        """
+        with self.lock:
+            records = list(self._records.values())
+            ecos = {f: [r.get(f) for r in records] for f in fields}
+            item_eco, impacts = [], []
+            for pos, eco_uid in enumerate(self._records):
+                for it in self._items[eco_uid].values():
+                    item_eco.append(pos)
+                    impacts.append(it.get("impact"))
+            return ecos, {"eco": item_eco, "impact": impacts}
+
+    def uids(self):
+        with self.lock:
+            return list(self._records)
+
+    @traced("store.where_used", STORE_SECONDS, op="where_used")
+    def where_used(self, item_uids):
+        """{item_uid: [{"eco_uid", "title", "status", "impact"}]}, from the item index."""
+        with self.lock:
+            out = {}
+            for item in item_uids:
+                uids = sorted(self._by_item.get(item, ()), key=self._order.__getitem__)
+                out[item] = [
+                    {
+                        "eco_uid": uid,
+                        "title": self._records[uid].get("title"),
+                        "status": self._records[uid].get("status"),
+                        "impact": self._items[uid][item].get("impact"),
+                    }
+                    for uid in uids
+                ]
+            return out
+
+    def kpis(self):
+        """Dashboard header counters, maintained incrementally (no scan)."""
+        with self.lock:
+            return dict(self._kpi)
+
+    def has_item(self, eco_uid, item_uid):
+        with self.lock:
+            return item_uid in self._items.get(eco_uid, {})
+
+    def _match(self, status=None, creator=None, revision=None, item=None,
+               updated_from=None, updated_to=None):
+        """
+        Set of eco_uids matching every given filter, or None if no filter was
+        given. Each filter is answered from its index and the smallest
+        candidate set is intersected with the rest. updated_to is inclusive
+        of every timestamp it prefixes: "2026-10-18" covers that whole day.
+        """
+        candidates = []
+        for field, value in (("status", status), ("creator", creator), ("revision", revision)):
+            if value is not None:
+                candidates.append(self._index[field].get(value, set()))
+        if item is not None:
+            candidates.append(self._by_item.get(item, set()))
+        if updated_from is not None or updated_to is not None:
+            keys = self._sorted["updated_at"]
+            lo = 0 if updated_from is None else bisect_left(keys, (updated_from,))
+            hi = len(keys) if updated_to is None else bisect_left(keys, (updated_to + _HIGH,))
+            candidates.append({uid for _, uid in keys[lo:hi]})
+
+        if not candidates:
+            return None
+        candidates.sort(key=len)
+        return set(candidates[0]).intersection(*candidates[1:])
+
+    @traced("store.find", STORE_SECONDS, op="find")
+    def find(self, **filters):
+        """Return ECO records matching every given filter, in insertion order."""
+        with self.lock:
+            matched = self._match(**filters)
+            if matched is None:
+                return self.values()
+            return [self._materialize(uid) for uid in sorted(matched, key=self._order.__getitem__)]
+
+    @traced("store.page", STORE_SECONDS, op="page")
+    def page(self, sort="eco_uid", descending=False, after=None, limit=50,
+             uid_prefix=None, fields=None, **filters):
+        """
+        Keyset pagination over one of SORTED_FIELDS.
+
+        `after` is the (sort_value, eco_uid) key of the last row already seen.
+        Returns (records, next_key); next_key is None on the last page.
+        Without filters the sorted index is walked from the cursor, so a page
+        costs O(log N + limit); selective filters sort only their matches.
+        """
+        with self.lock:
+            matched = self._match(**filters)
+            keys = self._sorted[sort]
+            if matched is not None and len(matched) * 8 < len(keys):
+                keys = sorted((self._records[uid][sort], uid) for uid in matched)
+                matched = None
+
+            # sorted by eco_uid, a UID prefix is a contiguous range of the index
+            prefix_range = bool(uid_prefix) and sort == "eco_uid"
+
+            if descending:
+                start = len(keys) if after is None else bisect_left(keys, tuple(after))
+                if prefix_range:
+                    start = min(start, bisect_left(keys, (uid_prefix + _HIGH,)))
+                walk = (keys[i] for i in range(start - 1, -1, -1))
+            else:
+                start = 0 if after is None else bisect_right(keys, tuple(after))
+                if prefix_range:
+                    start = max(start, bisect_left(keys, (uid_prefix,)))
+                walk = (keys[i] for i in range(start, len(keys)))
+
+            page_keys = []
+            for key in walk:
+                uid = key[1]
+                if uid_prefix and not uid.startswith(uid_prefix):
+                    if prefix_range:
+                        break
+                    continue
+                if matched is not None and uid not in matched:
+                    continue
+                if len(page_keys) == limit:
+                    return [self._materialize(k[1], fields) for k in page_keys], list(page_keys[-1])
+                page_keys.append(key)
+
+            return [self._materialize(k[1], fields) for k in page_keys], None
+
+    # ---------------------------------------------------------
+    # Writes
+    # ---------------------------------------------------------
+    def _insert(self, record):
+        """
+        Everything put() does except the sorted indexes and listeners.
+        Whatever can fail on a malformed record runs before the store is
+        touched, so a bad record raises without being half-inserted.
+        """
+        eco_uid = record["eco_uid"]
+        stored = {k: v for k, v in record.items() if k != "impacted_items"}
+        for field in self.SORTED_FIELDS:
+            if not isinstance(stored.get(field), str):
+                raise ValueError(f"ECO record '{field}' must be a string")
+        for field in self.INDEXED_FIELDS:
+            hash(stored.get(field))         # index key; TypeError if unhashable
+        items = {}
+        for it in record.get("impacted_items", []):
+            items[it["item"]] = dict(it)
+
+        if eco_uid in self._records:
+            self.delete(eco_uid)
+        self._records[eco_uid] = stored
+        self._order[eco_uid] = next(self._seq)
+        for item_uid in items:
+            self._item_link(item_uid, eco_uid)
+        self._items[eco_uid] = items
+        self._count(stored, items.values(), +1)
+
+        for field in self.INDEXED_FIELDS:
+            self._index_add(field, stored.get(field), eco_uid)
+        return stored
+
+    @traced("store.put", STORE_SECONDS, op="put")
+    def put(self, record: dict):
+        """Insert or replace a full ECO record (impacted_items may be a list)."""
+        with self.lock:
+            stored = self._insert(record)
+            for field in self.SORTED_FIELDS:
+                insort(self._sorted[field], (stored[field], stored["eco_uid"]))
+            self._changed(stored["eco_uid"])
+
+    @traced("store.load", STORE_SECONDS, op="load")
+    def load(self, records):
+        """
+        Bulk put() for snapshot restore: the sorted indexes are rebuilt once
+        (O(n log n)) instead of one insort per record (O(n²) overall).
+        """
+        with self.lock:
+            uids = [self._insert(record)["eco_uid"] for record in records]
+            for field in self.SORTED_FIELDS:
+                self._sorted[field] = sorted((r[field], uid) for uid, r in self._records.items())
+            for eco_uid in uids:
+                self._changed(eco_uid)
+            return len(uids)
+
+    @traced("store.delete", STORE_SECONDS, op="delete")
+    def delete(self, eco_uid):
+        with self.lock:
+            record = self._records.pop(eco_uid, None)
+            if record is None:
+                return False
+            del self._order[eco_uid]
+            self._count(record, self._items[eco_uid].values(), -1)
+            for field in self.INDEXED_FIELDS:
+                self._index_remove(field, record.get(field), eco_uid)
+            for item_uid in self._items.pop(eco_uid):
+                self._item_unlink(item_uid, eco_uid)
+            for field in self.SORTED_FIELDS:
+                self._sorted_unlink(field, record[field], eco_uid)
+            self._changed(eco_uid)
+            return True
+
+    @traced("store.update", STORE_SECONDS, op="update")
+    def update(self, eco_uid, updated_at, **fields):
+        """Update scalar fields (status, revision, ...) and re-index them."""
+        with self.lock:
+            record = self._records[eco_uid]
+            if "status" in fields:
+                self._kpi["pending_ecos"] += is_pending(fields["status"]) - is_pending(record.get("status"))
+            for field, value in fields.items():
+                if field in self._index:
+                    self._index_remove(field, record.get(field), eco_uid)
+                    self._index_add(field, value, eco_uid)
+                record[field] = value
+            self._set_updated_at(record, updated_at)
+            self._changed(eco_uid)
+
+    @traced("store.add_item", STORE_SECONDS, op="add_item")
+    def add_item(self, eco_uid, item_uid, impact, updated_at):
+        """Add an impacted item; an item already on the ECO keeps its impact."""
+        with self.lock:
+            items = self._items[eco_uid]
+            added = item_uid not in items
+            if added:
+                items[item_uid] = {"item": item_uid, "impact": impact}
+                self._item_link(item_uid, eco_uid)
+                self._kpi["high_impact_items"] += is_high_impact(impact)
+            self._set_updated_at(self._records[eco_uid], updated_at)
+            self._changed(eco_uid)
+            return added
+
+    @traced("store.remove_item", STORE_SECONDS, op="remove_item")
+    def remove_item(self, eco_uid, item_uid, updated_at):
+        with self.lock:
+            item = self._items[eco_uid].pop(item_uid, None)
+            removed = item is not None
+            if removed:
+                self._item_unlink(item_uid, eco_uid)
+                self._kpi["high_impact_items"] -= is_high_impact(item.get("impact"))
+            self._set_updated_at(self._records[eco_uid], updated_at)
+            self._changed(eco_uid)
+            return removed
+
+    @traced("store.add_attachment", STORE_SECONDS, op="add_attachment")
+    def add_attachment(self, eco_uid, attachment, updated_at):
+        """
+        Link attachment metadata to an ECO; re-attaching the same content
+        (same sha256) replaces the earlier entry. The list is replaced rather
+        than mutated, since get() copies share it.
+        """
+        with self.lock:
+            record = self._records[eco_uid]
+            kept = [a for a in record.get("attachments", []) if a["sha256"] != attachment["sha256"]]
+            self._kpi["attachments"] += len(kept) + 1 - len(record.get("attachments") or ())
+            record["attachments"] = kept + [dict(attachment)]
+            self._set_updated_at(record, updated_at)
+            self._changed(eco_uid)
+
+    # ---------------------------------------------------------
+    # Snapshots (eco_journal)
+    # ---------------------------------------------------------
+    @traced("store.dump_state", STORE_SECONDS, op="dump_state")
+    def dump_state(self) -> bytes:
+        """Records and indexes as one pickle, taken under the lock."""
+        with self.lock:
+            return pickle.dumps({name: getattr(self, name) for name in self.STATE},
+                                protocol=pickle.HIGHEST_PROTOCOL)
+
+    @traced("store.load_state", STORE_SECONDS, op="load_state")
+    def load_state(self, data: bytes):
+        """
+        Replace the contents with a dump_state() pickle. The indexes come
+        back as they were, so nothing is rebuilt; listeners see every ECO.
+        """
+        state = pickle.loads(data)
+        with self.lock:
+            for name in self.STATE:
+                setattr(self, name, state[name])
+            self._seq = count(max(self._order.values(), default=-1) + 1)
+            for eco_uid in self._records:
+                self._changed(eco_uid)
+            return len(self._records)
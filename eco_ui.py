@@ -1,31 +1,25 @@
 # eco_ui.py — Royal Premium Dashboard Edition (Optimized & Patched)
 
 import streamlit as st
-import requests
-import json
 import altair as alt
 import pandas as pd
 from datetime import datetime
 import streamlit.components.v1 as components
 
+import eco_api_client as api
 from eco_insights_utils import (
     get_impact_counts_from_api,
+    get_portfolio_impact,
+    get_riskiest_ecos,
     compute_weighted_risk,
     render_multi_ring_svg,
     render_progress_gauge,
     bar_chart_counts,
     donut_chart,
+    group_chart,
     THEME
 )
 
-API_BASE = "http://127.0.0.1:8000"
-
-
-
-
-
-
-
 # --------------------------------------
 # Load external CSS
 # --------------------------------------
@@ -58,12 +52,39 @@ st.markdown("""
 # --------------------------------------
 # KPI Row
 # --------------------------------------
+# Independent reads for the header and the data tabs, fetched in parallel;
+# the tabs below call the same cached functions and hit the cache.
+# ECO List rows are compact; details and impacted items load on selection
+ECO_LIST_FIELDS = "eco_uid,title,status,revision,creator,updated_at"
+ECO_LIST_PAGE = 100
+
+
+def eco_list_page(query: str, cursor=None) -> dict:
+    """One page of the ECO List: ranked full-text matches, or all ECOs by UID."""
+    if query:
+        return api.search_ecos(query, ECO_LIST_PAGE, cursor)
+    return api.list_ecos(ECO_LIST_PAGE, cursor, ECO_LIST_FIELDS)
+
+
+prefetch = [
+    (api.get_kpis,),
+    (eco_list_page, st.session_state.get("search_eco", "").strip()),
+]
+if st.session_state.get("insights_scope", "Organization") == "Organization":
+    prefetch += [
+        (api.get_portfolio_impact, st.session_state.get("insights_group", "status"),
+         st.session_state.get("insights_period", "month")),
+        (api.get_riskiest, 10),
+    ]
+kpi = api.prefetch(*prefetch)[0]
+
 c1, c2, c3, c4 = st.columns(4)
+
 kpi_data = [
-    ("Total ECOs Processed", "128"),
-    ("High Impact Items", "42"),
-    ("Pending Updates", "17"),
-    ("Total Attachments", "63"),
+    ("Total ECOs Processed", kpi.get("total_ecos", "—")),
+    ("High Impact Items", kpi.get("high_impact_items", "—")),
+    ("Pending Updates", kpi.get("pending_ecos", "—")),
+    ("Total Attachments", kpi.get("attachments", "—")),
 ]
 
 for col, (title, value) in zip([c1, c2, c3, c4], kpi_data):
@@ -99,11 +120,13 @@ with tabs[0]:
     eco_id = st.text_input("Enter ECO ID", "1001", key="summary_eco_id")
 
     if st.button("Generate Summary", key="summary_btn"):
-        r = requests.get(f"{API_BASE}/eco/{eco_id}/summarize")
         try:
-            d = r.json()
-            st.success("Summary Generated Successfully")
-            st.write(d.get("summary", "No summary returned"))
+            # rendered chunk by chunk as the model produces it
+            summary = st.write_stream(api.stream_text(f"/eco/{eco_id}/summarize/stream"))
+            if summary:
+                st.success("Summary Generated Successfully")
+            else:
+                st.warning("No summary returned")
         except:
             st.error("Invalid response from server.")
 
@@ -120,11 +143,12 @@ with tabs[1]:
     eco_id2 = st.text_input("ECO ID for Impact", "1001", key="impact_eco_id")
 
     if st.button("Run Impact Analysis", key="impact_btn"):
-        r = requests.get(f"{API_BASE}/eco/{eco_id2}/impact")
         try:
-            d = r.json()
-            st.success("Impact Analysis Retrieved")
-            st.write(d.get("impact_analysis", "No analysis returned"))
+            analysis = st.write_stream(api.stream_text(f"/eco/{eco_id2}/impact/stream"))
+            if analysis:
+                st.success("Impact Analysis Retrieved")
+            else:
+                st.warning("No analysis returned")
         except:
             st.error("Invalid response from server.")
 
@@ -164,24 +188,20 @@ with tabs[2]:
                     }
                 }
 
-                r = requests.post(f"{API_BASE}/tc/eco/create", json=payload)
-                try:
-                    out = r.json()
-                    st.session_state["log"] = out
-                    eco_uid = out.get("eco_uid")
-                    st.success(f"ECO Created Successfully: {eco_uid}")
+                out = api.create_eco(payload)
+                st.session_state["log"] = out
+                if "error" in out:
+                    st.error(out["error"])
+                else:
+                    st.success(f"ECO Created Successfully: {out.get('eco_uid')}")
                     st.json(out)
-                except:
-                    st.error("Error processing response")
-                    st.code(r.text)
 
         # -------------------- GET DETAILS --------------------
         elif tc_action == "Get ECO Details":
             uid = st.text_input("ECO UID", key="tc_get_uid")
 
             if st.button("Fetch Details", key="fetch_tc_details"):
-                r = requests.get(f"{API_BASE}/tc/eco/{uid}")
-                st.session_state["log"] = r.json()
+                st.session_state["log"] = api.get_eco(uid)
 
         # -------------------- UPDATE STATUS --------------------
         elif tc_action == "Update ECO Status":
@@ -189,8 +209,7 @@ with tabs[2]:
             act = st.selectbox("Action", ["Promote", "Demote"], key="tc_update_action")
 
             if st.button("Update Status", key="update_status_btn"):
-                r = requests.post(f"{API_BASE}/tc/eco/{uid}/status", params={"action": act})
-                st.session_state["log"] = r.json()
+                st.session_state["log"] = api.update_status(uid, act)
 
         # -------------------- ADD ITEM --------------------
         elif tc_action == "Add Impacted Item":
@@ -198,8 +217,7 @@ with tabs[2]:
             item = st.text_input("Item UID", key="tc_add_item_uid")
 
             if st.button("Add Item", key="tc_add_item_btn"):
-                r = requests.post(f"{API_BASE}/tc/eco/{uid}/add_item/{item}")
-                st.session_state["log"] = r.json()
+                st.session_state["log"] = api.add_item(uid, item)
 
         # -------------------- REMOVE ITEM --------------------
         elif tc_action == "Remove Impacted Item":
@@ -207,8 +225,7 @@ with tabs[2]:
             item = st.text_input("Item UID", key="tc_remove_item_uid")
 
             if st.button("Remove Item", key="tc_remove_item_btn"):
-                r = requests.post(f"{API_BASE}/tc/eco/{uid}/remove_item/{item}")
-                st.session_state["log"] = r.json()
+                st.session_state["log"] = api.remove_item(uid, item)
 
     # RIGHT COLUMN LOG VIEW
     with right:
@@ -236,7 +253,14 @@ with tabs[3]:
 
     if st.button("Upload", key="attach_btn"):
         if eco_uid and file:
-            st.success("Uploaded successfully (mock).")
+            out = api.attach(eco_uid, file.name, file, file.type)
+            if "error" in out:
+                st.error(out["error"])
+            else:
+                att = out["attachment"]
+                note = " (content already stored, deduplicated)" if out.get("deduplicated") else ""
+                st.success(f"Uploaded {att['filename']} — {att['size_bytes']:,} bytes{note}")
+                st.markdown(f"[Download]({api.attachment_url(eco_uid, att['sha256'])})")
         else:
             st.error("ECO UID + File required.")
 
@@ -251,9 +275,31 @@ with tabs[4]:
     st.subheader("Insights & Analytics")
     st.markdown('<br/>', unsafe_allow_html=True)
 
-    eco_uid_insight = st.text_input("ECO UID for insights", key="insights_uid")
-
-    counts = get_impact_counts_from_api(eco_uid_insight or None)
+    scope = st.radio("Scope", ["Organization", "Single ECO"], horizontal=True, key="insights_scope")
+
+    portfolio = None
+    if scope == "Organization":
+        g1, g2 = st.columns(2)
+        group_by = g1.selectbox("Group by", ["status", "creator", "period"], key="insights_group")
+        period = g2.selectbox("Period", ["month", "week", "day", "year"], key="insights_period",
+                              disabled=group_by != "period")
+
+        # one aggregate call for every ECO (see eco_analytics.py)
+        portfolio = get_portfolio_impact(group_by, period)
+        if portfolio is None:
+            st.warning("Analytics unavailable — is the backend running?")
+            counts = {"High": 0, "Medium": 0, "Low": 0}
+            overall_score = 0
+        else:
+            totals = portfolio["totals"]
+            counts = {level: totals[level] for level in ("High", "Medium", "Low")}
+            overall_score = totals["risk"]
+            st.caption(f"{totals['ecos']} ECOs · {totals['items']} impacted items · "
+                       f"mean ECO risk {totals['mean_eco_risk']:.0f}%")
+    else:
+        eco_uid_insight = st.text_input("ECO UID for insights", key="insights_uid")
+        counts = get_impact_counts_from_api(eco_uid_insight or None)
+        overall_score = compute_weighted_risk(counts)
 
     df_counts = pd.DataFrame([
         {"impact": "High", "count": counts.get("High", 0) if isinstance(counts, dict) else 0},
@@ -261,8 +307,6 @@ with tabs[4]:
         {"impact": "Low", "count": counts.get("Low", 0)},
     ])
 
-    overall_score = compute_weighted_risk(counts)
-
     left_col, right_col = st.columns([1, 1.3])
 
     with left_col:
@@ -274,9 +318,22 @@ with tabs[4]:
 
     with right_col:
         st.markdown("### Distribution & Breakdown")
-        st.altair_chart(bar_chart_counts(df_counts), use_container_width=True)
+        if portfolio and portfolio["groups"]:
+            df_groups = pd.DataFrame(portfolio["groups"]).melt(
+                id_vars=["key"], value_vars=["High", "Medium", "Low"],
+                var_name="impact", value_name="count",
+            )
+            st.altair_chart(group_chart(df_groups), use_container_width=True)
+        else:
+            st.altair_chart(bar_chart_counts(df_counts), use_container_width=True)
         st.altair_chart(donut_chart(df_counts), use_container_width=True)
 
+    if portfolio:
+        st.markdown("### Highest-Risk ECOs")
+        riskiest = get_riskiest_ecos(10)
+        if riskiest:
+            st.dataframe(pd.DataFrame(riskiest), use_container_width=True, hide_index=True)
+
     st.markdown('</div>', unsafe_allow_html=True)
 
 
@@ -287,33 +344,74 @@ with tabs[5]:
     st.markdown('<div class="card">', unsafe_allow_html=True)
     st.subheader("📘 ECO Database")
 
-    search_query = st.text_input("Search ECO by ID", key="search_eco")
-
-    try:
-        ecos = requests.get(f"{API_BASE}/tc/eco/all").json()
-    except:
-        ecos = []
-
-    if not isinstance(ecos, list):
-        st.error("Invalid backend response")
-        st.stop()
-
-    # filter
-    if search_query.strip():
-        ecos = [e for e in ecos if isinstance(e, dict) and search_query.lower() in e.get("eco_uid", "").lower()]
-
-    st.success(f"{len(ecos)} ECO(s) found")
-
-    for eco in ecos:
-        status = eco.get("status", "Created")
+    search_query = st.text_input(
+        "Search ECOs",
+        key="search_eco",
+        placeholder='Part number, words or "exact phrase" — e.g. PRT-10 bracket',
+    ).strip()
+
+    # Pages loaded so far for this search, as server cursors; "Load more"
+    # appends the next one. Each page is a cached read.
+    if st.session_state.get("eco_list_query") != search_query:
+        st.session_state["eco_list_query"] = search_query
+        st.session_state["eco_list_cursors"] = [None]
+
+    ecos, next_cursor = [], None
+    for cursor in st.session_state["eco_list_cursors"]:
+        page = eco_list_page(search_query, cursor)
+        if not isinstance(page.get("items"), list):
+            st.error(page.get("error", "Invalid backend response"))
+            st.stop()
+        ecos += page["items"]
+        next_cursor = page.get("next_cursor")
+
+    more = " (more available)" if next_cursor else ""
+    st.success(f"{len(ecos)} ECO(s) loaded{more}")
+
+    # one virtualized grid instead of an expander + table per ECO
+    columns = ECO_LIST_FIELDS.split(",") + (["snippet"] if search_query else [])
+    df_ecos = pd.DataFrame(ecos, columns=columns)
+    event = st.dataframe(
+        df_ecos,
+        key="eco_list_table",
+        on_select="rerun",
+        selection_mode="single-row",
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "eco_uid": "ECO UID",
+            "title": "Title",
+            "status": "Status",
+            "revision": "Rev",
+            "creator": "Creator",
+            "updated_at": "Updated At",
+            "snippet": "Match",
+        },
+    )
+
+    def _load_more(cursor):
+        st.session_state["eco_list_cursors"].append(cursor)
+
+    st.button("Load more", key="eco_list_more", on_click=_load_more, args=(next_cursor,),
+              disabled=next_cursor is None)
+
+    rows = [r for r in event.selection.rows if r < len(df_ecos)]
+    if not rows:
+        st.caption("Select a row to see its details and impacted items.")
+    else:
+        eco = api.get_eco(df_ecos.iloc[rows[0]]["eco_uid"])
+        if "error" in eco:
+            st.error(eco["error"])
+        else:
+            status = eco.get("status", "Created")
 
-        color = (
-            "#10B981" if "Promoted" in status else
-            "#F59E0B" if "Demoted" in status else
-            "#3B82F6"
-        )
+            color = (
+                "#10B981" if "Promoted" in status else
+                "#F59E0B" if "Demoted" in status else
+                "#3B82F6"
+            )
 
-        with st.expander(f"🔧 {eco.get('eco_uid')} — {eco.get('title')}"):
+            st.markdown(f"### 🔧 {eco.get('eco_uid')} — {eco.get('title')}")
             st.markdown(
                 f"<span style='background:{color};padding:4px 10px;border-radius:8px;"
                 f"color:white;font-weight:700;font-size:12px;'>{status}</span>",
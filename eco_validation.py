@@ -0,0 +1,55 @@
+# eco_validation.py — ECO payload checks shared by single and bulk create
+#
+# Each validator returns an error string, or None if the payload is valid.
+
+IMPACT_LEVELS = ("High", "Medium", "Low")
+
+
+def validate_items(items, field):
+    if not isinstance(items, list):
+        return f"'{field}' must be a list"
+    for it in items:
+        if not isinstance(it, dict) or not isinstance(it.get("item"), str) or not it["item"]:
+            return f"every '{field}' entry needs a non-empty 'item'"
+        if it.get("impact") not in IMPACT_LEVELS:
+            return f"'impact' must be one of {', '.join(IMPACT_LEVELS)}"
+    return None
+
+
+def validate_datasets(datasets):
+    # save_ecos() joins them into one column; a non-string would fail the whole batch
+    if not isinstance(datasets, list):
+        return "'datasets' must be a list"
+    if not all(isinstance(d, str) for d in datasets):
+        return "every 'datasets' entry must be a string"
+    return None
+
+
+def validate_mock_record(record):
+    """POST /tc/eco/create and bulk backend=mock: properties + optional impacted_items/datasets."""
+    if not isinstance(record, dict):
+        return "record must be an object"
+    props = record.get("properties")
+    if not isinstance(props, dict) or not isinstance(props.get("object_name"), str) or not props["object_name"]:
+        return "'properties.object_name' is required"
+    if not isinstance(props.get("object_desc", ""), str):
+        return "'properties.object_desc' must be a string"
+    error = validate_datasets(record.get("datasets", []))
+    if error:
+        return error
+    return validate_items(record.get("impacted_items", []), "impacted_items")
+
+
+def validate_sqlite_record(record):
+    """Same shape as POST /eco/create (bulk backend=sqlite)."""
+    if not isinstance(record, dict):
+        return "record must be an object"
+    for field in ("change_id", "title", "description"):
+        if not isinstance(record.get(field), str):
+            return f"'{field}' is required"
+    if not record["change_id"]:
+        return "'change_id' must not be empty"
+    error = validate_datasets(record.get("datasets"))
+    if error:
+        return error
+    return validate_items(record.get("bom"), "bom")
@@ -1,4 +1,5 @@
 import google.generativeai as genai
+import asyncio
 import os
 import time
 import random
@@ -6,12 +7,24 @@ import threading
 from dotenv import load_dotenv
 from google.api_core.exceptions import ResourceExhausted
 
+from ai_cache import AICache, prompt_key
+from metrics import Counter, Gauge, Histogram, span, traced
+from ratelimit import TokenBucket
+from singleflight import SingleFlight
+
 load_dotenv()
 
 genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
 # Stable, high-limit model for PoC
-model = genai.GenerativeModel("gemini-2.5-flash")
+MODEL_NAME = "gemini-2.5-flash"
+model = genai.GenerativeModel(MODEL_NAME)
+
+# Answers cached by (model, normalized prompt); see ai_cache.py
+AI_CACHE = AICache()
+
+# Identical concurrent prompts share one model call; see singleflight.py
+IN_FLIGHT = SingleFlight()
 
 
 # =======================================================
@@ -25,48 +38,112 @@ BACKOFF_MULTIPLIER = 2          # exponential: 2 → 4 → 8 → 16...
 MAX_BACKOFF = 20                # cap wait
 JITTER = True                   # add randomness to avoid spikes
 
-
-# Shared global state
-request_count = 0
-circuit_open = False
-lock = threading.Lock()
+CIRCUIT_OPEN_REPLY = "⛔ The AI is cooling down due to rate limits. Try again in 1 minute."
+CIRCUIT_TRIP_REPLY = "⛔ Too many requests — system is cooling down. Try again shortly."
 
 
 # =======================================================
-# INTERNAL UTILITY
+# RATE LIMITER (token bucket + circuit breaker)
 # =======================================================
 
-def _reset_request_count():
-    """Auto-reset the request counter every minute."""
-    global request_count
-    while True:
-        time.sleep(60)
-        request_count = 0
+class CircuitBreaker:
+    """Open for COOLDOWN_SECONDS once the bucket runs dry; closes lazily."""
+
+    def __init__(self, bucket: TokenBucket, cooldown: float):
+        self.bucket = bucket
+        self.cooldown = cooldown
+        self.open_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return time.monotonic() < self.open_until
+
+    def admit(self):
+        """Return None if the call may proceed, otherwise the reply to send."""
+        with self._lock:
+            now = time.monotonic()
+            if self.open_until:
+                if now < self.open_until:
+                    return CIRCUIT_OPEN_REPLY
+                self.open_until = 0.0
+                print("🔄 Circuit CLOSED. Resuming requests.")
 
-# Run counter resetter in background:
-threading.Thread(target=_reset_request_count, daemon=True).start()
+            if self.bucket.try_acquire():
+                return None
+
+            self.open_until = now + self.cooldown
+            CIRCUIT_TRIPS.inc()
+            print(f"⚠️ Rate limit threshold hit. Circuit OPEN for {self.cooldown}s.")
+            return CIRCUIT_TRIP_REPLY
+
+
+# Shared by the async and streaming entry points
+bucket = TokenBucket(MAX_REQUESTS_PER_MIN, period=60)
+circuit = CircuitBreaker(bucket, COOLDOWN_SECONDS)
+
+
+def has_capacity(reserve: int = 0) -> bool:
+    """
+    True if a call now would be admitted without tripping the circuit and
+    still leave `reserve` tokens for other callers.
+    """
+    return not circuit.is_open and bucket.available() > reserve
 
 
+# =======================================================
+# METRICS (exposed on /metrics, see metrics.py)
+# =======================================================
+GEMINI_SECONDS = Histogram("eco_gemini_request_duration_seconds",
+                           "Gemini model call latency per attempt", ("mode", "outcome"))
+GEMINI_RETRIES = Counter("eco_gemini_retries_total", "Gemini calls retried after a rate limit", ("mode",))
+GEMINI_RATE_LIMITED = Counter("eco_gemini_rate_limited_total",
+                              "Gemini 429 / ResourceExhausted replies", ("mode",))
+GEMINI_REJECTED = Counter("eco_gemini_circuit_rejections_total",
+                          "Calls refused locally while the circuit was open or tripping")
+CIRCUIT_TRIPS = Counter("eco_gemini_circuit_trips_total", "Times the circuit breaker opened")
+Gauge("eco_gemini_circuit_open", "1 while the circuit breaker is open", fn=lambda: int(circuit.is_open))
+Counter("eco_ai_cache_lookups_total", "AI cache lookups by result", ("result",),
+        fn=lambda: {(label,): AI_CACHE.counters()[key]
+                    for label, key in (("memory_hit", "memory_hits"), ("disk_hit", "disk_hits"), ("miss", "misses"))})
+Gauge("eco_ai_cache_hit_ratio", "AI cache hits / lookups since start", fn=lambda: _hit_ratio())
+Counter("eco_ai_singleflight_calls_total", "Cached-miss model calls by outcome", ("outcome",),
+        fn=lambda: {("executed",): IN_FLIGHT.stats["executed"], ("coalesced",): IN_FLIGHT.stats["coalesced"]})
+Gauge("eco_ai_singleflight_in_flight", "Distinct prompts currently being generated",
+      fn=lambda: IN_FLIGHT.in_flight)
+
+
+def _hit_ratio():
+    stats = AI_CACHE.counters()
+    lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+    return (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+
+
+def _observe(mode, outcome, start):
+    GEMINI_SECONDS.observe(time.perf_counter() - start, mode=mode, outcome=outcome)
+    if outcome == "rate_limited":
+        GEMINI_RATE_LIMITED.inc(mode=mode)
 
-def _should_trip_circuit():
-    """If too many requests, trip the circuit breaker."""
-    global circuit_open, request_count
 
-    with lock:
-        if request_count >= MAX_REQUESTS_PER_MIN:
-            circuit_open = True
-            print(f"⚠️ Rate limit threshold hit. Circuit OPEN for {COOLDOWN_SECONDS}s.")
-            return True
-        return False
+# =======================================================
+# INTERNAL UTILITY
+# =======================================================
 
+def _retry_wait(e: ResourceExhausted, backoff: float):
+    """Seconds to wait before the next attempt, and the next backoff."""
+    # Google's own recommended retry time
+    retry_delay = getattr(e, "retry_delay", None)
+    if retry_delay:
+        print(f"⚠️ Google says retry in {retry_delay}s. Waiting...")
+        return retry_delay, backoff
 
+    # Exponential backoff with jitter
+    wait = min(backoff, MAX_BACKOFF)
+    if JITTER:
+        wait = wait + random.uniform(0, 1.5)
 
-def _start_circuit_cooldown():
-    """Close circuit after cooldown period."""
-    global circuit_open
-    time.sleep(COOLDOWN_SECONDS)
-    print("🔄 Circuit CLOSED. Resuming requests.")
-    circuit_open = False
+    print(f"⚠️ Rate limit. Retrying in {wait:.1f} seconds...")
+    return wait, backoff * BACKOFF_MULTIPLIER
 
 
 
@@ -74,59 +151,141 @@ def _start_circuit_cooldown():
 # ADVANCED GEMINI CALL
 # =======================================================
 
-def ask_gemini(prompt: str):
+@traced("gemini.ask_async")
+async def ask_gemini_async(prompt: str, generation_config: dict | None = None):
     """
-    Advanced Gemini call with:
-    - Circuit breaker
-    - Exponential backoff
-    - Google-reported retry delays
-    - Jitter
-    - Thread-safe request tracking
+    Gemini call with circuit breaker, exponential backoff (Google-reported
+    retry delays, jitter) and the shared token bucket. Awaits the model and
+    the backoff, so throttled calls don't hold a threadpool worker.
+    generation_config is passed through (e.g. response_mime_type for JSON).
     """
+    rejected = circuit.admit()
+    if rejected:
+        GEMINI_REJECTED.inc()
+        return rejected
+
+    backoff = INITIAL_BACKOFF
+
+    for attempt in range(MAX_RETRIES):
+        start = time.perf_counter()
+        try:
+            response = await model.generate_content_async(prompt, generation_config=generation_config)
+            _observe("async", "ok", start)
+            return response.text
+
+        except ResourceExhausted as e:
+            _observe("async", "rate_limited", start)
+            wait, backoff = _retry_wait(e, backoff)
+            GEMINI_RETRIES.inc(mode="async")
+            await asyncio.sleep(wait)
+
+        except Exception as e:
+            _observe("async", "error", start)
+            print(f"❌ Unexpected Gemini error: {e}")
+            return "❌ Gemini API failed unexpectedly. Check logs."
 
-    global request_count, circuit_open
+    return "❌ Gemini API is overloaded. Try again later."
 
-    # ========== Circuit breaker check ==========
-    if circuit_open:
-        return "⛔ The AI is cooling down due to rate limits. Try again in 1 minute."
 
-    # Count request attempt
-    with lock:
-        request_count += 1
 
-    if _should_trip_circuit():
-        # Fire cooldown in background
-        threading.Thread(target=_start_circuit_cooldown, daemon=True).start()
-        return "⛔ Too many requests — system is cooling down. Try again shortly."
+async def ask_gemini_stream(prompt: str):
+    """
+    Streaming variant of ask_gemini_async: yields text chunks as the model
+    produces them. Retries only apply before the first chunk arrives;
+    failures are yielded as the usual ⛔/❌ reply.
+    """
+    rejected = circuit.admit()
+    if rejected:
+        GEMINI_REJECTED.inc()
+        yield rejected
+        return
 
-    # ========== Retry loop ==========
     backoff = INITIAL_BACKOFF
+    started = False
 
     for attempt in range(MAX_RETRIES):
+        start = time.perf_counter()
         try:
-            response = model.generate_content(prompt)
-            return response.text
+            with span("gemini.stream"):
+                response = await model.generate_content_async(prompt, stream=True)
+                async for chunk in response:
+                    if chunk.text:
+                        started = True
+                        yield chunk.text
+            _observe("stream", "ok", start)
+            return
 
         except ResourceExhausted as e:
-            # Google's own recommended retry time
-            retry_delay = getattr(e, "retry_delay", None)
-
-            if retry_delay:
-                print(f"⚠️ Google says retry in {retry_delay}s. Waiting...")
-                time.sleep(retry_delay)
-            else:
-                # Exponential backoff with jitter
-                wait = min(backoff, MAX_BACKOFF)
-                if JITTER:
-                    wait = wait + random.uniform(0, 1.5)
-
-                print(f"⚠️ Rate limit. Retrying in {wait:.1f} seconds...")
-                time.sleep(wait)
-                backoff *= BACKOFF_MULTIPLIER
+            _observe("stream", "rate_limited", start)
+            if started:     # can't take back chunks already sent
+                yield "\n❌ Gemini stream was interrupted. Try again later."
+                return
+            wait, backoff = _retry_wait(e, backoff)
+            GEMINI_RETRIES.inc(mode="stream")
+            await asyncio.sleep(wait)
 
         except Exception as e:
+            _observe("stream", "error", start)
             print(f"❌ Unexpected Gemini error: {e}")
-            return "❌ Gemini API failed unexpectedly. Check logs."
+            yield "❌ Gemini API failed unexpectedly. Check logs."
+            return
+
+    yield "❌ Gemini API is overloaded. Try again later."
+
+
+
+# =======================================================
+# CACHED GEMINI CALL
+# =======================================================
+
+def is_error_reply(text: str) -> bool:
+    """ask_gemini_async reports failures as ⛔/❌ strings — never cache those."""
+    return text.startswith(("⛔", "❌"))
+
+
+
+async def cache_lookup(prompt: str, eco_id: str | None = None, version: str | None = None):
+    """Cached answer for this prompt, or None. Runs off the event loop."""
+    key = prompt_key(MODEL_NAME, prompt)
+    return await asyncio.to_thread(AI_CACHE.get, key, eco_id, version)
+
+
+
+async def cache_store(prompt: str, answer: str, eco_id: str | None = None, version: str | None = None):
+    if not is_error_reply(answer):
+        key = prompt_key(MODEL_NAME, prompt)
+        await asyncio.to_thread(AI_CACHE.put, key, answer, eco_id, version)
+
+
+
+async def _ask_and_store(prompt, eco_id, version):
+    answer = await ask_gemini_async(prompt)
+    await cache_store(prompt, answer, eco_id, version)
+    return answer
+
+
+
+async def ask_gemini_cached(prompt: str, eco_id: str | None = None, version: str | None = None):
+    """
+    ask_gemini_async behind AI_CACHE, with concurrent misses for the same
+    prompt coalesced into a single model call.
+    Pass the ECO id and its updated_at so answers are dropped once it changes.
+    Returns (answer, cached, coalesced).
+    """
+    cached = await cache_lookup(prompt, eco_id, version)
+    if cached is not None:
+        return cached, True, False
+
+    key = prompt_key(MODEL_NAME, prompt)
+    answer, coalesced = await IN_FLIGHT.do(key, _ask_and_store, prompt, eco_id, version)
+    return answer, False, coalesced
+
+
 
-   
-    return "❌ Gemini API is overloaded. Try again later."
\ No newline at end of file
+def ai_stats():
+    """Counters for the cache, request coalescing and the circuit breaker."""
+    return {
+        "cache": AI_CACHE.counters(),
+        "singleflight": {**IN_FLIGHT.stats, "in_flight": IN_FLIGHT.in_flight},
+        "circuit_open": circuit.is_open,
+    }
@@ -0,0 +1,218 @@
+# item_graph.py — BOM item graph (parent/child links), where-used and impact propagation
+#
+# Links are persisted in SQLite (item_links) and mirrored in memory as two
+# adjacency maps, so a propagation query never touches the database. The
+# links are read on first use, not at import; an unreadable database leaves
+# the graph in-memory only.
+#   up   → assemblies that use the item (where-used direction)
+#   down → components of the item
+# BFS results are cached (LRU) until the graph changes.
+
+import os
+import sqlite3
+import threading
+from collections import OrderedDict, deque
+
+from db import DB_QUERY_SECONDS, get_db, transaction
+from metrics import traced
+
+MAX_DEPTH = 10
+MAX_AFFECTED = int(os.getenv("PROPAGATION_MAX_ITEMS", 5000))
+PROPAGATION_CACHE_SIZE = int(os.getenv("PROPAGATION_CACHE_SIZE", 1024))
+DIRECTIONS = ("up", "down", "both")
+
+LINKS_TABLE = """
+CREATE TABLE IF NOT EXISTS item_links (
+    parent TEXT NOT NULL,
+    child TEXT NOT NULL,
+    PRIMARY KEY (parent, child)
+) WITHOUT ROWID;
+"""
+LINKS_INDEX = "CREATE INDEX IF NOT EXISTS idx_item_links_child ON item_links(child);"
+
+
+class ItemGraph:
+    def __init__(self, cache_size=PROPAGATION_CACHE_SIZE):
+        self.lock = threading.RLock()
+        self._parents = {}          # child → {parent}
+        self._children = {}         # parent → {child}
+        self._cache = OrderedDict()  # (sources, direction, depth) → result
+        self.cache_size = cache_size
+        self._table_ready = False
+        self._loaded = False
+
+    # ---------------------------------------------------------
+    # Persistence
+    # ---------------------------------------------------------
+    def _db(self):
+        conn = get_db()
+        if not self._table_ready:
+            conn.execute(LINKS_TABLE)
+            conn.execute(LINKS_INDEX)
+            self._table_ready = True
+        return conn
+
+    def load(self):
+        """Read every link from SQLite into memory (first use, or to re-read)."""
+        with self.lock:
+            self._loaded = True
+            try:
+                rows = self._db().execute("SELECT parent, child FROM item_links").fetchall()
+            except sqlite3.DatabaseError as e:
+                print(f"⚠️ Item graph: links not loaded ({e})")
+                return 0
+            self._parents.clear()
+            self._children.clear()
+            for r in rows:
+                self._link(r["parent"], r["child"])
+            self._cache.clear()
+            return len(rows)
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+
+    def _link(self, parent, child):
+        self._children.setdefault(parent, set()).add(child)
+        self._parents.setdefault(child, set()).add(parent)
+
+    @traced("item_graph.add_links", DB_QUERY_SECONDS, op="item_links_put")
+    def add_links(self, links):
+        """
+        links: [{"parent": ..., "child": ...}] (BOM lines). Existing links and
+        self-links are ignored. Returns {"added": n} or {"error"}.
+        """
+        pairs = {(str(l["parent"]), str(l["child"])) for l in links
+                 if l.get("parent") and l.get("child") and l["parent"] != l["child"]}
+        with self.lock:
+            self._ensure_loaded()
+            new = [(p, c) for p, c in pairs if c not in self._children.get(p, ())]
+            if not new:
+                return {"added": 0}
+            try:
+                self._db()
+                with transaction() as conn:
+                    conn.executemany("INSERT OR IGNORE INTO item_links (parent, child) VALUES (?, ?)", new)
+            except sqlite3.DatabaseError as e:
+                return {"error": f"Links not saved: {e}"}
+            for p, c in new:
+                self._link(p, c)
+            self._cache.clear()
+        return {"added": len(new)}
+
+    # ---------------------------------------------------------
+    # Queries
+    # ---------------------------------------------------------
+    def parents(self, item):
+        with self.lock:
+            self._ensure_loaded()
+            return sorted(self._parents.get(item, ()))
+
+    def children(self, item):
+        with self.lock:
+            self._ensure_loaded()
+            return sorted(self._children.get(item, ()))
+
+    def _neighbours(self, item, direction):
+        if direction == "up":
+            return self._parents.get(item, ())
+        if direction == "down":
+            return self._children.get(item, ())
+        return (*self._parents.get(item, ()), *self._children.get(item, ()))
+
+    def propagate(self, sources, direction="up", max_depth=3):
+        """
+        Breadth-first impact propagation from `sources`, at most `max_depth`
+        hops. Each affected item comes with its hop count and the item it was
+        reached from (`via`), so a path can be walked back to a source.
+        Cycles are safe; results are cached until the graph changes.
+        """
+        if direction not in DIRECTIONS:
+            return {"error": f"Invalid direction '{direction}'", "allowed": list(DIRECTIONS)}
+        if isinstance(max_depth, bool) or not isinstance(max_depth, int):
+            return {"error": f"Invalid depth {max_depth!r}", "allowed": f"0..{MAX_DEPTH}"}
+        max_depth = max(0, min(max_depth, MAX_DEPTH))
+        key = (tuple(sorted(set(sources))), direction, max_depth)
+
+        with self.lock:
+            self._ensure_loaded()
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+
+            seen = {s: (0, None) for s in key[0]}
+            queue = deque(key[0])
+            truncated = False
+            while queue:
+                item = queue.popleft()
+                depth = seen[item][0]
+                for nxt in self._neighbours(item, direction):
+                    if nxt in seen:
+                        continue
+                    if depth == max_depth or len(seen) >= MAX_AFFECTED:
+                        truncated = True
+                        continue
+                    seen[nxt] = (depth + 1, item)
+                    queue.append(nxt)
+
+            result = {
+                "sources": list(key[0]),
+                "direction": direction,
+                "max_depth": max_depth,
+                "truncated": truncated,
+                "affected": [
+                    {"item": item, "depth": depth, "via": via}
+                    for item, (depth, via) in seen.items() if depth > 0
+                ],
+            }
+            self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return result
+
+    def stats(self):
+        with self.lock:
+            self._ensure_loaded()
+            return {
+                "items": len(self._parents.keys() | self._children.keys()),
+                "links": sum(len(c) for c in self._children.values()),
+                "cached_queries": len(self._cache),
+            }
+
+
+# ---------------------------------------------------------
+# Where-used (item → ECOs)
+# ---------------------------------------------------------
+@traced("db.where_used", DB_QUERY_SECONDS, op="where_used")
+def sql_where_used(item_uid: str):
+    """SQLite ECOs (eco_bom) that list the item; uses idx_eco_bom_item."""
+    try:
+        rows = get_db().execute("""
+            SELECT b.change_id, m.title, b.impact
+            FROM eco_bom b LEFT JOIN eco_master m ON m.change_id = b.change_id
+            WHERE b.item = ?
+            ORDER BY b.change_id
+        """, (item_uid,)).fetchall()
+    except sqlite3.OperationalError as e:
+        return {"error": f"Database not initialised: {e}"}
+    except sqlite3.DatabaseError as e:
+        return {"error": f"Database unreadable: {e}"}
+    return [{"change_id": r["change_id"], "title": r["title"], "impact": r["impact"]} for r in rows]
+
+
+def impact_report(graph: ItemGraph, store, sources, direction="up", max_depth=3):
+    """propagate() plus, for the sources and every affected item, the ECOs that touch it."""
+    result = graph.propagate(sources, direction, max_depth)
+    if "error" in result:
+        return result
+    items = [*result["sources"], *(a["item"] for a in result["affected"])]
+    used = store.where_used(items)
+    return {
+        **result,
+        "affected": [{**a, "ecos": used.get(a["item"], [])} for a in result["affected"]],
+        "source_ecos": {s: used.get(s, []) for s in result["sources"]},
+    }
+
+
+GRAPH = ItemGraph()
@@ -3,12 +3,38 @@
 from dotenv import load_dotenv
 load_dotenv()
 
-from fastapi import FastAPI, UploadFile, File
-from fastapi.middleware.cors import CORSMiddleware
+import json
+import os
+from urllib.parse import quote
 
-from gemini_client import ask_gemini
+from fastapi import FastAPI, UploadFile, File, Query, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from gemini_client import (
+    ai_stats,
+    ask_gemini_cached,
+    ask_gemini_stream,
+    cache_lookup,
+    cache_store,
+    is_error_reply,
+)
+from attachment_store import iter_blob, open_blob, parse_range, put_stream
+from eco_analytics import PERIODS, sql_impact, store_impact, store_riskiest
+from eco_bulk import ingest
+from eco_prompts import summary_prompt, impact_prompt
+from eco_search import INDEX as SEARCH_INDEX
+from eco_similarity import INDEX as SIMILAR_INDEX
+from item_graph import DIRECTIONS, GRAPH as ITEM_GRAPH, MAX_DEPTH, impact_report, sql_where_used
+from eco_batch import MAX_TOKEN_BUDGET, MIN_TOKEN_BUDGET, summarize_batch
+from eco_jobs import JobManager, FINISHED
+from metrics import CONTENT_TYPE, Gauge, MetricsMiddleware, recent_spans, render
 from mock_teamcenter import seed_mock_eco_1001
-from teamcenter_client import create_eco, get_eco_details
+from teamcenter_client import (
+    create_eco as db_create_eco,
+    get_eco_details as db_get_eco_details,
+)
 
 # --- NEW Mock Teamcenter (your DB version) ---
 from mock_teamcenter import (
@@ -17,8 +43,13 @@ from mock_teamcenter import (
     update_eco_status,
     add_impacted_item,
     remove_impacted_item,
-    list_all_ecos
+    query_ecos,
+    attach_file,
+    get_attachment,
+    open_journal,
+    MOCK_DB,
 )
+import mock_teamcenter
 
 # -------------------------------------------------------------
 # Safety Wrapper – ensures backend never returns raw strings
@@ -38,6 +69,40 @@ def safe(result):
 
 app = FastAPI()
 
+# Mock Teamcenter state survives restarts: snapshot + journal tail (eco_journal.py).
+# Restored before the indexes below attach, so they index it in one pass.
+JOURNAL_INFO = open_journal() if os.getenv("ECO_JOURNAL", "1") == "1" else None
+
+# Full-text search index, kept current by store / save_ecos listeners
+SEARCH_INDEX.attach_store(MOCK_DB)
+SEARCH_INDEX.attach_db()
+
+# Local similar-ECO index; precedents ground the impact prompt (0 disables)
+SIMILAR_INDEX.attach_store(MOCK_DB)
+IMPACT_PRECEDENTS = int(os.getenv("IMPACT_PRECEDENTS", 3))
+
+# Background impact-analysis jobs (bounded worker pool, see eco_jobs.py)
+JOBS = JobManager()
+
+Gauge("eco_jobs_queue_depth", "Impact jobs waiting for a worker", fn=lambda: JOBS.stats()["queue_depth"])
+Gauge("eco_jobs_running", "Impact jobs being processed", fn=lambda: JOBS.stats()["running"])
+if JOURNAL_INFO is not None:
+    Gauge("eco_journal_entries_since_snapshot", "Journal entries a restart would replay",
+          fn=lambda: mock_teamcenter.JOURNAL.stats()["since_snapshot"])
+
+
+@app.on_event("shutdown")
+async def stop_jobs():
+    # running impact jobs are marked cancelled; workers restart on the next loop
+    await JOBS.shutdown()
+
+
+@app.on_event("shutdown")
+def snapshot_on_shutdown():
+    # next start loads the snapshot and replays nothing
+    if mock_teamcenter.JOURNAL is not None:
+        mock_teamcenter.JOURNAL.close()
+
 # -------------------------------------------------------------
 # CORS for Frontend
 # -------------------------------------------------------------
@@ -49,6 +114,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency + trace ids (outermost, so CORS handling is timed too)
+app.add_middleware(MetricsMiddleware)
+
 # -------------------------------------------------------------
 # ROOT TEST
 # -------------------------------------------------------------
@@ -56,49 +124,217 @@ app.add_middleware(
 def root():
     return {"message": "Teamcenter ECO PoC backend running", "mock_mode": True}
 
+# Dashboard header KPIs — counters kept up to date by the store, no scan
+@app.get("/kpi")
+def route_kpi():
+    return MOCK_DB.kpis()
+
+# -------------------------------------------------------------
+# OBSERVABILITY — Prometheus scrape target + recent trace spans
+# -------------------------------------------------------------
+@app.get("/metrics")
+def route_metrics():
+    return PlainTextResponse(render(), media_type=CONTENT_TYPE)
+
+
+@app.get("/debug/traces")
+def route_traces(limit: int = Query(100, ge=1, le=2000), trace_id: str | None = None):
+    return {"spans": recent_spans(limit, trace_id)}
+
+
+@app.get("/debug/journal")
+def route_journal():
+    if mock_teamcenter.JOURNAL is None:
+        return {"enabled": False}
+    return {"enabled": True, "startup": JOURNAL_INFO, **mock_teamcenter.JOURNAL.stats()}
+
 # ==================================================================
 # SUMMARY (Gemini)
 # ==================================================================
 @app.get("/eco/{eco_id}/summarize")
-def summarize_eco(eco_id: str):
+async def summarize_eco(eco_id: str):
     """
     Uses Gemini to generate summary.
     Does NOT use old get_mock_eco() anymore.
+    Async: throttled retries await instead of holding a threadpool worker.
     """
     eco = get_eco_details(eco_id)
     if "error" in eco:
         return eco
 
-    prompt = f"""
-    Summarize this ECO clearly:
+    prompt = summary_prompt(eco)
+
+    summary, cached, coalesced = await ask_gemini_cached(prompt, eco_id=eco_id, version=eco.get("updated_at"))
+    return {"eco_id": eco_id, "summary": summary, "cached": cached, "coalesced": coalesced}
+
+# ==================================================================
+# AI STATS — cache hits, coalesced calls, circuit state
+# ==================================================================
+@app.get("/eco/ai/stats")
+def route_ai_stats():
+    return ai_stats()
 
-    Title: {eco.get('title')}
-    Description: {eco.get('description')}
-    Revision: {eco.get('revision')}
-    Status: {eco.get('status')}
+# ==================================================================
+# BATCH SUMMARY (Gemini) — many ECOs per model call
+# ==================================================================
+@app.post("/eco/summarize/batch")
+async def summarize_eco_batch(
+    body: dict,
+    token_budget: int | None = Query(None, ge=MIN_TOKEN_BUDGET, le=MAX_TOKEN_BUDGET),
+):
+    """
+    Body: {"eco_ids": [...], "token_budget": optional int (or ?token_budget=)}
+    Uncached ECOs are packed into prompts up to the token budget; each
+    per-ECO summary is cached like a /eco/{eco_id}/summarize result.
+    Batches run one at a time; those the rate limiter can't admit come
+    back as per-ECO errors instead of tripping the circuit breaker.
     """
+    eco_ids = body.get("eco_ids")
+    if not isinstance(eco_ids, list) or not eco_ids:
+        return {"error": "'eco_ids' must be a non-empty list"}
+    if token_budget is None:
+        token_budget = body.get("token_budget")
+    return await summarize_batch([str(e) for e in eco_ids], token_budget)
+
+# ==================================================================
+# SIMILAR ECOs — local TF-IDF retrieval, no model call
+# ==================================================================
+@app.get("/eco/{eco_id}/similar")
+def route_similar_ecos(eco_id: str, k: int = Query(5, ge=1, le=50)):
+    return safe(SIMILAR_INDEX.similar(eco_id, k=k))
+
 
-    summary = ask_gemini(prompt)
-    return {"eco_id": eco_id, "summary": summary}
+def grounded_impact_prompt(eco: dict) -> str:
+    """impact_prompt() with the most similar past ECOs attached as precedent."""
+    similar = []
+    if IMPACT_PRECEDENTS > 0:
+        similar = SIMILAR_INDEX.similar(eco["eco_uid"], k=IMPACT_PRECEDENTS).get("similar", [])
+    return impact_prompt(eco, similar)
 
 # ==================================================================
 # IMPACT (Gemini)
 # ==================================================================
 @app.get("/eco/{eco_id}/impact")
-def impact_eco(eco_id: str):
+async def impact_eco(eco_id: str):
     eco = get_eco_details(eco_id)
     if "error" in eco:
         return eco
 
-    bom = eco.get("impacted_items", [])
+    # off the event loop: the first query after a bulk ingest re-indexes it
+    prompt = await run_in_threadpool(grounded_impact_prompt, eco)
+
+    impact, cached, coalesced = await ask_gemini_cached(prompt, eco_id=eco_id, version=eco.get("updated_at"))
+    return {"eco_id": eco_id, "impact_analysis": impact, "cached": cached, "coalesced": coalesced}
+
+# ==================================================================
+# STREAMING SUMMARY / IMPACT (Server-Sent Events)
+# ==================================================================
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 
-    prompt = f"""
-    Perform engineering impact analysis based on this impacted item list:
-    {bom}
+async def _sse_answer(eco_id: str, build_prompt):
+    """
+    Events: `chunk` {"text"} as model output arrives, then `done`
+    {"cached"}; `error` {...} if the ECO does not exist.
+    Cache hits are sent as a single chunk.
     """
+    eco = get_eco_details(eco_id)
+    if "error" in eco:
+        yield _sse("error", eco)
+        return
+
+    prompt = await run_in_threadpool(build_prompt, eco)
+    version = eco.get("updated_at")
 
-    impact = ask_gemini(prompt)
-    return {"eco_id": eco_id, "impact_analysis": impact}
+    cached = await cache_lookup(prompt, eco_id, version)
+    if cached is not None:
+        yield _sse("chunk", {"text": cached})
+        yield _sse("done", {"eco_id": eco_id, "cached": True})
+        return
+
+    parts = []
+    async for text in ask_gemini_stream(prompt):
+        parts.append(text)
+        yield _sse("chunk", {"text": text})
+
+    # a failure may arrive after some chunks; only cache clean answers
+    if not any(is_error_reply(text.lstrip()) for text in parts):
+        await cache_store(prompt, "".join(parts), eco_id, version)
+    yield _sse("done", {"eco_id": eco_id, "cached": False})
+
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+@app.get("/eco/{eco_id}/summarize/stream")
+async def summarize_eco_stream(eco_id: str):
+    return StreamingResponse(
+        _sse_answer(eco_id, summary_prompt), media_type="text/event-stream", headers=SSE_HEADERS
+    )
+
+
+@app.get("/eco/{eco_id}/impact/stream")
+async def impact_eco_stream(eco_id: str):
+    return StreamingResponse(
+        _sse_answer(eco_id, grounded_impact_prompt), media_type="text/event-stream", headers=SSE_HEADERS
+    )
+
+# ==================================================================
+# IMPACT JOBS — submit, poll / SSE, cancel
+# Declared before /eco/{change_id} so "jobs" is not taken as an id.
+# ==================================================================
+@app.post("/eco/{eco_id}/impact/jobs")
+async def submit_impact_job(eco_id: str):
+    eco = get_eco_details(eco_id)
+    if "error" in eco:
+        return eco
+
+    async def run():
+        prompt = await run_in_threadpool(grounded_impact_prompt, eco)
+        impact, cached, coalesced = await ask_gemini_cached(prompt, eco_id=eco_id, version=eco.get("updated_at"))
+        if is_error_reply(impact):      # refused / overloaded: the job failed, not a result
+            raise RuntimeError(impact)
+        return {"eco_id": eco_id, "impact_analysis": impact, "cached": cached, "coalesced": coalesced}
+
+    job = JOBS.submit("impact", eco_id, run)
+    if "job_id" not in job:     # queue full
+        return job
+    return {"job_id": job["job_id"], "status": job["status"], **JOBS.stats()}
+
+
+@app.get("/eco/jobs")
+def route_job_stats():
+    return JOBS.stats()
+
+
+@app.get("/eco/jobs/{job_id}")
+def route_get_job(job_id: str):
+    return JOBS.get(job_id) or {"error": "Job not found", "job_id": job_id}
+
+
+@app.delete("/eco/jobs/{job_id}")
+def route_cancel_job(job_id: str):
+    return JOBS.cancel(job_id)
+
+
+@app.get("/eco/jobs/{job_id}/events")
+async def route_job_events(job_id: str):
+    """SSE: `status` on connect, then `done` with the full job once it finishes."""
+    async def events():
+        job = JOBS.get(job_id)
+        if job is None:
+            yield _sse("error", {"error": "Job not found", "job_id": job_id})
+            return
+        yield _sse("status", {"job_id": job_id, "status": job["status"]})
+        while job is not None and job["status"] not in FINISHED:
+            job = await JOBS.wait(job_id, timeout=15)
+            if job is not None and job["status"] not in FINISHED:
+                yield ": keep-alive\n\n"
+        if job is not None:
+            yield _sse("done", job)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
 
 # ==================================================================
 # TEAMCENTER MOCK ENDPOINTS (your DB-based mock)
@@ -109,6 +345,54 @@ def impact_eco(eco_id: str):
 def route_create_eco(body: dict):
     return safe(create_eco(body))
 
+# GET ALL ECOs (for database tab) — keyset-paginated, filterable, projectable.
+# Declared before /tc/eco/{eco_uid} so "all" is not taken as a UID.
+@app.get("/tc/eco/all")
+def route_get_all_ecos(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: str | None = None,
+    sort: str = "eco_uid",
+    order: str = "asc",
+    fields: str | None = Query(None, description="Comma-separated, e.g. eco_uid,title,status"),
+    status: str | None = None,
+    creator: str | None = None,
+    uid_prefix: str | None = None,
+    updated_from: str | None = None,
+    updated_to: str | None = None,
+):
+    return safe(query_ecos(
+        limit=limit,
+        cursor=cursor,
+        sort=sort,
+        order=order,
+        fields=[f.strip() for f in fields.split(",") if f.strip()] if fields else None,
+        uid_prefix=uid_prefix,
+        status=status,
+        creator=creator,
+        updated_from=updated_from,
+        updated_to=updated_to,
+    ))
+
+# FULL-TEXT SEARCH — titles, descriptions, impacted item UIDs (bm25-ranked).
+# Words match as prefixes ("PRT-10" finds PRT-1002), "quoted text" as a phrase.
+@app.get("/tc/eco/search")
+def route_search_ecos(
+    q: str,
+    limit: int = Query(20, ge=1, le=200),
+    cursor: int = Query(0, ge=0, description="Offset returned as next_cursor"),
+    source: str | None = Query(None, description="store (mock Teamcenter) or sql (eco_master)"),
+):
+    return safe(SEARCH_INDEX.search(q, limit=limit, offset=cursor, source=source))
+
+# BULK CREATE — streamed NDJSON or JSON array, written in batched transactions
+@app.post("/tc/eco/bulk")
+async def route_bulk_create(request: Request, backend: str = "mock"):
+    """
+    backend=mock   → records shaped like /tc/eco/create (+ impacted_items, datasets)
+    backend=sqlite → records shaped like /eco/create (eco_master / eco_bom)
+    """
+    return safe(await ingest(request.stream(), backend=backend))
+
 # GET ECO DETAILS
 @app.get("/tc/eco/{eco_uid}")
 def route_get_eco(eco_uid: str):
@@ -129,20 +413,16 @@ def route_add_item(eco_uid: str, item_uid: str):
 def route_remove_item(eco_uid: str, item_uid: str):
     return safe(remove_impacted_item(eco_uid, item_uid))
 
-# GET ALL ECOs (for database tab)
-@app.get("/tc/eco/all")
-def route_get_all_ecos():
-    return safe(list_all_ecos())
-
 
 @app.post("/tc/eco/seed_1001")
 async def seed_1001():
     return seed_mock_eco_1001()
 
 
+# SQLite-backed (eco_master / eco_bom); sync so it runs in the threadpool
 @app.post("/eco/create")
-async def create_eco_api(data: dict):
-    return create_eco(
+def create_eco_api(data: dict):
+    return db_create_eco(
         change_id=data["change_id"],
         title=data["title"],
         description=data["description"],
@@ -152,27 +432,124 @@ async def create_eco_api(data: dict):
 
 
 @app.get("/eco/{change_id}")
-async def get_details(change_id: str):
-    details = get_eco_details(change_id)
+def get_details(change_id: str):
+    details = db_get_eco_details(change_id)
     if details:
         return details
     return {"error": "ECO not found"}
 
 
 # ==================================================================
-# ATTACH FILE (Mock Mode Only)
+# ANALYTICS — portfolio-wide impact counts and weighted risk
+# ==================================================================
+@app.get("/analytics/impact")
+def route_impact_analytics(
+    source: str = "store",
+    group_by: str = "none",
+    period: str = Query("month", description=", ".join(PERIODS)),
+):
+    """
+    source=store → mock Teamcenter ECOs; group_by none|status|creator|period
+    source=sql   → SQLite ECOs (eco_master / eco_bom); group_by none|eco|period
+    """
+    if source == "store":
+        return safe(store_impact(MOCK_DB, group_by=group_by, period=period))
+    if source == "sql":
+        return safe(sql_impact(group_by=group_by, period=period))
+    return {"error": f"Invalid source '{source}'", "allowed": ["store", "sql"]}
+
+
+@app.get("/analytics/riskiest")
+def route_riskiest_ecos(limit: int = Query(10, ge=1, le=100)):
+    return safe(store_riskiest(MOCK_DB, limit=limit))
+
+
+# ==================================================================
+# ITEMS — where-used, BOM links, multi-hop impact propagation
+# ==================================================================
+@app.get("/tc/item/{item_uid}/where-used")
+def route_where_used(item_uid: str, source: str = "store"):
+    """ECOs that list the item: source=store (mock Teamcenter) or sql (eco_bom)."""
+    if source == "store":
+        return {"item": item_uid, "ecos": MOCK_DB.where_used([item_uid])[item_uid],
+                "parents": ITEM_GRAPH.parents(item_uid), "children": ITEM_GRAPH.children(item_uid)}
+    if source == "sql":
+        return safe({"item": item_uid, "ecos": sql_where_used(item_uid)})
+    return {"error": f"Invalid source '{source}'", "allowed": ["store", "sql"]}
+
+
+@app.post("/tc/item/links")
+def route_add_item_links(body: dict):
+    """Body: {"links": [{"parent": "ASM-1", "child": "PRT-7"}, ...]} — BOM lines."""
+    links = body.get("links")
+    if not isinstance(links, list) or not all(isinstance(l, dict) for l in links):
+        return {"error": "'links' must be a list of {parent, child} objects"}
+    result = ITEM_GRAPH.add_links(links)
+    if "error" in result:
+        return result
+    return {"status": "success", **result, **ITEM_GRAPH.stats()}
+
+
+@app.get("/tc/item/{item_uid}/impact")
+def route_item_impact(item_uid: str, depth: int = Query(3, ge=0, le=MAX_DEPTH),
+                      direction: str = Query("up", description="|".join(DIRECTIONS))):
+    return safe(impact_report(ITEM_GRAPH, MOCK_DB, [item_uid], direction, depth))
+
+
+@app.get("/eco/{eco_id}/propagation")
+def route_eco_propagation(eco_id: str, depth: int = Query(3, ge=0, le=MAX_DEPTH),
+                          direction: str = Query("up", description="|".join(DIRECTIONS))):
+    """Items reachable from the ECO's impacted items, and the ECOs touching them."""
+    eco = get_eco_details(eco_id)
+    if "error" in eco:
+        return eco
+    sources = [it["item"] for it in eco.get("impacted_items", [])]
+    return safe({"eco_id": eco_id, **impact_report(ITEM_GRAPH, MOCK_DB, sources, direction, depth)})
+
+
+# ==================================================================
+# ATTACHMENTS (Mock Mode) — streamed to content-addressed blob storage
 # ==================================================================
 @app.post("/tc/eco/{eco_uid}/attach")
 async def route_attach_file(eco_uid: str, file: UploadFile = File(...)):
     """
-    Fake file attachment. Saves file metadata inside mock DB.
+    Copy the upload to disk in chunks while hashing it (see attachment_store.py)
+    and link the metadata to the ECO. Identical content is stored once.
     """
-    content = await file.read()
-    size = len(content)
-
-    return {
-        "status": "success",
-        "eco_uid": eco_uid,
-        "filename": file.filename,
-        "size_bytes": size
+    if eco_uid not in MOCK_DB:
+        return {"error": "ECO not found", "eco_uid": eco_uid}
+
+    blob = await run_in_threadpool(put_stream, file.file)
+    return safe(attach_file(eco_uid, file.filename, file.content_type, blob))
+
+
+@app.get("/tc/eco/{eco_uid}/attachments/{sha256}")
+def route_download_attachment(eco_uid: str, sha256: str, request: Request):
+    """Download an attachment; honours a single `Range: bytes=...` request."""
+    attachment = get_attachment(eco_uid, sha256)
+    if "error" in attachment:
+        return JSONResponse(attachment, status_code=404)
+    blob = open_blob(sha256)
+    if blob is None:
+        return JSONResponse({"error": "Attachment content missing", "sha256": sha256}, status_code=404)
+
+    path, size = blob
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": f'"{sha256}"',
+        "Content-Disposition": f"attachment; filename*=UTF-8''{quote(attachment['filename'] or sha256)}",
     }
+    try:
+        byte_range = parse_range(request.headers.get("range"), size)
+    except ValueError:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(iter_blob(path), media_type=attachment["content_type"], headers=headers)
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(iter_blob(path, start, end), status_code=206,
+                             media_type=attachment["content_type"], headers=headers)
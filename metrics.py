@@ -0,0 +1,314 @@
+# metrics.py — Prometheus-format metrics and lightweight tracing spans
+#
+#   REQUESTS = Counter("eco_requests_total", "Requests", ("route",))
+#   REQUESTS.inc(route="/tc/eco/{eco_uid}")
+#   with span("store.page", LATENCY, op="page"): ...
+#
+# No client library: counters, gauges and histograms are kept in-process
+# and rendered in the text exposition format by render() (GET /metrics).
+# Spans time a block, feed an optional histogram and, inside a traced
+# HTTP request, land in a ring buffer of recent spans (GET /debug/traces).
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from itertools import count
+
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", 2000))
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1)
+
+
+# ---------------------------------------------------------
+# Metric types
+# ---------------------------------------------------------
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames=(), fn=None, registry=None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.fn = fn                # optional callback: value, or {label tuple: value}
+        self._lock = threading.Lock()
+        self._values = {}
+        (REGISTRY if registry is None else registry).register(self)
+
+    def _key(self, labels):
+        if len(labels) == len(self.labelnames):
+            try:
+                return tuple([str(labels[n]) for n in self.labelnames])
+            except KeyError:
+                pass
+        raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+
+    def _samples(self):
+        if self.fn is None:
+            with self._lock:
+                return list(self._values.items())
+        value = self.fn()
+        return list(value.items()) if isinstance(value, dict) else [((), value)]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in self._samples():
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames, registry=registry)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        pos = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][pos] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            samples = [(k, list(s[0]), s[1], s[2]) for k, s in self._values.items()]
+        for key, counts, total, count in samples:
+            cumulative = 0
+            for bound, n in zip((*self.buckets, float("inf")), counts):
+                cumulative += n
+                le = (("le", _number(float(bound))),)
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:     # a broken callback must not take /metrics down
+                lines.append(f"# {metric.name} unavailable: {e}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+# ---------------------------------------------------------
+# Tracing
+# ---------------------------------------------------------
+_trace_id = contextvars.ContextVar("trace_id", default=None)
+_span_id = contextvars.ContextVar("span_id", default=None)
+_recent = deque(maxlen=TRACE_BUFFER_SIZE)
+_span_ids = count(1)
+
+SPAN_SECONDS = Histogram("eco_span_duration_seconds", "Duration of traced operations without their own histogram", ("span",),
+                         buckets=FAST_BUCKETS + (2.5, 5, 10, 30, 60))
+
+
+def current_trace_id():
+    return _trace_id.get()
+
+
+class span:
+    """
+    Time a block as a span named `name`. The duration goes to `histogram`
+    with `labels` if given, otherwise to eco_span_duration_seconds.
+    Spans opened inside a traced request are kept for /debug/traces.
+    (A class rather than @contextmanager: it wraps every store call.)
+    """
+
+    __slots__ = ("name", "histogram", "labels", "trace_id", "span_id", "token", "start")
+
+    def __init__(self, name: str, histogram: Histogram | None = None, **labels):
+        self.name = name
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.trace_id = _trace_id.get()
+        if self.trace_id:
+            self.span_id = f"{next(_span_ids):x}"
+            self.token = _span_id.set(self.span_id)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        if self.histogram is not None:
+            self.histogram.observe(elapsed, **self.labels)
+        else:
+            SPAN_SECONDS.observe(elapsed, span=self.name)
+        if self.trace_id:
+            try:
+                _span_id.reset(self.token)
+            except ValueError:      # finished in another context (e.g. a generator moved tasks)
+                pass
+            _recent.append({
+                "trace_id": self.trace_id,
+                "span_id": self.span_id,
+                "parent_id": _span_id.get(),
+                "name": self.name,
+                "duration_ms": round(elapsed * 1000, 3),
+                "error": exc_type.__name__ if exc_type else None,
+                "end": time.time(),
+            })
+        return False
+
+
+def traced(name: str, histogram: Histogram | None = None, **labels):
+    """Decorator form of span() for sync and async functions."""
+    def decorate(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(name, histogram, **labels):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name, histogram, **labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def recent_spans(limit: int = 100, trace_id: str | None = None):
+    spans = list(_recent)
+    if trace_id:
+        spans = [s for s in spans if s["trace_id"] == trace_id]
+    return spans[-limit:]
+
+
+# ---------------------------------------------------------
+# HTTP middleware (pure ASGI, so streamed bodies are timed to the last byte)
+# ---------------------------------------------------------
+HTTP_SECONDS = Histogram("eco_http_request_duration_seconds", "HTTP request latency by route",
+                         ("method", "route", "status"))
+HTTP_IN_FLIGHT = Gauge("eco_http_requests_in_flight", "HTTP requests being served")
+
+
+class MetricsMiddleware:
+    """
+    Per-route latency (route template, not raw path, to bound cardinality),
+    in-flight gauge and a trace id per request (X-Trace-Id in and out).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        incoming = dict(scope.get("headers") or []).get(b"x-trace-id", b"").decode("latin-1")
+        trace_id = incoming[:64] or os.urandom(16).hex()
+        token = _trace_id.set(trace_id)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-trace-id", trace_id.encode())]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            with span(f"http {scope['method']}"):
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            HTTP_SECONDS.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status["code"],
+            )
+            _trace_id.reset(token)
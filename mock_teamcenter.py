@@ -1,10 +1,40 @@
 # mock_teamcenter.py — Full Mock Teamcenter with Database, Timestamps, Revisions
 
+import base64
+import json
 from datetime import datetime
 
+from eco_journal import DATA_DIR, Journal
+from eco_store import EcoStore
+from eco_validation import validate_mock_record
+
 
 ECO_COUNTER = 1
-MOCK_DB = {}  # stores all ECOs
+MOCK_DB = EcoStore()  # stores all ECOs (indexed by status, creator, revision, item, updated_at)
+JOURNAL = None        # set by open_journal(); until then writes are memory-only
+
+
+
+def open_journal(directory: str = DATA_DIR):
+    """
+    Restore MOCK_DB and ECO_COUNTER from the snapshot + journal in `directory`
+    and journal every write from now on. Call once at startup, before writes.
+    """
+    global JOURNAL, ECO_COUNTER
+    journal = Journal(MOCK_DB, directory)
+    info = journal.restore()
+    with MOCK_DB.lock:
+        ECO_COUNTER = max(ECO_COUNTER, journal.eco_counter or 1)
+        journal.eco_counter = ECO_COUNTER
+        JOURNAL = journal
+    return {**info, "eco_counter": ECO_COUNTER}
+
+
+
+def _log(op, *args):
+    """Journal a write (caller holds MOCK_DB.lock and has applied it)."""
+    if JOURNAL is not None:
+        JOURNAL.append(op, *args)
 
 
 
@@ -15,21 +45,20 @@ def next_revision(current: str | None):
 
 
 
-def create_eco(payload: dict):
+def _next_eco_uid():
     global ECO_COUNTER
+    with MOCK_DB.lock:
+        eco_uid = f"ECO-{datetime.now().year}-{ECO_COUNTER:04d}"
+        ECO_COUNTER += 1
+    return eco_uid
 
-    # Generate ECO ID
-    year = datetime.now().year
-    eco_uid = f"ECO-{year}-{ECO_COUNTER:04d}"
-    ECO_COUNTER += 1
 
+
+def _build_eco_record(eco_uid: str, payload: dict, timestamp: str):
     title = payload.get("properties", {}).get("object_name", "Untitled ECO")
     desc = payload.get("properties", {}).get("object_desc", "")
 
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-    # New ECO record
-    eco_record = {
+    return {
         "eco_uid": eco_uid,
         "title": title,
         "description": desc,
@@ -38,11 +67,26 @@ def create_eco(payload: dict):
         "created_at": timestamp,
         "updated_at": timestamp,
         "status": "Created",
-        "impacted_items": [],
-        "datasets": [],
+        "impacted_items": [dict(it) for it in payload.get("impacted_items", [])],
+        "datasets": list(payload.get("datasets", [])),
+        "attachments": [],
     }
 
-    MOCK_DB[eco_uid] = eco_record
+
+
+def create_eco(payload: dict):
+    error = validate_mock_record(payload)
+    if error:
+        return {"error": error}
+
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    # New ECO record
+    with MOCK_DB.lock:
+        eco_uid = _next_eco_uid()
+        eco_record = _build_eco_record(eco_uid, payload, timestamp)
+        MOCK_DB.put(eco_record)
+        _log("create", eco_record, ECO_COUNTER)
 
     return {
         "status": "success",
@@ -52,51 +96,73 @@ def create_eco(payload: dict):
 
 
 
-def get_eco_details(eco_uid: str):
-    eco = MOCK_DB.get(eco_uid)
-    if not eco:
-        return {"error": "ECO not found", "eco_uid": eco_uid}
-    return eco
+def create_ecos_bulk(payloads: list):
+    """
+    Create many ECOs under a single store lock acquisition.
+    Payloads use the create_eco shape, optionally with impacted_items/datasets.
+    Returns the new eco_uids in payload order.
+    """
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    eco_uids, entries = [], []
+    with MOCK_DB.lock:
+        for payload in payloads:
+            eco_uid = _next_eco_uid()
+            record = _build_eco_record(eco_uid, payload, timestamp)
+            MOCK_DB.put(record)
+            eco_uids.append(eco_uid)
+            entries.append(("create", record, ECO_COUNTER))
+        if JOURNAL is not None:
+            JOURNAL.extend(entries)
+    return eco_uids
 
 
 
-def update_eco_status(eco_uid: str, action: str):
+def get_eco_details(eco_uid: str):
     eco = MOCK_DB.get(eco_uid)
     if not eco:
         return {"error": "ECO not found", "eco_uid": eco_uid}
+    return eco
 
-    old_status = eco["status"]
 
-    if action.lower() == "promote":
-        eco["revision"] = next_revision(eco["revision"])
-        eco["status"] = f"Promoted to Rev {eco['revision']}"
-    elif action.lower() == "demote":
-        eco["status"] = f"Demoted (no revision change)"
-    else:
-        eco["status"] = "Unknown Action"
 
-    eco["updated_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+def update_eco_status(eco_uid: str, action: str):
+    with MOCK_DB.lock:
+        eco = MOCK_DB.get(eco_uid)
+        if not eco:
+            return {"error": "ECO not found", "eco_uid": eco_uid}
+
+        old_status = eco["status"]
+        revision = eco["revision"]
+
+        if action.lower() == "promote":
+            revision = next_revision(revision)
+            new_status = f"Promoted to Rev {revision}"
+        elif action.lower() == "demote":
+            new_status = f"Demoted (no revision change)"
+        else:
+            new_status = "Unknown Action"
+
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        MOCK_DB.update(eco_uid, updated_at=timestamp, revision=revision, status=new_status)
+        _log("update", eco_uid, timestamp, {"revision": revision, "status": new_status})
 
     return {
         "status": "success",
         "old_status": old_status,
-        "new_status": eco["status"],
+        "new_status": new_status,
         "eco_uid": eco_uid,
     }
 
 
 
 def add_impacted_item(eco_uid: str, item_uid: str):
-    eco = MOCK_DB.get(eco_uid)
-    if not eco:
-        return {"error": "ECO not found", "eco_uid": eco_uid}
-
-    eco["impacted_items"].append({
-        "item": item_uid,
-        "impact": "Medium"  
-    })
+    with MOCK_DB.lock:
+        if eco_uid not in MOCK_DB:
+            return {"error": "ECO not found", "eco_uid": eco_uid}
 
-    eco["updated_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        MOCK_DB.add_item(eco_uid, item_uid, impact="Medium", updated_at=timestamp)
+        _log("add_item", eco_uid, item_uid, "Medium", timestamp)
 
     return {
         "status": "success",
@@ -107,15 +173,13 @@ def add_impacted_item(eco_uid: str, item_uid: str):
 
 
 def remove_impacted_item(eco_uid: str, item_uid: str):
-    eco = MOCK_DB.get(eco_uid)
-    if not eco:
-        return {"error": "ECO not found", "eco_uid": eco_uid}
-
-    eco["impacted_items"] = [
-        it for it in eco["impacted_items"] if it["item"] != item_uid
-    ]
+    with MOCK_DB.lock:
+        if eco_uid not in MOCK_DB:
+            return {"error": "ECO not found", "eco_uid": eco_uid}
 
-    eco["updated_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        MOCK_DB.remove_item(eco_uid, item_uid, updated_at=timestamp)
+        _log("remove_item", eco_uid, item_uid, timestamp)
 
     return {
         "status": "success",
@@ -125,9 +189,120 @@ def remove_impacted_item(eco_uid: str, item_uid: str):
 
 
 
+def attach_file(eco_uid: str, filename: str, content_type: str | None, blob: dict):
+    """Link a stored blob (see attachment_store.put_stream) to an ECO."""
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    attachment = {
+        "sha256": blob["sha256"],
+        "filename": filename,
+        "content_type": content_type or "application/octet-stream",
+        "size_bytes": blob["size_bytes"],
+        "uploaded_at": timestamp,
+    }
+    with MOCK_DB.lock:
+        if eco_uid not in MOCK_DB:
+            return {"error": "ECO not found", "eco_uid": eco_uid}
+        MOCK_DB.add_attachment(eco_uid, attachment, updated_at=timestamp)
+        _log("attach", eco_uid, attachment, timestamp)
+
+    return {
+        "status": "success",
+        "eco_uid": eco_uid,
+        "attachment": attachment,
+        "deduplicated": blob["deduplicated"],
+    }
+
+
+
+def get_attachment(eco_uid: str, sha256: str):
+    eco = MOCK_DB.get(eco_uid)
+    if not eco:
+        return {"error": "ECO not found", "eco_uid": eco_uid}
+    for attachment in eco.get("attachments", []):
+        if attachment["sha256"] == sha256:
+            return attachment
+    return {"error": "Attachment not found", "eco_uid": eco_uid, "sha256": sha256}
+
+
+
 def list_all_ecos():
     """Return all ECOs for listing page."""
-    return list(MOCK_DB.values())
+    return MOCK_DB.values()
+
+
+
+def find_ecos(status=None, creator=None, revision=None, item=None,
+              updated_from=None, updated_to=None):
+    """Index-backed filtering; every filter is optional."""
+    return MOCK_DB.find(
+        status=status,
+        creator=creator,
+        revision=revision,
+        item=item,
+        updated_from=updated_from,
+        updated_to=updated_to,
+    )
+
+
+
+def _encode_cursor(sort: str, order: str, key):
+    raw = json.dumps([sort, order, key], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str):
+    padded = cursor + "=" * (-len(cursor) % 4)
+    sort, order, key = json.loads(base64.urlsafe_b64decode(padded))
+    # key is the (sort_value, eco_uid) pair; every sortable field is a string
+    if not (isinstance(key, list) and len(key) == 2 and all(isinstance(v, str) for v in key)):
+        raise ValueError("malformed cursor key")
+    return sort, order, key
+
+
+
+def query_ecos(limit: int = 50, cursor: str | None = None, sort: str = "eco_uid",
+               order: str = "asc", fields: list | None = None, uid_prefix: str | None = None,
+               status=None, creator=None, updated_from=None, updated_to=None):
+    """
+    One page of ECOs for the listing page.
+    The cursor is opaque to clients: it encodes the sort, the order and the
+    (sort_value, eco_uid) key of the last row returned.
+    """
+    if sort not in EcoStore.SORTED_FIELDS:
+        return {"error": f"Invalid sort '{sort}'", "allowed": list(EcoStore.SORTED_FIELDS)}
+    if order not in ("asc", "desc"):
+        return {"error": f"Invalid order '{order}'", "allowed": ["asc", "desc"]}
+
+    after = None
+    if cursor:
+        try:
+            cursor_sort, cursor_order, after = _decode_cursor(cursor)
+        except Exception:
+            return {"error": "Invalid cursor"}
+        if (cursor_sort, cursor_order) != (sort, order):
+            return {"error": "Cursor does not match sort/order"}
+
+    if fields is not None and "eco_uid" not in fields:
+        fields = ["eco_uid", *fields]
+
+    items, next_key = MOCK_DB.page(
+        sort=sort,
+        descending=(order == "desc"),
+        after=after,
+        limit=limit,
+        uid_prefix=uid_prefix,
+        fields=fields,
+        status=status,
+        creator=creator,
+        updated_from=updated_from,
+        updated_to=updated_to,
+    )
+
+    return {
+        "items": items,
+        "count": len(items),
+        "next_cursor": _encode_cursor(sort, order, next_key) if next_key else None,
+    }
 
 
 
@@ -156,7 +331,10 @@ def seed_mock_eco_1001():
 
         # Old dataset values
         "datasets": ["CAD", "Drawing"],
+        "attachments": [],
     }
 
-    MOCK_DB[eco_uid] = eco_record
+    with MOCK_DB.lock:
+        MOCK_DB.put(eco_record)
+        _log("put", eco_record)
     return eco_record
@@ -0,0 +1,40 @@
+# ratelimit.py — Token bucket shared by the Gemini client and the SOA stand-in
+#
+# Standard library only, so tc_standin.py can use it without importing the
+# Gemini client.
+
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Monotonic-clock token bucket: `capacity` tokens, refilled continuously
+    at capacity / period per second. No background thread — tokens are
+    topped up lazily whenever someone asks for one.
+    """
+
+    def __init__(self, capacity: int, period: float = 60.0):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            self._refill(time.monotonic())
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def available(self) -> int:
+        """Whole tokens left right now (advisory: another caller may take them first)."""
+        with self._lock:
+            self._refill(time.monotonic())
+            return int(self.tokens)
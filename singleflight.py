@@ -0,0 +1,35 @@
+# singleflight.py — Coalesce concurrent identical async calls into one
+
+import asyncio
+
+
+class SingleFlight:
+    """
+    Callers that ask for the same key while a call is in flight await that
+    call's result instead of starting their own.
+    The shared call is shielded, so one caller disconnecting does not cancel
+    it for the others.
+    """
+
+    def __init__(self):
+        self._inflight = {}     # key → asyncio.Future
+        self.stats = {"calls": 0, "executed": 0, "coalesced": 0}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key, fn, *args):
+        """Return (result, coalesced)."""
+        self.stats["calls"] += 1
+
+        fut = self._inflight.get(key)
+        if fut is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(fut), True
+
+        fut = asyncio.ensure_future(fn(*args))
+        self._inflight[key] = fut
+        fut.add_done_callback(lambda _: self._inflight.pop(key, None))
+        self.stats["executed"] += 1
+        return await asyncio.shield(fut), False
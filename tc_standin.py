@@ -0,0 +1,362 @@
+# tc_standin.py — Local Teamcenter SOA stand-in backed by mock_teamcenter
+#
+#   uvicorn tc_standin:app --port 8010
+#   TC_URL=http://127.0.0.1:8010 TC_USERNAME=x TC_PASSWORD=x python insert_1001.py
+#
+# Serves the SOA endpoints teamcenter_client.py targets (Create, getProperties,
+# performAction, create/deleteRelations, FileManagement upload incl. the
+# chunked/resumable protocol) so pooling, batching and retry changes can be
+# measured without a live PLM system.
+#
+# Fault injection, applied to every /tc/api request (env, or POST /standin/config):
+#   TC_STANDIN_LATENCY     fixed:20 | uniform:5:50 | normal:20:5 | lognormal:20:0.5 | exp:20   (ms;
+#                          lognormal takes the median and sigma)
+#   TC_STANDIN_ERROR_RATE  fraction of requests answered 503
+#   TC_STANDIN_RATE_LIMIT  requests/second before answering 429 + Retry-After (0 = off)
+
+import asyncio
+import math
+import os
+import random
+import re
+
+from fastapi import FastAPI, File, Form, Request, UploadFile
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+
+import attachment_store
+from mock_teamcenter import (
+    MOCK_DB,
+    add_impacted_item,
+    attach_file,
+    create_eco,
+    find_ecos,
+    remove_impacted_item,
+    update_eco_status,
+)
+from ratelimit import TokenBucket
+from teamcenter_client import (
+    CREATE_PATH,
+    CREATE_RELATIONS_PATH,
+    DELETE_RELATIONS_PATH,
+    GET_PROPERTIES_PATH,
+    PERFORM_ACTION_PATH,
+    UPLOAD_CHUNK_PATH,
+    UPLOAD_PATH,
+    UPLOAD_STATUS_PATH,
+)
+
+FILE_PREFIX = "FILE-"
+
+_CONTENT_RANGE = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+_UPLOAD_ID = re.compile(r"^[0-9A-Za-z_-]{1,64}$")
+
+
+# ---------------------------------------------------------
+# Fault injection
+# ---------------------------------------------------------
+def parse_latency(spec: str):
+    """'kind:arg[:arg]' in milliseconds → function returning a delay in seconds."""
+    kind, *args = (spec or "fixed:0").split(":")
+    a = [float(x) for x in args] or [0.0]
+    samplers = {
+        "fixed": lambda: a[0],
+        "uniform": lambda: random.uniform(a[0], a[1]),
+        "normal": lambda: random.gauss(a[0], a[1]),
+        "lognormal": lambda: a[0] * math.exp(random.gauss(0, a[1])),
+        "exp": lambda: random.expovariate(1 / a[0]) if a[0] else 0.0,
+    }
+    if kind not in samplers or (kind in ("uniform", "normal", "lognormal") and len(a) < 2):
+        raise ValueError(f"Invalid latency spec '{spec}'")
+    sample = samplers[kind]
+    return lambda: max(0.0, sample()) / 1000
+
+
+class Faults:
+    def __init__(self, latency="fixed:0", error_rate=0.0, rate_limit=0.0):
+        self.stats = {"requests": 0, "throttled": 0, "injected_errors": 0}
+        self.configure(latency, error_rate, rate_limit)
+
+    def configure(self, latency=None, error_rate=None, rate_limit=None):
+        if latency is not None:
+            self.delay = parse_latency(latency)
+            self.latency = latency
+        if error_rate is not None:
+            self.error_rate = float(error_rate)
+        if rate_limit is not None:
+            self.rate_limit = float(rate_limit)
+            self.bucket = TokenBucket(max(1, int(self.rate_limit)), 1.0) if self.rate_limit > 0 else None
+
+    def config(self):
+        return {"latency": self.latency, "error_rate": self.error_rate, "rate_limit": self.rate_limit}
+
+
+FAULTS = Faults(
+    latency=os.getenv("TC_STANDIN_LATENCY", "fixed:0"),
+    error_rate=float(os.getenv("TC_STANDIN_ERROR_RATE", 0)),
+    rate_limit=float(os.getenv("TC_STANDIN_RATE_LIMIT", 0)),
+)
+
+app = FastAPI(title="Teamcenter SOA stand-in")
+
+
+@app.middleware("http")
+async def inject_faults(request: Request, call_next):
+    if not request.url.path.startswith("/tc/api/"):
+        return await call_next(request)
+
+    FAULTS.stats["requests"] += 1
+    if FAULTS.bucket is not None and not FAULTS.bucket.try_acquire():
+        FAULTS.stats["throttled"] += 1
+        return JSONResponse({"error": "Too many requests"}, status_code=429, headers={"Retry-After": "1"})
+    if FAULTS.error_rate and random.random() < FAULTS.error_rate:
+        FAULTS.stats["injected_errors"] += 1
+        return JSONResponse({"error": "Injected failure"}, status_code=503)
+
+    await asyncio.sleep(FAULTS.delay())
+    return await call_next(request)
+
+
+@app.get("/standin/stats")
+def standin_stats():
+    return {"config": FAULTS.config(), **FAULTS.stats, "ecos": len(MOCK_DB), "files": len(FILES)}
+
+
+@app.post("/standin/config")
+def standin_config(body: dict):
+    try:
+        FAULTS.configure(body.get("latency"), body.get("error_rate"), body.get("rate_limit"))
+    except ValueError as e:
+        return {"error": str(e)}
+    return {"status": "success", "config": FAULTS.config()}
+
+
+# ---------------------------------------------------------
+# SOA object model
+# ---------------------------------------------------------
+FILES = {}      # file uid → {"sha256", "filename", "content_type", "size_bytes", "deduplicated"}
+
+
+def _prop(*values):
+    return {"dbValues": list(values), "uiValues": [str(v) for v in values]}
+
+
+def _partial_error(uid, message):
+    return {"uid": uid, "errorValues": [{"message": message, "code": 404, "level": 3}]}
+
+
+def eco_object(eco: dict):
+    return {
+        "uid": eco["eco_uid"],
+        "type": "ChangeNoticeRevision",
+        "props": {
+            "object_name": _prop(eco["title"]),
+            "object_desc": _prop(eco["description"]),
+            "item_revision_id": _prop(eco["revision"]),
+            "release_status_list": _prop(eco["status"]),
+            "owning_user": _prop(eco["creator"]),
+            "creation_date": _prop(eco["created_at"]),
+            "last_mod_date": _prop(eco["updated_at"]),
+            "CMHasImpactedItem": _prop(*(it["item"] for it in eco["impacted_items"])),
+            "IMAN_specification": _prop(*(FILE_PREFIX + a["sha256"] for a in eco.get("attachments", []))),
+        },
+    }
+
+
+def file_object(uid: str):
+    meta = FILES[uid]
+    return {
+        "uid": uid,
+        "type": "Dataset",
+        "props": {
+            "object_name": _prop(meta["filename"]),
+            "mime_type": _prop(meta["content_type"]),
+            "byte_size": _prop(meta["size_bytes"]),
+        },
+    }
+
+
+def item_object(uid: str, ecos: list):
+    return {
+        "uid": uid,
+        "type": "Item",
+        "props": {
+            "item_id": _prop(uid),
+            "CMImpactedBy": _prop(*(eco["eco_uid"] for eco in ecos)),
+        },
+    }
+
+
+def lookup(uid: str, attributes=None):
+    """SOA model object for a UID, or None."""
+    eco = MOCK_DB.get(uid)
+    if eco is not None:
+        obj = eco_object(eco)
+    elif uid in FILES:
+        obj = file_object(uid)
+    else:
+        ecos = find_ecos(item=uid)
+        if not ecos:
+            return None
+        obj = item_object(uid, ecos)
+    if attributes:
+        obj["props"] = {k: v for k, v in obj["props"].items() if k in attributes}
+    return obj
+
+
+def service_data(uids, attributes=None):
+    plain, objects, errors = [], {}, []
+    for uid in uids:
+        obj = lookup(uid, attributes)
+        if obj is None:
+            errors.append(_partial_error(uid, "Object not found"))
+            continue
+        plain.append(uid)
+        objects[uid] = obj
+    return {"plain": plain, "modelObjects": objects, "partialErrors": errors}
+
+
+def _register_file(blob: dict, filename: str | None, content_type: str | None):
+    uid = FILE_PREFIX + blob["sha256"]
+    FILES[uid] = {**blob, "filename": filename or uid, "content_type": content_type or "application/octet-stream"}
+    return {"objects": [{"uid": uid, "type": "Dataset"}], "plain": [uid]}
+
+
+# ---------------------------------------------------------
+# SOA endpoints
+# ---------------------------------------------------------
+@app.post(CREATE_PATH)
+def soa_create(body: dict):
+    uids = [create_eco(data)["eco_uid"] for data in body.get("input", [])]
+    return {"output": [{"objects": [{"uid": uid}]} for uid in uids], **service_data(uids)}
+
+
+@app.post(GET_PROPERTIES_PATH)
+def soa_get_properties(body: dict):
+    return service_data([o["uid"] for o in body.get("objects", [])], body.get("attributes"))
+
+
+@app.post(PERFORM_ACTION_PATH)
+def soa_perform_action(body: dict):
+    action = body.get("action", "")
+    done, errors = [], []
+    for o in body.get("objects", []):
+        res = update_eco_status(o["uid"], action)
+        if "error" in res:
+            errors.append(_partial_error(o["uid"], res["error"]))
+        else:
+            done.append(o["uid"])
+    return {**service_data(done), "partialErrors": errors}
+
+
+def _relation(rel: dict, delete: bool):
+    kind = rel.get("relationType")
+    primary = rel.get("primaryObject", {}).get("uid")
+    secondary = rel.get("secondaryObject", {}).get("uid")
+
+    if kind == "CMHasImpactedItem":
+        return (remove_impacted_item if delete else add_impacted_item)(primary, secondary)
+    if kind == "IMAN_specification" and not delete:
+        if secondary not in FILES:
+            return {"error": "File not found", "uid": secondary}
+        meta = FILES[secondary]
+        return attach_file(primary, meta["filename"], meta["content_type"], meta)
+    return {"error": f"Unsupported relation type '{kind}'"}
+
+
+def _relations(body: dict, delete: bool):
+    output, errors = [], []
+    for rel in body.get("input", []):
+        res = _relation(rel, delete)
+        if "error" in res:
+            errors.append(_partial_error(rel.get("primaryObject", {}).get("uid"), res["error"]))
+        else:
+            output.append(rel)
+    return {"output": output, "partialErrors": errors}
+
+
+@app.post(CREATE_RELATIONS_PATH)
+def soa_create_relations(body: dict):
+    return _relations(body, delete=False)
+
+
+@app.post(DELETE_RELATIONS_PATH)
+def soa_delete_relations(body: dict):
+    return _relations(body, delete=True)
+
+
+# ---------------------------------------------------------
+# File upload (single multipart request, or chunked + resumable)
+# ---------------------------------------------------------
+_upload_locks = {}      # upload_id → asyncio.Lock
+_completed = {}         # upload_id → (total, final response); a lost last reply stays idempotent
+
+
+def _upload_path(upload_id: str):
+    return os.path.join(attachment_store.ATTACHMENT_DIR, "tmp", "uploads", upload_id)
+
+
+def _offset(upload_id: str) -> int:
+    path = _upload_path(upload_id)
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def _append(upload_id: str, data: bytes):
+    path = _upload_path(upload_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "ab") as fh:
+        fh.write(data)
+
+
+def _finish(upload_id: str):
+    path = _upload_path(upload_id)
+    with open(path, "rb") as fh:
+        blob = attachment_store.put_stream(fh)
+    os.remove(path)
+    return blob
+
+
+@app.post(UPLOAD_PATH)
+async def soa_upload(file: UploadFile = File(...), container_uid: str = Form("")):
+    blob = await run_in_threadpool(attachment_store.put_stream, file.file)
+    return _register_file(blob, file.filename, file.content_type)
+
+
+@app.post(UPLOAD_STATUS_PATH)
+def soa_upload_status(body: dict):
+    upload_id = str(body.get("upload_id", ""))
+    if not _UPLOAD_ID.match(upload_id):
+        return JSONResponse({"error": "Invalid upload id"}, status_code=400)
+    if upload_id in _completed:
+        return {"upload_id": upload_id, "offset": _completed[upload_id][0], "complete": True}
+    return {"upload_id": upload_id, "offset": _offset(upload_id)}
+
+
+@app.post(UPLOAD_CHUNK_PATH)
+async def soa_upload_chunk(request: Request, filename: str = "", container_uid: str = ""):
+    upload_id = request.headers.get("x-upload-id", "")
+    m = _CONTENT_RANGE.match(request.headers.get("content-range", ""))
+    if not _UPLOAD_ID.match(upload_id) or not m:
+        return JSONResponse({"error": "X-Upload-Id and Content-Range required"}, status_code=400)
+    if upload_id in _completed:
+        return _completed[upload_id][1]
+    start, end, total = (int(g) for g in m.groups())
+
+    data = await request.body()
+    if len(data) != end - start + 1 or end >= total:
+        return JSONResponse({"error": "Chunk does not match Content-Range"}, status_code=400)
+
+    lock = _upload_locks.setdefault(upload_id, asyncio.Lock())
+    async with lock:
+        offset = _offset(upload_id)
+        if start != offset:
+            return JSONResponse({"error": "Offset mismatch", "offset": offset}, status_code=409)
+        await run_in_threadpool(_append, upload_id, data)
+        offset = end + 1
+        if offset < total:
+            return {"upload_id": upload_id, "offset": offset}
+
+        blob = await run_in_threadpool(_finish, upload_id)
+        _upload_locks.pop(upload_id, None)
+        _completed[upload_id] = (total, _register_file(blob, filename, None))
+    return _completed[upload_id][1]
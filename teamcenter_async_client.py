@@ -0,0 +1,184 @@
+# teamcenter_async_client.py — asyncio Teamcenter SOA client for concurrent fan-out reads
+#
+#   async with AsyncTeamcenterClient() as tc:
+#       ecos = await asyncio.gather(*(tc.get_properties(uid) for uid in uids))
+#
+# Same endpoints, payloads and retry policy as teamcenter_client.TeamcenterClient;
+# requests to one host are bounded by a semaphore so callers can gather freely.
+
+import asyncio
+import os
+import random
+from urllib.parse import urlsplit
+
+import httpx
+
+from teamcenter_client import (
+    AUTH,
+    CREATE_PATH,
+    CREATE_RELATIONS_PATH,
+    DELETE_RELATIONS_PATH,
+    GET_PROPERTIES_PATH,
+    PERFORM_ACTION_PATH,
+    RETRY_STATUSES,
+    TC_BACKOFF,
+    TC_CONNECT_TIMEOUT,
+    TC_GET_PROPERTIES_CHUNK,
+    TC_MAX_RETRIES,
+    TC_READ_TIMEOUT,
+    TC_URL,
+    UPLOAD_PATH,
+    check_config,
+    chunked,
+    merge_service_data,
+    objects_payload,
+    relation_payload,
+)
+
+TC_MAX_CONCURRENCY_PER_HOST = int(os.getenv("TC_MAX_CONCURRENCY_PER_HOST", 16))
+
+# Relations loaded alongside each ECO by get_eco_bundles()
+ECO_BUNDLE_RELATIONS = ("CMHasImpactedItem", "IMAN_specification")
+
+
+class AsyncTeamcenterClient:
+    """
+    httpx.AsyncClient-based Teamcenter client.
+    At most `max_per_host` requests are in flight per host; the rest wait
+    on that host's semaphore, so asyncio.gather over hundreds of calls is safe.
+    """
+
+    def __init__(self, base_url=TC_URL, auth=AUTH,
+                 connect_timeout=TC_CONNECT_TIMEOUT, read_timeout=TC_READ_TIMEOUT,
+                 max_retries=TC_MAX_RETRIES, backoff=TC_BACKOFF,
+                 max_per_host=TC_MAX_CONCURRENCY_PER_HOST, chunk_size=TC_GET_PROPERTIES_CHUNK):
+        check_config(base_url, auth)
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_per_host = max_per_host
+        self.chunk_size = chunk_size
+        self._host_limits = {}      # host → asyncio.Semaphore
+
+        self.client = httpx.AsyncClient(
+            auth=(auth.username, auth.password),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_per_host, max_keepalive_connections=max_per_host),
+            transport=httpx.AsyncHTTPTransport(retries=max_retries),    # connect errors only
+        )
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    # ---------------------------------------------------------
+    # Transport
+    # ---------------------------------------------------------
+    def _limit(self, url):
+        host = urlsplit(url).netloc
+        sem = self._host_limits.get(host)
+        if sem is None:
+            sem = self._host_limits[host] = asyncio.Semaphore(self.max_per_host)
+        return sem
+
+    async def _sleep_before_retry(self, attempt, response=None):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            wait = float(retry_after)
+        else:
+            wait = self.backoff * (2 ** attempt) + random.uniform(0, self.backoff)
+        await asyncio.sleep(wait)
+
+    async def post(self, path: str, idempotent: bool = False, **kwargs):
+        """POST to an SOA endpoint and return the decoded JSON body."""
+        url = f"{self.base_url}{path}"
+
+        for attempt in range(self.max_retries + 1):
+            last = attempt == self.max_retries
+            try:
+                async with self._limit(url):
+                    response = await self.client.post(url, **kwargs)
+            except httpx.ReadTimeout:
+                if not idempotent or last:
+                    raise
+                await self._sleep_before_retry(attempt)
+                continue
+
+            if idempotent and response.status_code in RETRY_STATUSES and not last:
+                await self._sleep_before_retry(attempt, response)
+                continue
+            return response.json()
+
+    # ---------------------------------------------------------
+    # Operations
+    # ---------------------------------------------------------
+    async def create(self, data: dict):
+        return await self.post(CREATE_PATH, json={"input": [data]})
+
+    async def get_properties(self, uid: str, attributes=None):
+        return await self.post(GET_PROPERTIES_PATH, idempotent=True,
+                               json=objects_payload([uid], attributes))
+
+    async def get_many(self, uids, attributes=None, chunk_size=None):
+        """Chunked getProperties, chunks fetched concurrently and merged."""
+        uids = list(dict.fromkeys(uids))
+        responses = await asyncio.gather(*(
+            self.post(GET_PROPERTIES_PATH, idempotent=True, json=objects_payload(chunk, attributes))
+            for chunk in chunked(uids, chunk_size or self.chunk_size)
+        ))
+        return merge_service_data(responses)
+
+    async def perform_action(self, uid: str, action: str):
+        payload = objects_payload([uid])
+        payload["action"] = action
+        return await self.post(PERFORM_ACTION_PATH, json=payload)
+
+    async def create_relation(self, relation_type: str, primary_uid: str, secondary_uid: str):
+        return await self.post(CREATE_RELATIONS_PATH,
+                               json=relation_payload(relation_type, primary_uid, secondary_uid))
+
+    async def delete_relation(self, relation_type: str, primary_uid: str, secondary_uid: str):
+        return await self.post(DELETE_RELATIONS_PATH, idempotent=True,
+                               json=relation_payload(relation_type, primary_uid, secondary_uid))
+
+    async def upload(self, container_uid: str, file_path: str):
+        """Small files only — the body is read into memory (off the event loop)."""
+        content = await asyncio.to_thread(_read_file, file_path)
+        return await self.post(UPLOAD_PATH, files={"file": (os.path.basename(file_path), content)},
+                               data={"container_uid": container_uid})
+
+    # ---------------------------------------------------------
+    # Fan-out helpers
+    # ---------------------------------------------------------
+    async def get_eco_bundle(self, eco_uid: str, relations=ECO_BUNDLE_RELATIONS):
+        """
+        An ECO plus the objects on its relations (impacted items, attachments):
+        one getProperties for the ECO, then one batched call for everything
+        it points to.
+        """
+        eco = await self.get_properties(eco_uid, attributes=list(relations))
+        props = eco.get("modelObjects", {}).get(eco_uid, {}).get("props", {})
+        related = {rel: props.get(rel, {}).get("dbValues", []) for rel in relations}
+
+        uids = [uid for values in related.values() for uid in values]
+        objects = (await self.get_many(uids)).get("modelObjects", {}) if uids else {}
+
+        return {
+            "eco": eco,
+            "related": {rel: [objects.get(uid, {"uid": uid}) for uid in values]
+                        for rel, values in related.items()},
+        }
+
+    async def get_eco_bundles(self, eco_uids):
+        """get_eco_bundle for many ECOs concurrently; wall time ≈ slowest ECO."""
+        return await asyncio.gather(*(self.get_eco_bundle(uid) for uid in eco_uids))
+
+
+def _read_file(path):
+    with open(path, "rb") as fh:
+        return fh.read()
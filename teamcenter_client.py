@@ -1,22 +1,331 @@
+import hashlib
 import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
+from urllib3.util.retry import Retry
 
-from db import get_db
+from db import save_eco, load_eco
 
 # ---------------------------------------------------------
 # Load Teamcenter Credentials from .env
 # ---------------------------------------------------------
-TC_URL = os.getenv("TC_URL")              
-TC_USERNAME = os.getenv("TC_USERNAME")    
-TC_PASSWORD = os.getenv("TC_PASSWORD")    
+# Checked when a client is created, not at import, so the payload builders
+# and the SQLite helpers below work without a Teamcenter (see tc_standin.py).
+TC_URL = os.getenv("TC_URL")
+TC_USERNAME = os.getenv("TC_USERNAME")
+TC_PASSWORD = os.getenv("TC_PASSWORD")
+
+AUTH = HTTPBasicAuth(TC_USERNAME, TC_PASSWORD) if TC_USERNAME and TC_PASSWORD else None
+
+
+def check_config(base_url, auth):
+    if not base_url:
+        raise ValueError("❌ TC_URL is missing in .env")
+    if auth is None:
+        raise ValueError("❌ Teamcenter username/password missing in .env")
+
+
+# ---------------------------------------------------------
+# Connection pool / timeout / retry policy
+# ---------------------------------------------------------
+TC_CONNECT_TIMEOUT = float(os.getenv("TC_CONNECT_TIMEOUT", 5))
+TC_READ_TIMEOUT = float(os.getenv("TC_READ_TIMEOUT", 60))
+TC_MAX_RETRIES = int(os.getenv("TC_MAX_RETRIES", 3))
+TC_BACKOFF = float(os.getenv("TC_BACKOFF", 0.5))         # 0.5 → 1 → 2 ...
+TC_POOL_SIZE = int(os.getenv("TC_POOL_SIZE", 20))
+TC_GET_PROPERTIES_CHUNK = int(os.getenv("TC_GET_PROPERTIES_CHUNK", 100))
+TC_UPLOAD_CHUNK = int(os.getenv("TC_UPLOAD_CHUNK", 8 * 1024 * 1024))     # 8 MiB
+TC_UPLOAD_WORKERS = int(os.getenv("TC_UPLOAD_WORKERS", 4))
+
+RETRY_STATUSES = (429, 502, 503, 504)
+
+# SOA endpoints
+CREATE_PATH = "/tc/api/StructureManagement/Create"
+GET_PROPERTIES_PATH = "/tc/api/Core-2006-03-DataManagement/getProperties"
+PERFORM_ACTION_PATH = "/tc/api/Core-2007-01-Lifecycle/performAction"
+CREATE_RELATIONS_PATH = "/tc/api/Core-2007-01-RelationManagement/createRelations"
+DELETE_RELATIONS_PATH = "/tc/api/Core-2007-01-RelationManagement/deleteRelations"
+UPLOAD_PATH = "/tc/api/Core-2006-03-FileManagement/upload"
+
+# Resumable upload: chunks carry `X-Upload-Id` + `Content-Range: bytes a-b/total`,
+# the server answers with the next offset it expects ({"offset": n}); the last
+# chunk's answer is the usual upload response ({"objects": [...]}).
+# Servers without these endpoints (404/405) get the single multipart upload.
+UPLOAD_CHUNK_PATH = UPLOAD_PATH + "/chunk"
+UPLOAD_STATUS_PATH = UPLOAD_PATH + "/status"
+MISSING_ENDPOINT_STATUSES = (404, 405)
+
+
+class ChunkedUploadUnsupported(Exception):
+    """The server has no chunk/status upload endpoints."""
+
+
+# ---------------------------------------------------------
+# Payload builders (shared by every client)
+# ---------------------------------------------------------
+def objects_payload(uids, attributes=None):
+    payload = {"objects": [{"uid": uid} for uid in uids]}
+    if attributes:
+        payload["attributes"] = list(attributes)
+    return payload
+
+
+def relation_payload(relation_type: str, primary_uid: str, secondary_uid: str):
+    return {
+        "input": [{
+            "relationType": relation_type,
+            "primaryObject": {"uid": primary_uid},
+            "secondaryObject": {"uid": secondary_uid}
+        }]
+    }
+
+
+def merge_service_data(responses):
+    """
+    Combine several SOA responses into one: lists are concatenated
+    (plain, partialErrors, ...) and dicts merged (modelObjects).
+    """
+    merged = {}
+    for res in responses:
+        for key, value in res.items():
+            if isinstance(value, list):
+                merged.setdefault(key, []).extend(value)
+            elif isinstance(value, dict):
+                merged.setdefault(key, {}).update(value)
+            else:
+                merged[key] = value
+    return merged
+
+
+def chunked(seq, size):
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
+
+
+def upload_id_for(container_uid: str, file_path: str) -> str:
+    """
+    Stable id for (target, file identity): the same unchanged file resumes
+    the same server-side upload, even from a new process.
+    """
+    st = os.stat(file_path)
+    ident = f"{container_uid}|{os.path.abspath(file_path)}|{st.st_size}|{st.st_mtime_ns}"
+    return hashlib.sha256(ident.encode()).hexdigest()[:32]
+
+
+
+# ---------------------------------------------------------
+# Pooled client
+# ---------------------------------------------------------
+class TeamcenterClient:
+    """
+    Teamcenter SOA REST client on one pooled keep-alive requests.Session.
 
-if not TC_URL:
-    raise ValueError("❌ TC_URL is missing in .env")
-if not TC_USERNAME or not TC_PASSWORD:
-    raise ValueError("❌ Teamcenter username/password missing in .env")
+    Connection failures are retried for every call (nothing reached the
+    server). 429/502/503/504 and read timeouts are retried only for
+    idempotent calls (getProperties, deleteRelations), honouring
+    Retry-After, with exponential backoff and jitter.
+    """
 
-AUTH = HTTPBasicAuth(TC_USERNAME, TC_PASSWORD)
+    def __init__(self, base_url=TC_URL, auth=AUTH,
+                 connect_timeout=TC_CONNECT_TIMEOUT, read_timeout=TC_READ_TIMEOUT,
+                 max_retries=TC_MAX_RETRIES, backoff=TC_BACKOFF, pool_size=TC_POOL_SIZE,
+                 chunk_size=TC_GET_PROPERTIES_CHUNK):
+        check_config(base_url, auth)
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.chunk_size = chunk_size
+        self.chunked_uploads = True     # cleared once the server 404s/405s the chunk endpoint
+
+        self.session = requests.Session()
+        self.session.auth = auth
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=pool_size,
+            max_retries=Retry(total=None, connect=max_retries, read=0, status=0, other=0,
+                              backoff_factor=backoff),
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------------------------------------------------------
+    # Transport
+    # ---------------------------------------------------------
+    def _sleep_before_retry(self, attempt, response=None):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            wait = float(retry_after)
+        else:
+            wait = self.backoff * (2 ** attempt) + random.uniform(0, self.backoff)
+        time.sleep(wait)
+
+    def post(self, path: str, idempotent: bool = False, **kwargs):
+        """POST to an SOA endpoint and return the decoded JSON body."""
+        return self._send(path, idempotent, **kwargs).json()
+
+    def _send(self, path: str, idempotent: bool = False, **kwargs):
+        """POST with the retry policy above; returns the requests.Response."""
+        url = f"{self.base_url}{path}"
+        kwargs.setdefault("timeout", self.timeout)
+
+        for attempt in range(self.max_retries + 1):
+            last = attempt == self.max_retries
+            try:
+                response = self.session.post(url, **kwargs)
+            except requests.exceptions.ReadTimeout:
+                if not idempotent or last:
+                    raise
+                self._sleep_before_retry(attempt)
+                continue
+
+            if idempotent and response.status_code in RETRY_STATUSES and not last:
+                self._sleep_before_retry(attempt, response)
+                continue
+            return response
+
+    def _post_upload(self, path: str, **kwargs):
+        """post() for the chunk/status endpoints; raises ChunkedUploadUnsupported on 404/405."""
+        response = self._send(path, idempotent=True, **kwargs)
+        if response.status_code in MISSING_ENDPOINT_STATUSES:
+            raise ChunkedUploadUnsupported(f"{path} answered {response.status_code}")
+        return response.json()
+
+    # ---------------------------------------------------------
+    # Operations
+    # ---------------------------------------------------------
+    def create(self, data: dict):
+        return self.post(CREATE_PATH, json={"input": [data]})
+
+    def get_properties(self, uid: str):
+        return self.post(GET_PROPERTIES_PATH, idempotent=True, json=objects_payload([uid]))
+
+    def get_many(self, uids, chunk_size=None):
+        """
+        getProperties for many objects: one request per chunk of UIDs
+        instead of one per object, merged into a single response.
+        """
+        uids = list(dict.fromkeys(uids))
+        return merge_service_data(
+            self.post(GET_PROPERTIES_PATH, idempotent=True, json=objects_payload(chunk))
+            for chunk in chunked(uids, chunk_size or self.chunk_size)
+        )
+
+    def perform_action(self, uid: str, action: str):
+        payload = objects_payload([uid])
+        payload["action"] = action
+        return self.post(PERFORM_ACTION_PATH, json=payload)
+
+    def create_relation(self, relation_type: str, primary_uid: str, secondary_uid: str):
+        return self.post(CREATE_RELATIONS_PATH,
+                         json=relation_payload(relation_type, primary_uid, secondary_uid))
+
+    def delete_relation(self, relation_type: str, primary_uid: str, secondary_uid: str):
+        return self.post(DELETE_RELATIONS_PATH, idempotent=True,
+                         json=relation_payload(relation_type, primary_uid, secondary_uid))
+
+    def upload(self, container_uid: str, file_path: str):
+        with open(file_path, "rb") as fh:
+            return self.post(UPLOAD_PATH, files={"file": fh}, data={"container_uid": container_uid})
+
+    def upload_offset(self, upload_id: str) -> int:
+        """Bytes the server already holds for this upload (0 if unknown)."""
+        return int(self._post_upload(UPLOAD_STATUS_PATH, json={"upload_id": upload_id}).get("offset", 0))
+
+    def upload_chunked(self, container_uid: str, file_path: str, chunk_size=None, progress=None):
+        """
+        Upload a file in chunks, one chunk in memory at a time, resuming from
+        the server's acknowledged offset (also after a previous failed run).
+
+        A failed chunk is not blindly resent: the offset is re-queried and the
+        upload continues from there. Gives up after `max_retries` consecutive
+        failures. `progress(sent_bytes, total_bytes)` is called per acked chunk.
+
+        A server without the chunk endpoints (404/405) gets one multipart
+        upload() instead, and so does every later file on this client.
+        """
+        total = os.path.getsize(file_path)
+        if total == 0 or not self.chunked_uploads:
+            return self._upload_whole(container_uid, file_path, total, progress)
+
+        chunk_size = chunk_size or TC_UPLOAD_CHUNK
+        upload_id = upload_id_for(container_uid, file_path)
+        params = {"container_uid": container_uid, "filename": os.path.basename(file_path)}
+        try:
+            offset = self.upload_offset(upload_id)
+        except (ChunkedUploadUnsupported, requests.exceptions.RequestException, ValueError):
+            offset = 0      # nothing to resume; the first chunk tells whether chunks work
+        failures = 0
+
+        with open(file_path, "rb") as fh:
+            while True:
+                if progress:
+                    progress(offset, total)
+                fh.seek(offset)
+                chunk = fh.read(chunk_size)
+                end = offset + len(chunk) - 1
+                headers = {
+                    "X-Upload-Id": upload_id,
+                    "Content-Range": f"bytes {offset}-{end}/{total}",
+                    "Content-Type": "application/octet-stream",
+                }
+                try:
+                    res = self._post_upload(UPLOAD_CHUNK_PATH, params=params, data=chunk, headers=headers)
+                except ChunkedUploadUnsupported:
+                    self.chunked_uploads = False
+                    return self._upload_whole(container_uid, file_path, total, progress)
+                except (requests.exceptions.RequestException, ValueError):
+                    res = None
+
+                if res is not None and "objects" in res:
+                    if progress:
+                        progress(total, total)
+                    return res
+                if res is not None and "offset" in res and int(res["offset"]) > offset:
+                    offset, failures = int(res["offset"]), 0
+                    continue
+
+                # no progress: resync with the server (a 409 carries the right offset)
+                failures += 1
+                if failures > self.max_retries:
+                    return {"error": "Upload failed", "upload_id": upload_id,
+                            "offset": offset, "response": res}
+                self._sleep_before_retry(failures - 1)
+                try:
+                    offset = self.upload_offset(upload_id)
+                except (ChunkedUploadUnsupported, requests.exceptions.RequestException, ValueError):
+                    pass
+
+    def _upload_whole(self, container_uid, file_path, total, progress):
+        res = self.upload(container_uid, file_path)
+        if progress and "objects" in res:
+            progress(total, total)
+        return res
+
+
+_client = None
+
+
+def get_client() -> TeamcenterClient:
+    """Process-wide client, created on first use."""
+    global _client
+    if _client is None:
+        _client = TeamcenterClient()
+    return _client
 
 
 
@@ -27,9 +336,7 @@ def create_eco(data: dict):
     """
     Create an ECO (Change Notice Revision) using StructureManagement/Create
     """
-    url = f"{TC_URL}/tc/api/StructureManagement/Create"
-    response = requests.post(url, auth=AUTH, json={"input": [data]})
-    return response.json()
+    return get_client().create(data)
 
 
 
@@ -40,10 +347,15 @@ def get_eco_details(uid: str):
     """
     Fetch properties of ECO using DataManagement/getProperties
     """
-    url = f"{TC_URL}/tc/api/Core-2006-03-DataManagement/getProperties"
-    payload = {"objects": [{"uid": uid}]}
-    response = requests.post(url, auth=AUTH, json=payload)
-    return response.json()
+    return get_client().get_properties(uid)
+
+
+
+def get_many_eco_details(uids):
+    """
+    Fetch properties of many ECOs, batched into chunked getProperties calls
+    """
+    return get_client().get_many(uids)
 
 
 
@@ -54,13 +366,7 @@ def update_eco_status(uid: str, action: str):
     """
     Perform a lifecycle action (Promote, Demote, etc.)
     """
-    url = f"{TC_URL}/tc/api/Core-2007-01-Lifecycle/performAction"
-    payload = {
-        "objects": [{"uid": uid}],
-        "action": action
-    }
-    response = requests.post(url, auth=AUTH, json=payload)
-    return response.json()
+    return get_client().perform_action(uid, action)
 
 
 
@@ -71,17 +377,7 @@ def add_impacted_item(eco_uid: str, item_uid: str):
     """
     Adds an item to ECO affected/impacted list
     """
-    url = f"{TC_URL}/tc/api/Core-2007-01-RelationManagement/createRelations"
-    payload = {
-        "input": [{
-            "relationType": "CMHasImpactedItem",
-            "primaryObject": {"uid": eco_uid},
-            "secondaryObject": {"uid": item_uid}
-        }]
-    }
-
-    response = requests.post(url, auth=AUTH, json=payload)
-    return response.json()
+    return get_client().create_relation("CMHasImpactedItem", eco_uid, item_uid)
 
 # ---------------------------------------------------------
 # 5️⃣ REMOVE IMPACTED / AFFECTED ITEM
@@ -90,33 +386,22 @@ def remove_impacted_item(eco_uid: str, item_uid: str):
     """
     Removes an affected/impacted item from ECO
     """
-    url = f"{TC_URL}/tc/api/Core-2007-01-RelationManagement/deleteRelations"
-    payload = {
-        "input": [{
-            "relationType": "CMHasImpactedItem",
-            "primaryObject": {"uid": eco_uid},
-            "secondaryObject": {"uid": item_uid}
-        }]
-    }
-
-    response = requests.post(url, auth=AUTH, json=payload)
-    return response.json()
+    return get_client().delete_relation("CMHasImpactedItem", eco_uid, item_uid)
 
 
 
 # ---------------------------------------------------------
 # 6️⃣ ATTACH FILE TO ECO
 # ---------------------------------------------------------
-def attach_file(eco_uid: str, file_path: str):
+def attach_file(eco_uid: str, file_path: str, progress=None):
     """
     Upload a file to Teamcenter AND attach to ECO
+    (chunked + resumable, see TeamcenterClient.upload_chunked)
     """
-    # Step 1: Upload file
-    upload_url = f"{TC_URL}/tc/api/Core-2006-03-FileManagement/upload"
-    files = {"file": open(file_path, "rb")}
-    data = {"container_uid": eco_uid}
+    client = get_client()
 
-    upload_res = requests.post(upload_url, auth=AUTH, files=files, data=data).json()
+    # Step 1: Upload file
+    upload_res = client.upload_chunked(eco_uid, file_path, progress=progress)
 
     try:
         file_uid = upload_res["objects"][0]["uid"]
@@ -124,16 +409,7 @@ def attach_file(eco_uid: str, file_path: str):
         return {"error": "Upload failed", "response": upload_res}
 
     # Step 2: Create relation to ECO
-    relation_url = f"{TC_URL}/tc/api/Core-2007-01-RelationManagement/createRelations"
-    payload = {
-        "input": [{
-            "relationType": "IMAN_specification",
-            "primaryObject": {"uid": eco_uid},
-            "secondaryObject": {"uid": file_uid}
-        }]
-    }
-
-    relation_res = requests.post(relation_url, auth=AUTH, json=payload).json()
+    relation_res = client.create_relation("IMAN_specification", eco_uid, file_uid)
 
     return {
         "upload": upload_res,
@@ -142,46 +418,28 @@ def attach_file(eco_uid: str, file_path: str):
 
 
 
-def create_eco(change_id, title, description, datasets, bom_list):
-    db = get_db()
+def attach_files(eco_uid: str, file_paths, max_workers=TC_UPLOAD_WORKERS, progress=None):
+    """
+    Attach several files in parallel on the shared pooled session.
+    `progress(file_path, sent_bytes, total_bytes)`; results follow file_paths order.
+    """
+    def one(path):
+        cb = (lambda sent, total: progress(path, sent, total)) if progress else None
+        try:
+            return {"file": path, **attach_file(eco_uid, path, progress=cb)}
+        except Exception as e:
+            return {"file": path, "error": str(e)}
 
-    # Insert into main table
-    db.execute("""
-        INSERT OR REPLACE INTO eco_master (change_id, title, description, datasets)
-        VALUES (?, ?, ?, ?)
-    """, (change_id, title, description, ",".join(datasets)))
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(one, file_paths))
 
-    # Insert BOM table
-    db.execute("DELETE FROM eco_bom WHERE change_id=?", (change_id,))
-    for item_data in bom_list:
-        db.execute("""
-            INSERT INTO eco_bom (change_id, item, impact)
-            VALUES (?, ?, ?)
-        """, (change_id, item_data["item"], item_data["impact"]))
 
-    db.commit()
-    db.close()
 
+def create_eco(change_id, title, description, datasets, bom_list):
+    save_eco(change_id, title, description, datasets, bom_list)
     return {"status": "success", "change_id": change_id}
 
 
 
 def get_eco_details(change_id: str):
-    db = get_db()
-
-    eco = db.execute("SELECT * FROM eco_master WHERE change_id=?", (change_id,)).fetchone()
-    if not eco:
-        return None
-
-    bom = db.execute("SELECT item, impact FROM eco_bom WHERE change_id=?", (change_id,)).fetchall()
-
-    db.close()
-
-    return {
-        "change_id": eco["change_id"],
-        "title": eco["title"],
-        "description": eco["description"],
-        "datasets": eco["datasets"].split(","),
-        "bom": [dict(row) for row in bom]
-    }
-
+    return load_eco(change_id)
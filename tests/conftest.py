@@ -0,0 +1,12 @@
+# Modules live at the repo root (flat layout); make them importable from tests/.
+# Databases, journal and attachments go to a throwaway directory.
+import os
+import sys
+import tempfile
+
+_DATA = tempfile.mkdtemp(prefix="eco-tests-")
+os.environ.setdefault("ECO_DB_PATH", os.path.join(_DATA, "eco.db"))
+os.environ.setdefault("ECO_DATA_DIR", os.path.join(_DATA, "data"))
+os.environ.setdefault("ATTACHMENT_DIR", os.path.join(_DATA, "attachments"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
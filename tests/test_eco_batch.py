@@ -0,0 +1,38 @@
+import asyncio
+
+import gemini_client
+import mock_teamcenter
+from eco_batch import BATCH_RESERVE_TOKENS, DEFERRED_REPLY, MIN_TOKEN_BUDGET, summarize_batch
+
+
+class _Reply:
+    def __init__(self, text):
+        self.text = text
+
+
+def test_interactive_call_admitted_after_full_batch(monkeypatch):
+    bucket = gemini_client.TokenBucket(gemini_client.MAX_REQUESTS_PER_MIN, period=60)
+    circuit = gemini_client.CircuitBreaker(bucket, gemini_client.COOLDOWN_SECONDS)
+    monkeypatch.setattr(gemini_client, "bucket", bucket)
+    monkeypatch.setattr(gemini_client, "circuit", circuit)
+
+    async def generate(prompt, generation_config=None):
+        return _Reply('{"summaries": []}')
+
+    monkeypatch.setattr(gemini_client.model, "generate_content_async", generate)
+
+    # each ECO alone exceeds the token budget, so each is its own model call
+    eco_ids = [
+        mock_teamcenter.create_eco({"properties": {"object_name": f"Batch {i}",
+                                                   "object_desc": "long " * 400}})["eco_uid"]
+        for i in range(20)
+    ]
+    out = asyncio.run(summarize_batch(eco_ids, token_budget=MIN_TOKEN_BUDGET))
+
+    allowed = gemini_client.MAX_REQUESTS_PER_MIN - BATCH_RESERVE_TOKENS
+    assert out["model_calls"] == allowed
+    assert sum(r.get("error") == DEFERRED_REPLY for r in out["results"]) == len(eco_ids) - allowed
+
+    reply = asyncio.run(gemini_client.ask_gemini_async("Summarize ECO-1001"))
+    assert not gemini_client.is_error_reply(reply)
+    assert not circuit.is_open
@@ -0,0 +1,63 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from requests.auth import HTTPBasicAuth
+
+from teamcenter_client import UPLOAD_PATH, TeamcenterClient
+
+
+class PlainUploadHandler(BaseHTTPRequestHandler):
+    """A Teamcenter with only the single multipart upload: chunk/status 404."""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.paths.append(self.path.split("?")[0])
+        if self.path != UPLOAD_PATH:
+            self.send_response(404)
+            self.send_header("Content-Type", "text/html")
+            self.end_headers()
+            self.wfile.write(b"<html>Not Found</html>")
+            return
+        body = json.dumps({"objects": [{"uid": "FILE-1"}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def plain_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PlainUploadHandler)
+    server.paths = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_upload_chunked_falls_back_without_chunk_endpoints(plain_server, tmp_path):
+    path = tmp_path / "drawing.pdf"
+    path.write_bytes(b"x" * 5000)
+    seen = []
+    client = TeamcenterClient(base_url=f"http://127.0.0.1:{plain_server.server_port}",
+                              auth=HTTPBasicAuth("user", "pass"), max_retries=1, backoff=0)
+
+    res = client.upload_chunked("ECO-1", str(path), chunk_size=1024,
+                                progress=lambda sent, total: seen.append((sent, total)))
+
+    assert res == {"objects": [{"uid": "FILE-1"}]}
+    assert seen[-1] == (5000, 5000)
+    assert client.chunked_uploads is False
+    assert plain_server.paths.count(UPLOAD_PATH) == 1
+
+    # later files go straight to the multipart upload
+    plain_server.paths.clear()
+    assert client.upload_chunked("ECO-1", str(path))["objects"][0]["uid"] == "FILE-1"
+    assert plain_server.paths == [UPLOAD_PATH]
+    client.close()